@@ -27,6 +27,8 @@ class User(AbstractBaseUser, PermissionsMixin):
     date_joined = models.DateTimeField(auto_now_add=True)
     last_login = models.DateTimeField(auto_now=True)
     role = models.CharField(max_length=15 ,choices=ROLE_CHOICES, default='external', db_index=True)
+    # Part of every calendar feed token; bumping it revokes the old links
+    calendar_token_version = models.PositiveIntegerField(default=0)
    
 
     USERNAME_FIELD = "email"
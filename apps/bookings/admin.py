@@ -1,8 +1,14 @@
 from django.contrib import admin
 from django.utils import timezone
+from django.db import transaction
 from django.db.models import Q
 from django.utils.html import format_html
 from .models import Event
+from .availability import availability_index
+from .conflicts import event_conflicts
+from .calendar import invalidate_calendars
+from .emails import queue_booking_emails
+from .tasks import schedule_event_completion
 from apps.notifications.views import send_booking_approved_notification, send_booking_rejected_notification
 
 # Define status choices as constants to ensure consistency
@@ -168,15 +174,14 @@ class EventAdmin(admin.ModelAdmin):
                 obj.status = STATUS_CANCELLED
             
             elif old_status != STATUS_CONFIRMED and new_status == STATUS_CONFIRMED:
-                # When confirming an event, check for conflicts
-                conflicts = Event.objects.filter(
-                    space=obj.space,
-                    status=STATUS_CONFIRMED,
-                    start_datetime__lt=obj.end_datetime,
-                    end_datetime__gt=obj.start_datetime
-                ).exclude(pk=obj.pk)
+                # When confirming an event, check for conflicts (in-memory
+                # index first, database only if the index finds nothing)
+                has_conflict = event_conflicts.find(
+                    obj.space_id, obj.start_datetime, obj.end_datetime,
+                    exclude=obj.pk, verify=True
+                ) is not None
                 
-                if conflicts.exists():
+                if has_conflict:
                     self.message_user(
                         request,
                         'Cannot confirm event due to scheduling conflict.',
@@ -186,6 +191,7 @@ class EventAdmin(admin.ModelAdmin):
                 else:
                     # Send confirmation notification
                     super().save_model(request, obj, form, change)
+                    transaction.on_commit(lambda: schedule_event_completion(obj))
                     send_booking_approved_notification(obj, obj.space, obj.user)
                     self.message_user(
                         request,
@@ -209,24 +215,29 @@ class EventAdmin(admin.ModelAdmin):
             # Send rejection email if status changed to 'rejected'
             if old_obj.status != 'rejected' and obj.status == 'rejected':
                 send_booking_rejected_notification(obj, obj.space, obj.user)
+            # A rescheduled event needs a completion task for its new end time;
+            # the one queued for the old end time finds nothing to do
+            if obj.status == STATUS_CONFIRMED and old_obj.end_datetime != obj.end_datetime:
+                transaction.on_commit(lambda: schedule_event_completion(obj))
         
         super().save_model(request, obj, form, change)
 
     def mark_as_confirmed(self, request, queryset):
         now = timezone.now()
-        success_count = 0
+        candidates = list(queryset.filter(status=STATUS_PENDING).order_by('start_datetime', 'id'))
+        candidate_ids = [event.pk for event in candidates]
+
+        # One range query per space checks the selection against the other
+        # active events; among overlapping selected events the earliest wins
+        conflicts = event_conflicts.find_many(
+            [(event.pk, event.space_id, event.start_datetime, event.end_datetime) for event in candidates],
+            exclude=candidate_ids
+        )
+
+        winners = []
         error_count = 0
-        
-        for event in queryset.filter(status=STATUS_PENDING):
-            # Check for conflicts
-            conflicts = Event.objects.filter(
-                space=event.space,
-                status=STATUS_CONFIRMED,
-                start_datetime__lt=event.end_datetime,
-                end_datetime__gt=event.start_datetime
-            ).exclude(pk=event.pk)
-            
-            if conflicts.exists():
+        for event in candidates:
+            if event.pk in conflicts:
                 error_count += 1
                 self.message_user(
                     request,
@@ -234,10 +245,28 @@ class EventAdmin(admin.ModelAdmin):
                     level='ERROR'
                 )
             else:
-                event.status = STATUS_CONFIRMED
-                event.save()
-                send_booking_approved_notification(event, event.space, event.user)
-                success_count += 1
+                winners.append(event)
+
+        if winners:
+            with transaction.atomic():
+                for event in winners:
+                    event.status = STATUS_CONFIRMED
+                    event.updated_at = now
+                Event.objects.bulk_update(winners, ['status', 'updated_at'])
+                # Approval emails go out in one background batch via the outbox
+                queue_booking_emails('booking_approved', winners)
+
+                def schedule_completions():
+                    for event in winners:
+                        schedule_event_completion(event)
+                transaction.on_commit(schedule_completions)
+            # bulk_update() bypasses the Event signals
+            availability_index.invalidate({event.space_id for event in winners})
+            invalidate_calendars(
+                space_ids={event.space_id for event in winners},
+                user_ids={event.user_id for event in winners}
+            )
+        success_count = len(winners)
         
         if success_count > 0:
             self.message_user(
@@ -257,7 +286,13 @@ class EventAdmin(admin.ModelAdmin):
         # Can't cancel completed events
         non_completed = queryset.exclude(status=STATUS_COMPLETED)
         skipped = queryset.filter(status=STATUS_COMPLETED).count()
-        updated = non_completed.update(status=STATUS_CANCELLED)
+        space_ids = set(non_completed.values_list('space_id', flat=True))
+        user_ids = set(non_completed.values_list('user_id', flat=True))
+        # updated_at is set by hand since update() skips auto_now
+        updated = non_completed.update(status=STATUS_CANCELLED, updated_at=timezone.now())
+        # update() bypasses the Event signals, so refresh the index and feeds by hand
+        availability_index.invalidate(space_ids)
+        invalidate_calendars(space_ids=space_ids, user_ids=user_ids)
         
         if updated > 0:
             self.message_user(request, f'{updated} events were cancelled.', level='SUCCESS')
@@ -276,7 +311,11 @@ class EventAdmin(admin.ModelAdmin):
             status=STATUS_CONFIRMED,
             end_datetime__lt=now
         )
-        updated = completable.update(status=STATUS_COMPLETED)
+        space_ids = set(completable.values_list('space_id', flat=True))
+        user_ids = set(completable.values_list('user_id', flat=True))
+        updated = completable.update(status=STATUS_COMPLETED, updated_at=now)
+        availability_index.invalidate(space_ids)
+        invalidate_calendars(space_ids=space_ids, user_ids=user_ids)
         skipped = queryset.count() - updated
         
         if updated > 0:
@@ -1,6 +1,19 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+
+
+def install_booking_overlap_triggers(sender, using, **kwargs):
+    from .constraints import install_overlap_triggers
+    from .models import Booking, Event
+
+    install_overlap_triggers([Event, Booking], using=using)
 
 
 class BookingsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'apps.bookings' 
\ No newline at end of file
+    name = 'apps.bookings'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+
+        post_migrate.connect(install_booking_overlap_triggers, sender=self)
@@ -0,0 +1,194 @@
+import threading
+import time
+from bisect import bisect_right
+from collections import namedtuple
+from datetime import timezone as dt_timezone
+
+from django.conf import settings
+
+# Statuses that hold a space and therefore block other bookings
+ACTIVE_STATUSES = ('pending', 'confirmed')
+
+Interval = namedtuple(
+    'Interval',
+    ['id', 'event_name', 'start_datetime', 'end_datetime', 'status']
+)
+
+
+def interval_for_event(event):
+    """Build an Interval from an Event, normalising datetimes to UTC like the DB does"""
+    return Interval(
+        event.pk,
+        event.event_name,
+        event.start_datetime.astimezone(dt_timezone.utc),
+        event.end_datetime.astimezone(dt_timezone.utc),
+        event.status,
+    )
+
+
+class SpaceSchedule:
+    """
+    Active events of a single space kept sorted by start time.
+
+    Next to the sorted intervals we keep a running maximum of their end times
+    ("reach"). The first interval whose reach passes a query start is also the
+    earliest-starting interval that can overlap it, so a conflict lookup is a
+    single bisect.
+    """
+
+    def __init__(self, intervals=()):
+        self.loaded_at = time.monotonic()
+        self._intervals = {interval.id: interval for interval in intervals}
+        self._timelines = {}
+
+    def __len__(self):
+        return len(self._intervals)
+
+    def __contains__(self, event_id):
+        return event_id in self._intervals
+
+    def add(self, interval):
+        self._intervals[interval.id] = interval
+        self._timelines.clear()
+
+    def discard(self, event_id):
+        if self._intervals.pop(event_id, None) is not None:
+            self._timelines.clear()
+
+    def _timeline(self, statuses):
+        key = frozenset(statuses)
+        timeline = self._timelines.get(key)
+        if timeline is None:
+            intervals = sorted(
+                (interval for interval in self._intervals.values() if interval.status in key),
+                key=lambda interval: (interval.start_datetime, interval.id)
+            )
+            reach = []
+            furthest = None
+            for interval in intervals:
+                if furthest is None or interval.end_datetime > furthest:
+                    furthest = interval.end_datetime
+                reach.append(furthest)
+            timeline = self._timelines[key] = (intervals, reach)
+        return timeline
+
+    def find_conflict(self, start, end, statuses=ACTIVE_STATUSES, exclude=None):
+        """Return the earliest interval overlapping [start, end), or None"""
+        intervals, reach = self._timeline(statuses)
+        for interval in intervals[bisect_right(reach, start):]:
+            if interval.start_datetime >= end:
+                return None
+            if interval.end_datetime > start and interval.id != exclude:
+                return interval
+        return None
+
+
+class AvailabilityIndex:
+    """
+    Per-process cache of SpaceSchedules.
+
+    Schedules are loaded lazily on first use and kept current by the Event
+    save/delete signals. Writes made by other processes (or through
+    queryset.update()) are only picked up once a schedule is older than
+    BOOKING_INDEX_TTL seconds, so callers must still confirm a "no conflict"
+    answer against the database before committing a booking.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._schedules = {}
+
+    @property
+    def ttl(self):
+        return getattr(settings, 'BOOKING_INDEX_TTL', 30)
+
+    def _load(self, space_id):
+        from .models import Event
+
+        rows = Event.objects.filter(
+            space_id=space_id,
+            status__in=ACTIVE_STATUSES
+        ).order_by().values_list('id', 'event_name', 'start_datetime', 'end_datetime', 'status')
+        return SpaceSchedule(Interval(*row) for row in rows)
+
+    def schedule_for(self, space_id):
+        with self._lock:
+            schedule = self._schedules.get(space_id)
+            if schedule is not None and time.monotonic() - schedule.loaded_at < self.ttl:
+                return schedule
+
+        schedule = self._load(space_id)
+        with self._lock:
+            self._schedules[space_id] = schedule
+        return schedule
+
+    def find_conflict(self, space_id, start, end, statuses=ACTIVE_STATUSES, exclude=None):
+        """Answer "does this range conflict, and with what?" from memory"""
+        schedule = self.schedule_for(space_id)
+        with self._lock:
+            return schedule.find_conflict(start, end, statuses=statuses, exclude=exclude)
+
+    def record(self, space_id, interval):
+        """Apply a saved event to the loaded schedules"""
+        with self._lock:
+            # The event may have moved between spaces or left the active statuses
+            for schedule in self._schedules.values():
+                schedule.discard(interval.id)
+            schedule = self._schedules.get(space_id)
+            if schedule is not None and interval.status in ACTIVE_STATUSES:
+                schedule.add(interval)
+
+    def forget(self, event_id):
+        with self._lock:
+            for schedule in self._schedules.values():
+                schedule.discard(event_id)
+
+    def invalidate(self, space_ids):
+        """Drop schedules so they are reloaded on next use (e.g. after bulk updates)"""
+        with self._lock:
+            for space_id in space_ids:
+                self._schedules.pop(space_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._schedules.clear()
+
+
+availability_index = AvailabilityIndex()
+
+
+def merge_intervals(intervals):
+    """
+    Sort-and-sweep (start, end) pairs into a list of disjoint busy blocks.
+    Touching intervals are merged since there is no usable gap between them.
+    """
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1][1] = end
+        else:
+            merged.append([start, end])
+    return [(start, end) for start, end in merged]
+
+
+def free_busy(intervals, window_start, window_end, min_slot=None):
+    """
+    Split [window_start, window_end) into busy and free blocks.
+
+    Busy blocks are clipped to the window; free gaps shorter than min_slot
+    (a timedelta) are left out since nothing can be booked in them.
+    """
+    busy = merge_intervals(
+        (max(start, window_start), min(end, window_end))
+        for start, end in intervals
+        if start < window_end and end > window_start
+    )
+
+    free = []
+    cursor = window_start
+    for start, end in busy + [(window_end, window_end)]:
+        if start > cursor and (min_slot is None or start - cursor >= min_slot):
+            free.append((cursor, start))
+        cursor = max(cursor, end)
+    return busy, free
@@ -0,0 +1,189 @@
+from datetime import timezone as dt_timezone
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.http import HttpResponse, StreamingHttpResponse
+from rest_framework.renderers import BaseRenderer
+
+from core.cache import bump_version, get_version
+from core.conditional import make_etag, not_modified, set_validators
+from .availability import ACTIVE_STATUSES
+
+# Bumped by set-based updates and space changes that may touch any feed
+CALENDAR_CACHE = 'calendars'
+CALENDAR_TOKEN_SALT = 'bookings.calendar'
+CONTENT_TYPE = 'text/calendar; charset=utf-8'
+PRODID = '-//EventSpace//Bookings//EN'
+
+ICS_STATUS = {
+    'pending': 'TENTATIVE',
+    'confirmed': 'CONFIRMED',
+}
+
+
+class ICalendarRenderer(BaseRenderer):
+    """Lets calendar clients that only accept text/calendar through content negotiation"""
+    media_type = 'text/calendar'
+    format = 'ics'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, dict):
+            data = data.get('error') or data.get('detail') or ''
+        return str(data).encode(self.charset)
+
+
+def calendar_token(user):
+    """
+    Signed token that identifies the user of a calendar subscription. It
+    expires after CALENDAR_TOKEN_MAX_AGE and is revoked by bumping the
+    user's calendar_token_version (see rotate_calendar_token).
+    """
+    payload = {'user': user.pk, 'version': user.calendar_token_version}
+    return signing.dumps(payload, salt=CALENDAR_TOKEN_SALT, compress=True)
+
+
+def rotate_calendar_token(user):
+    """Revoke every calendar link of the user and return a new token"""
+    user_model = type(user)
+    user_model.objects.filter(pk=user.pk).update(calendar_token_version=F('calendar_token_version') + 1)
+    user.refresh_from_db(fields=['calendar_token_version'])
+    return calendar_token(user)
+
+
+def user_for_token(token):
+    """The active user a current, unexpired calendar token belongs to, or None"""
+    try:
+        payload = signing.loads(token, salt=CALENDAR_TOKEN_SALT, max_age=settings.CALENDAR_TOKEN_MAX_AGE)
+        user_id, version = payload['user'], payload['version']
+    except (signing.BadSignature, KeyError, TypeError):
+        return None
+    return get_user_model().objects.filter(
+        pk=user_id, is_active=True, calendar_token_version=version
+    ).only('id', 'email').first()
+
+
+def feed_namespace(kind, pk):
+    return f'{CALENDAR_CACHE}:{kind}:{pk}'
+
+
+def invalidate_calendars(space_ids=(), user_ids=(), everything=False):
+    """Drop cached feeds once the current transaction commits"""
+    namespaces = [feed_namespace('space', pk) for pk in set(space_ids)]
+    namespaces += [feed_namespace('user', pk) for pk in set(user_ids)]
+    if everything:
+        namespaces.append(CALENDAR_CACHE)
+
+    def bump():
+        for namespace in namespaces:
+            bump_version(namespace)
+    transaction.on_commit(bump)
+
+
+def escape_text(value):
+    return (
+        str(value).replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+        .replace('\r\n', '\\n').replace('\n', '\\n')
+    )
+
+
+def fold(line):
+    """Fold a content line to 75 octets as RFC 5545 asks, without splitting characters"""
+    encoded = line.encode()
+    if len(encoded) <= 75:
+        return line + '\r\n'
+    parts = []
+    current = ''
+    limit = 75
+    for char in line:
+        if len((current + char).encode()) > limit:
+            parts.append(current)
+            current = char
+            limit = 74  # continuation lines start with a space
+        else:
+            current += char
+    parts.append(current)
+    return '\r\n '.join(parts) + '\r\n'
+
+
+def format_datetime(value):
+    return value.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def vevent(event):
+    lines = [
+        'BEGIN:VEVENT',
+        f'UID:event-{event.pk}@eventspace',
+        f'DTSTAMP:{format_datetime(event.updated_at)}',
+        f'LAST-MODIFIED:{format_datetime(event.updated_at)}',
+        f'DTSTART:{format_datetime(event.start_datetime)}',
+        f'DTEND:{format_datetime(event.end_datetime)}',
+        f'SUMMARY:{escape_text(event.event_name)}',
+        f'LOCATION:{escape_text(f"{event.space.name}, {event.space.location}")}',
+        f'STATUS:{ICS_STATUS[event.status]}',
+        'END:VEVENT',
+    ]
+    return ''.join(fold(line) for line in lines)
+
+
+def feed_events(queryset):
+    return queryset.filter(status__in=ACTIVE_STATUSES).select_related('space').only(
+        'id', 'event_name', 'start_datetime', 'end_datetime', 'status', 'updated_at',
+        'space__name', 'space__location'
+    ).order_by('start_datetime', 'id')
+
+
+def calendar_response(request, kind, pk, load):
+    """
+    Serve an .ics feed for one space or user.
+
+    Feeds are cached under a version bumped whenever one of their events
+    changes, and the ETag is that version, so repeated polls are answered
+    from the cache (or with a 304) until something changes. Only on a miss
+    is load() called for the (calendar name, events queryset), or None for a
+    404; the VEVENTs are then streamed as they are read and the finished feed
+    is cached.
+    """
+    version = (get_version(CALENDAR_CACHE), get_version(feed_namespace(kind, pk)))
+    etag = make_etag(kind, pk, version)
+    unchanged = not_modified(request, etag)
+    if unchanged is not None:
+        return unchanged
+
+    key = f'{feed_namespace(kind, pk)}:{version[0]}:{version[1]}'
+    body = cache.get(key)
+    if body is not None:
+        return set_validators(HttpResponse(body, content_type=CONTENT_TYPE), etag)
+
+    loaded = load()
+    if loaded is None:
+        return HttpResponse('Calendar not found', status=404, content_type=CONTENT_TYPE)
+    name, queryset = loaded
+
+    def generate():
+        pieces = []
+        header = ''.join(fold(line) for line in [
+            'BEGIN:VCALENDAR',
+            'VERSION:2.0',
+            f'PRODID:{PRODID}',
+            'CALSCALE:GREGORIAN',
+            'METHOD:PUBLISH',
+            f'X-WR-CALNAME:{escape_text(name)}',
+        ])
+        pieces.append(header)
+        yield header
+        for event in feed_events(queryset).iterator(chunk_size=500):
+            piece = vevent(event)
+            pieces.append(piece)
+            yield piece
+        footer = fold('END:VCALENDAR')
+        pieces.append(footer)
+        yield footer
+        cache.set(key, ''.join(pieces), getattr(settings, 'CALENDAR_CACHE_TIMEOUT', 3600))
+
+    response = StreamingHttpResponse(generate(), content_type=CONTENT_TYPE)
+    return set_validators(response, etag)
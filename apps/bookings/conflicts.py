@@ -0,0 +1,95 @@
+from collections import defaultdict, namedtuple
+
+from .availability import ACTIVE_STATUSES, Interval, SpaceSchedule, availability_index
+from .models import Booking, Event
+
+# What a range ran into: a stored row (interval) or an earlier range of the
+# same batch (batch_key)
+Conflict = namedtuple('Conflict', ['interval', 'batch_key'])
+
+
+class ConflictEngine:
+    """
+    The one place that answers "what overlaps these ranges?" for a model with
+    space, start_datetime, end_datetime and status fields.
+
+    Every database lookup has the same shape,
+
+        space_id = %s AND status IN (<statuses>)
+        AND start_datetime < %s AND end_datetime > %s
+
+    which the partial (space, start_datetime) index on the active statuses
+    serves. Single lookups can be answered from an AvailabilityIndex first;
+    batches cost one such query per space over the hull of its ranges, and
+    the ranges are then resolved in memory.
+    """
+
+    def __init__(self, model, statuses=ACTIVE_STATUSES, index=None):
+        self.model = model
+        self.statuses = tuple(statuses)
+        self.index = index
+
+    def overlapping(self, space_id, start, end, exclude=()):
+        """Stored rows overlapping [start, end) on a space, earliest first"""
+        queryset = self.model._default_manager.filter(
+            space_id=space_id,
+            status__in=self.statuses,
+            start_datetime__lt=end,
+            end_datetime__gt=start
+        )
+        if exclude:
+            queryset = queryset.exclude(pk__in=exclude)
+        return queryset.order_by('start_datetime', 'pk')
+
+    def find(self, space_id, start, end, exclude=None, verify=False):
+        """
+        Earliest row overlapping [start, end) other than pk exclude, or None.
+        The index answers first. A "no" from it can lag behind other
+        processes' writes, so verify=True confirms it against the database;
+        callers that rely on the no-overlap constraint at insert time can
+        skip that query.
+        """
+        if self.index is not None:
+            conflict = self.index.find_conflict(space_id, start, end, statuses=self.statuses, exclude=exclude)
+            if conflict is not None or not verify:
+                return conflict
+        return self.overlapping(space_id, start, end, exclude=[exclude] if exclude else ()).first()
+
+    def find_many(self, ranges, exclude=()):
+        """
+        Check a batch of (key, space_id, start, end) ranges against the stored
+        rows, ignoring the pks in exclude (e.g. the rows the batch stands
+        for), and against each other. Inside the batch the earlier-starting
+        range keeps its slot, ties going to the earlier one in `ranges`.
+        Returns {key: Conflict} for the ranges that lose.
+        """
+        by_space = defaultdict(list)
+        for order, (key, space_id, start, end) in enumerate(ranges):
+            by_space[space_id].append((start, order, end, key))
+
+        conflicts = {}
+        for space_id, space_ranges in by_space.items():
+            rows = self.overlapping(
+                space_id,
+                min(start for start, _, _, _ in space_ranges),
+                max(end for _, _, end, _ in space_ranges),
+                exclude=exclude
+            ).order_by().values_list('id', 'event_name', 'start_datetime', 'end_datetime', 'status')
+            stored = SpaceSchedule(Interval(*row) for row in rows)
+
+            # Ranges are swept in start order, so one overlaps an accepted
+            # range exactly when it starts before the furthest end so far
+            reach = None
+            for start, _, end, key in sorted(space_ranges, key=lambda item: item[:2]):
+                interval = stored.find_conflict(start, end, statuses=self.statuses)
+                if interval is not None:
+                    conflicts[key] = Conflict(interval, None)
+                elif reach is not None and start < reach[0]:
+                    conflicts[key] = Conflict(None, reach[1])
+                elif reach is None or end > reach[0]:
+                    reach = (end, key)
+        return conflicts
+
+
+event_conflicts = ConflictEngine(Event, index=availability_index)
+booking_conflicts = ConflictEngine(Booking)
@@ -0,0 +1,147 @@
+from django.contrib.postgres.constraints import ExclusionConstraint
+from django.contrib.postgres.fields import DateTimeRangeField, RangeBoundary, RangeOperators
+from django.core.exceptions import ValidationError
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import Func, Q
+
+
+class TsTzRange(Func):
+    function = 'TSTZRANGE'
+    output_field = DateTimeRangeField()
+
+
+class NoOverlapConstraint(ExclusionConstraint):
+    """
+    Keep the active bookings of a space from overlapping.
+
+    On PostgreSQL this is a GiST exclusion constraint over
+    (space =, tstzrange(start_datetime, end_datetime, '[)') &&) restricted to
+    the given statuses; it needs the btree_gist extension. Other backends skip
+    the DDL: SQLite gets equivalent triggers from install_overlap_triggers(),
+    and model validation falls back to an overlap query.
+    """
+
+    def __init__(self, *, name, statuses, violation_error_message=None):
+        self.statuses = tuple(statuses)
+        super().__init__(
+            name=name,
+            expressions=[
+                (TsTzRange('start_datetime', 'end_datetime', RangeBoundary()), RangeOperators.OVERLAPS),
+                ('space', RangeOperators.EQUAL),
+            ],
+            condition=Q(status__in=self.statuses),
+            index_type='GIST',
+            violation_error_message=violation_error_message,
+        )
+
+    def constraint_sql(self, model, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return None
+        return super().constraint_sql(model, schema_editor)
+
+    def create_sql(self, model, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return None
+        return super().create_sql(model, schema_editor)
+
+    def remove_sql(self, model, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return None
+        return super().remove_sql(model, schema_editor)
+
+    def validate(self, model, instance, exclude=None, using=DEFAULT_DB_ALIAS):
+        if connections[using].vendor == 'postgresql':
+            return super().validate(model, instance, exclude=exclude, using=using)
+
+        if exclude and {'space', 'start_datetime', 'end_datetime', 'status'} & set(exclude):
+            return
+        if instance.status not in self.statuses:
+            return
+        if not (instance.space_id and instance.start_datetime and instance.end_datetime):
+            return
+        overlapping = model._default_manager.using(using).filter(
+            space_id=instance.space_id,
+            status__in=self.statuses,
+            start_datetime__lt=instance.end_datetime,
+            end_datetime__gt=instance.start_datetime
+        )
+        if not instance._state.adding:
+            overlapping = overlapping.exclude(pk=instance.pk)
+        if overlapping.exists():
+            raise ValidationError(self.get_violation_error_message())
+
+    def deconstruct(self):
+        path, args, kwargs = super().deconstruct()
+        kwargs = {'name': self.name, 'statuses': self.statuses}
+        if self.violation_error_message != self.default_violation_error_message:
+            kwargs['violation_error_message'] = self.violation_error_message
+        return path, args, kwargs
+
+
+def overlap_constraints(model):
+    return [
+        constraint for constraint in model._meta.constraints
+        if isinstance(constraint, NoOverlapConstraint)
+    ]
+
+
+def is_overlap_violation(exc, model):
+    """Whether an IntegrityError was raised by one of the model's NoOverlapConstraints"""
+    message = str(exc)
+    return any(constraint.name in message for constraint in overlap_constraints(model))
+
+
+OVERLAP_TRIGGER_SQL = '''
+CREATE TRIGGER IF NOT EXISTS "{name}_{action}" BEFORE {event} ON "{table}"
+WHEN NEW."{status}" IN ({statuses})
+BEGIN
+    SELECT RAISE(ABORT, '{name}')
+    WHERE EXISTS (
+        SELECT 1 FROM "{table}"
+        WHERE "{space}" = NEW."{space}"
+          AND "{status}" IN ({statuses})
+          AND "{start}" < NEW."{end}"
+          AND "{end}" > NEW."{start}"
+          {exclude_self}
+    );
+END
+'''
+
+
+def install_overlap_triggers(models, using=DEFAULT_DB_ALIAS):
+    """
+    SQLite stand-in for the PostgreSQL exclusion constraints: BEFORE INSERT and
+    BEFORE UPDATE triggers that abort with the constraint name, which surfaces
+    as an IntegrityError just like a violated constraint on PostgreSQL.
+    """
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return
+
+    existing_tables = set(connection.introspection.table_names())
+    with connection.cursor() as cursor:
+        for model in models:
+            if model._meta.db_table not in existing_tables:
+                continue
+            columns = {
+                field: model._meta.get_field(field).column
+                for field in ('space', 'status', 'start_datetime', 'end_datetime')
+            }
+            for constraint in overlap_constraints(model):
+                statuses = ', '.join(f"'{value}'" for value in constraint.statuses)
+                for action, event, exclude_self in [
+                    ('insert', 'INSERT', ''),
+                    ('update', 'UPDATE', f'AND "{model._meta.pk.column}" != NEW."{model._meta.pk.column}"'),
+                ]:
+                    cursor.execute(OVERLAP_TRIGGER_SQL.format(
+                        name=constraint.name,
+                        action=action,
+                        event=event,
+                        table=model._meta.db_table,
+                        statuses=statuses,
+                        space=columns['space'],
+                        status=columns['status'],
+                        start=columns['start_datetime'],
+                        end=columns['end_datetime'],
+                        exclude_self=exclude_self,
+                    ))
@@ -0,0 +1,144 @@
+import logging
+
+from django.conf import settings
+from django.core.mail import EmailMessage, EmailMultiAlternatives
+from django.db import transaction
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+def display_name(user):
+    """Full name of a user whether get_full_name is a method or a property"""
+    full_name = getattr(user, 'get_full_name', None)
+    if callable(full_name):
+        full_name = full_name()
+    return full_name or getattr(user, 'username', None) or user.email
+
+
+def booking_submitted_messages(event):
+    """Emails telling the user, space organizer and admin about a new booking"""
+    space = event.space
+    user = event.user
+    start_time = timezone.localtime(event.start_datetime)
+    end_time = timezone.localtime(event.end_datetime)
+    subject = f'Event Booking Submitted: {event.event_name}'
+    
+    # Plain text version (fallback)
+    message = (
+        f'Your event "{event.event_name}" has been submitted and is pending approval.\n'
+        f'Space: {space.name}\n'
+        f'Start: {start_time}\n'
+        f'End: {end_time}\n'
+        f'Status: pending\n'
+        f'You will be notified once an admin approves your event.\n'
+    )
+    
+    user_email = user.email
+    organizer_email = getattr(space.organizer, 'email', None)
+    admin_email = getattr(settings, 'ADMIN_EMAIL', None)
+
+    messages = []
+
+    # Send to user with HTML
+    if user_email:
+        context = {
+            'subject': subject,
+            'user_name': display_name(user),
+            'event_name': event.event_name,
+            'space_name': space.name,
+            'start_datetime': start_time,
+            'end_datetime': end_time,
+        }
+        email_message = EmailMultiAlternatives(
+            subject=subject,
+            body=message,
+            from_email=settings.DEFAULT_FROM_EMAIL,
+            to=[user_email]
+        )
+        email_message.attach_alternative(render_to_string('emails/booking_submitted.html', context), "text/html")
+        messages.append(email_message)
+
+    # Send to others (organizer, admin) without HTML template
+    other_recipients = [email for email in [organizer_email, admin_email] if email]
+    if other_recipients:
+        messages.append(EmailMessage(subject, message, settings.DEFAULT_FROM_EMAIL, other_recipients))
+
+    return messages
+
+
+def booking_series_submitted_messages(event):
+    """One digest for every occurrence of a recurring booking, sent for its first occurrence"""
+    from .models import Event
+
+    space = event.space
+    user = event.user
+    series = list(
+        Event.objects.filter(series=event.series).order_by('start_datetime')
+        .values_list('start_datetime', 'end_datetime')
+    )
+    subject = f'Recurring Booking Submitted: {event.event_name}'
+    lines = [
+        f'- {timezone.localtime(start):%Y-%m-%d %H:%M} to {timezone.localtime(end):%H:%M}'
+        for start, end in series
+    ]
+    message = (
+        f'Your recurring event "{event.event_name}" has been submitted and is pending approval.\n'
+        f'Space: {space.name}\n'
+        f'Occurrences ({len(series)}):\n'
+        + '\n'.join(lines) + '\n'
+        f'You will be notified once an admin approves your events.\n'
+    )
+
+    messages = []
+    if user.email:
+        messages.append(EmailMessage(subject, message, settings.DEFAULT_FROM_EMAIL, [user.email]))
+    other_recipients = [
+        email for email in [getattr(space.organizer, 'email', None), getattr(settings, 'ADMIN_EMAIL', None)]
+        if email
+    ]
+    if other_recipients:
+        messages.append(EmailMessage(subject, message, settings.DEFAULT_FROM_EMAIL, other_recipients))
+    return messages
+
+
+def booking_approved_messages(event):
+    from apps.notifications.views import booking_approved_message
+
+    return [booking_approved_message(event, event.space, event.user)]
+
+
+# Outbox kind -> function building the messages for an event. Each must
+# return them in a stable order: a retried outbox row skips the ones the
+# mail server already accepted by position.
+EMAIL_BUILDERS = {
+    'booking_submitted': booking_submitted_messages,
+    'booking_approved': booking_approved_messages,
+    'booking_series_submitted': booking_series_submitted_messages,
+}
+
+
+def queue_booking_email(kind, event):
+    """
+    Write an outbox row in the caller's transaction and ask a worker to drain
+    the outbox once it commits. If the broker is unreachable the periodic
+    drain picks the row up instead.
+    """
+    queue_booking_emails(kind, [event])
+
+
+def queue_booking_emails(kind, events):
+    """Queue one email of the given kind per event with a single insert"""
+    from .models import EmailOutbox
+    from .tasks import drain_email_outbox
+
+    EmailOutbox.objects.bulk_create([EmailOutbox(kind=kind, event=event) for event in events])
+
+    def kick_drain():
+        try:
+            drain_email_outbox.delay()
+        except Exception:
+            logger.warning('Could not schedule the email outbox drain', exc_info=True)
+
+    transaction.on_commit(kick_drain)
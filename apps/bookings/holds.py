@@ -0,0 +1,133 @@
+import time
+import uuid
+from collections import namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+# Seconds a space's hold registry may stay locked by a crashed writer
+LOCK_TIMEOUT = 5
+LOCK_WAIT = 1
+LOCK_POLL_INTERVAL = 0.01
+
+Hold = namedtuple('Hold', ['token', 'space_id', 'user_id', 'start_datetime', 'end_datetime', 'expires_at'])
+
+
+class HoldsBusy(Exception):
+    """The space's hold registry stayed locked for longer than LOCK_WAIT"""
+
+
+def hold_key(token):
+    return f'holds:hold:{token}'
+
+
+def registry_key(space_id):
+    return f'holds:space:{space_id}'
+
+
+def hold_ttl(minutes=None):
+    """Requested hold length in seconds, capped at BOOKING_HOLD_MAX_MINUTES"""
+    default = getattr(settings, 'BOOKING_HOLD_MINUTES', 10)
+    maximum = getattr(settings, 'BOOKING_HOLD_MAX_MINUTES', 30)
+    return int(min(minutes or default, maximum) * 60)
+
+
+def active_holds(space_id, now=None):
+    """
+    Unexpired holds on a space, read from its registry in one cache get.
+    Expired entries are filtered out here rather than by a sweeper; each
+    hold's own key also expires on its own.
+    """
+    now = now or timezone.now()
+    registry = cache.get(registry_key(space_id)) or {}
+    return [hold for hold in registry.values() if hold.expires_at > now]
+
+
+def find_hold_conflict(space_id, start, end, user_id=None, now=None):
+    """Earliest-starting hold by someone other than user_id overlapping [start, end)"""
+    overlapping = [
+        hold for hold in active_holds(space_id, now)
+        if hold.user_id != user_id and hold.start_datetime < end and hold.end_datetime > start
+    ]
+    return min(overlapping, key=lambda hold: hold.start_datetime, default=None)
+
+
+def get_hold(token):
+    return cache.get(hold_key(token))
+
+
+def hold_covers(hold, user_id, space_id, start, end):
+    """Whether a hold lets user_id book [start, end) on space_id"""
+    return (
+        hold.user_id == user_id and hold.space_id == space_id
+        and hold.start_datetime <= start and hold.end_datetime >= end
+    )
+
+
+def _update_registry(space_id, update):
+    """
+    Apply update(holds) -> (holds, result) to a space's registry while
+    holding its cache.add() lock, and return result. Raises HoldsBusy when
+    the lock cannot be taken in time.
+    """
+    lock_key = f'{registry_key(space_id)}:lock'
+    deadline = time.monotonic() + LOCK_WAIT
+    while not cache.add(lock_key, 1, LOCK_TIMEOUT):
+        if time.monotonic() >= deadline:
+            raise HoldsBusy(space_id)
+        time.sleep(LOCK_POLL_INTERVAL)
+    try:
+        now = timezone.now()
+        holds = {hold.token: hold for hold in active_holds(space_id, now)}
+        holds, result = update(holds, now)
+        if holds:
+            timeout = (max(hold.expires_at for hold in holds.values()) - now).total_seconds()
+            cache.set(registry_key(space_id), holds, max(int(timeout) + 1, 1))
+        else:
+            cache.delete(registry_key(space_id))
+        return result
+    finally:
+        cache.delete(lock_key)
+
+
+def place_hold(user, space_id, start, end, minutes=None):
+    """
+    Reserve [start, end) on a space for user for a few minutes.
+    Returns (hold, None), or (None, conflicting hold) when someone else holds
+    an overlapping range. The user's own overlapping holds are replaced.
+    """
+    ttl = hold_ttl(minutes)
+
+    def update(holds, now):
+        for hold in holds.values():
+            if hold.user_id != user.pk and hold.start_datetime < end and hold.end_datetime > start:
+                return holds, (None, hold)
+        holds = {
+            token: hold for token, hold in holds.items()
+            if not (hold.user_id == user.pk and hold.start_datetime < end and hold.end_datetime > start)
+        }
+        hold = Hold(uuid.uuid4().hex, space_id, user.pk, start, end, now + timedelta(seconds=ttl))
+        # SET NX: a token is only ever issued once
+        if not cache.add(hold_key(hold.token), hold, ttl):
+            raise HoldsBusy(space_id)
+        holds[hold.token] = hold
+        return holds, (hold, None)
+
+    return _update_registry(space_id, update)
+
+
+def release_hold(hold):
+    """Drop a hold, e.g. once its booking went through"""
+    cache.delete(hold_key(hold.token))
+
+    def update(holds, now):
+        holds.pop(hold.token, None)
+        return holds, None
+
+    try:
+        _update_registry(hold.space_id, update)
+    except HoldsBusy:
+        # The registry entry expires with the hold anyway
+        pass
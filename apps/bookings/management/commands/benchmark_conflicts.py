@@ -0,0 +1,131 @@
+import random
+import statistics
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from apps.authentication.models import User
+from apps.bookings.conflicts import event_conflicts
+from apps.bookings.models import Event
+from apps.spaces.models import Space
+
+
+class Rollback(Exception):
+    """Raised to throw away the seeded benchmark data"""
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed spaces and events inside a transaction, time the conflict engine '
+        '(one query per range vs. the batch API), print the query plan of its '
+        'lookup and roll everything back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--spaces', type=int, default=200)
+        parser.add_argument('--events', type=int, default=100000)
+        parser.add_argument('--ranges', type=int, default=500)
+        parser.add_argument('--runs', type=int, default=5)
+        parser.add_argument('--batch-size', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.seed(options['spaces'], options['events'], options['batch_size'])
+                self.run(options['ranges'], options['runs'])
+                raise Rollback
+        except Rollback:
+            self.stdout.write('Seed data rolled back.')
+
+    def seed(self, space_count, event_count, batch_size):
+        started = time.perf_counter()
+        user = User.objects.create_user(
+            email='benchmark@example.com',
+            first_name='Benchmark',
+            last_name='User',
+            password=None
+        )
+        Space.objects.bulk_create(
+            [
+                Space(name=f'Benchmark space {index}', location='Benchmark', capacity=20, price_per_hour=100)
+                for index in range(space_count)
+            ],
+            batch_size=batch_size
+        )
+        self.space_ids = list(Space.objects.filter(location='Benchmark').values_list('id', flat=True))
+
+        # Back-to-back two hour slots per space, so no space has overlapping
+        # active events and roughly half of them are active
+        self.origin = timezone.now().replace(minute=0, second=0, microsecond=0) - timedelta(days=30)
+        statuses = ['confirmed', 'pending', 'completed', 'cancelled']
+        self.per_space = max(1, event_count // max(1, len(self.space_ids)))
+        batch = []
+        for space_id in self.space_ids:
+            for slot in range(self.per_space):
+                start = self.origin + timedelta(hours=2 * slot)
+                batch.append(Event(
+                    event_name='Benchmark event',
+                    start_datetime=start,
+                    end_datetime=start + timedelta(hours=2),
+                    organizer_name='Benchmark',
+                    organizer_email='benchmark@example.com',
+                    status=statuses[slot % len(statuses)],
+                    user=user,
+                    space_id=space_id,
+                ))
+                if len(batch) >= batch_size:
+                    Event.objects.bulk_create(batch)
+                    batch = []
+        if batch:
+            Event.objects.bulk_create(batch)
+
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+        self.stdout.write(
+            f'Seeded {len(self.space_ids)} spaces and {self.per_space * len(self.space_ids)} events '
+            f'in {time.perf_counter() - started:.1f}s'
+        )
+
+    def sample_ranges(self, count):
+        """A semester-style batch: ranges clustered on a few spaces over a few weeks"""
+        spaces = random.sample(self.space_ids, min(len(self.space_ids), 10))
+        horizon = max(1, min(self.per_space * 2, 24 * 21))
+        ranges = []
+        for key in range(count):
+            start = self.origin + timedelta(hours=random.randrange(horizon))
+            ranges.append((key, random.choice(spaces), start, start + timedelta(hours=1)))
+        return ranges
+
+    def run(self, range_count, runs):
+        key, space_id, start, end = self.sample_ranges(1)[0]
+        self.stdout.write('Lookup plan:')
+        self.stdout.write(event_conflicts.overlapping(space_id, start, end).explain())
+
+        single, batched = [], []
+        for _ in range(runs):
+            ranges = self.sample_ranges(range_count)
+
+            started = time.perf_counter()
+            one_by_one = {
+                key for key, space_id, start, end in ranges
+                if event_conflicts.overlapping(space_id, start, end).exists()
+            }
+            single.append((time.perf_counter() - started) * 1000)
+
+            started = time.perf_counter()
+            conflicts = event_conflicts.find_many(ranges)
+            batched.append((time.perf_counter() - started) * 1000)
+
+            # The batch also rejects ranges overlapping each other, so it
+            # can only ever reject more
+            assert one_by_one <= set(conflicts)
+
+        for name, timings in [('query per range', single), ('find_many', batched)]:
+            self.stdout.write(
+                f'{name}: ranges={range_count} runs={runs} '
+                f'median={statistics.median(timings):.2f}ms max={max(timings):.2f}ms'
+            )
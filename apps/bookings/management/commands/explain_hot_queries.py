@@ -0,0 +1,172 @@
+import random
+import time
+from datetime import timedelta
+from types import SimpleNamespace
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from apps.authentication.models import User
+from apps.bookings.conflicts import event_conflicts
+from apps.bookings.models import Event
+from apps.bookings.pagination import KeysetPagination
+from apps.bookings.services import complete_ended_events_sql, free_idle_spaces_sql
+from apps.bookings.tasks import completion_horizon
+from apps.bookings.views import ListMyEventsView, ListUpcomingEventsView
+from apps.spaces.models import Space
+
+
+class Rollback(Exception):
+    """Raised to throw away the seeded data"""
+
+
+def full_scans(plan, table):
+    """Lines of a query plan that read the whole of `table`"""
+    if connection.vendor == 'postgresql':
+        marker = f'Seq Scan on {table}'
+        return [line for line in plan if marker in line]
+    # SQLite: "SCAN <table>" walks the table (or an index) end to end, while
+    # "SEARCH <table> USING INDEX ..." seeks into it
+    return [line for line in plan if line.strip().startswith(f'SCAN {table}')]
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed spaces and events inside a transaction, EXPLAIN the hot booking '
+        'queries (booking conflict, upcoming list, my events, status sweep) and '
+        'fail if any of them falls back to a sequential scan of the events table. '
+        'Everything is rolled back afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--spaces', type=int, default=5000)
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--events', type=int, default=1000000)
+        parser.add_argument('--batch-size', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        if connection.vendor not in ('postgresql', 'sqlite'):
+            raise CommandError(f'Query plans are not checked on {connection.vendor}')
+
+        try:
+            with transaction.atomic():
+                self.seed(options['spaces'], options['users'], options['events'], options['batch_size'])
+                failures = self.explain_all()
+                raise Rollback
+        except Rollback:
+            self.stdout.write('Seed data rolled back.')
+
+        if failures:
+            raise CommandError(
+                'Sequential scan of the events table in: ' + ', '.join(failures)
+            )
+        self.stdout.write(self.style.SUCCESS('Every hot query uses an index.'))
+
+    def seed(self, space_count, user_count, event_count, batch_size):
+        started = time.perf_counter()
+        User.objects.bulk_create(
+            [
+                User(email=f'explain-{index}@example.com', first_name='Explain', last_name=str(index))
+                for index in range(user_count)
+            ],
+            batch_size=batch_size
+        )
+        self.user_ids = list(User.objects.filter(email__startswith='explain-').values_list('id', flat=True))
+        Space.objects.bulk_create(
+            [
+                Space(name=f'Explain space {index}', location='Explain', capacity=20, price_per_hour=100)
+                for index in range(space_count)
+            ],
+            batch_size=batch_size
+        )
+        self.space_ids = list(Space.objects.filter(location='Explain').values_list('id', flat=True))
+
+        # Back-to-back two hour slots per space, half of them in the past.
+        # Past events are mostly completed, with the last hour still waiting
+        # for the sweep; future ones are confirmed or pending.
+        self.now = timezone.now()
+        per_space = max(1, event_count // max(1, len(self.space_ids)))
+        origin = self.now.replace(minute=0, second=0, microsecond=0) - timedelta(hours=per_space)
+        batch = []
+        for space_id in self.space_ids:
+            for slot in range(per_space):
+                start = origin + timedelta(hours=2 * slot)
+                end = start + timedelta(hours=2)
+                if end <= self.now - timedelta(hours=2):
+                    status = 'cancelled' if slot % 10 == 0 else 'completed'
+                else:
+                    status = 'pending' if slot % 3 == 0 else 'confirmed'
+                batch.append(Event(
+                    event_name='Explain event',
+                    start_datetime=start,
+                    end_datetime=end,
+                    organizer_name='Explain',
+                    organizer_email='explain@example.com',
+                    status=status,
+                    user_id=random.choice(self.user_ids),
+                    space_id=space_id,
+                ))
+                if len(batch) >= batch_size:
+                    Event.objects.bulk_create(batch)
+                    batch = []
+        if batch:
+            Event.objects.bulk_create(batch)
+
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        self.stdout.write(
+            f'Seeded {len(self.user_ids)} users, {len(self.space_ids)} spaces and '
+            f'{per_space * len(self.space_ids)} events in {time.perf_counter() - started:.1f}s'
+        )
+
+    def hot_queries(self):
+        """(name, sql, params) of every statement whose plan is checked"""
+        now = self.now
+        space_id = random.choice(self.space_ids)
+        user = User.objects.get(pk=random.choice(self.user_ids))
+        page = KeysetPagination.page_size + 1
+
+        upcoming = ListUpcomingEventsView().get_queryset().order_by('start_datetime', 'id')
+        my_events = ListMyEventsView(request=SimpleNamespace(user=user)).get_queryset().order_by('start_datetime', 'id')
+        # The page after the first one, filtered the way KeysetPagination does
+        start, pk = next(iter(upcoming.values_list('start_datetime', 'id')[page:page + 1]), (now, 0))
+        querysets = [
+            ('booking conflict', event_conflicts.overlapping(space_id, now, now + timedelta(hours=1))),
+            ('upcoming list', upcoming[:page]),
+            ('upcoming list (next page)', upcoming.filter(
+                Q(start_datetime__gt=start) | Q(start_datetime=start, id__gt=pk)
+            )[:page]),
+            ('my events', my_events[:page]),
+            ('ending soon', Event.objects.filter(
+                status='confirmed',
+                end_datetime__gte=now,
+                end_datetime__lte=completion_horizon(now)
+            ).only('id', 'status', 'end_datetime')),
+        ]
+        queries = [(name, *queryset.query.sql_with_params()) for name, queryset in querysets]
+        queries.append(('status sweep', *complete_ended_events_sql(now, since=now - timedelta(hours=1))))
+        queries.append(('free idle spaces', *free_idle_spaces_sql([space_id], now)))
+        return queries
+
+    def explain(self, sql, params):
+        prefix = 'EXPLAIN ' if connection.vendor == 'postgresql' else 'EXPLAIN QUERY PLAN '
+        with connection.cursor() as cursor:
+            cursor.execute(prefix + sql, params)
+            # PostgreSQL returns one text line per row, SQLite (id, parent, notused, detail)
+            return [str(row[-1]) for row in cursor.fetchall()]
+
+    def explain_all(self):
+        table = Event._meta.db_table
+        failures = []
+        for name, sql, params in self.hot_queries():
+            plan = self.explain(sql, params)
+            scans = full_scans(plan, table)
+            verdict = self.style.ERROR('SEQ SCAN') if scans else self.style.SUCCESS('ok')
+            self.stdout.write(f'{name}: {verdict}')
+            for line in plan:
+                self.stdout.write(f'    {line}')
+            if scans:
+                failures.append(name)
+        return failures
@@ -0,0 +1,65 @@
+# Generated by Django 4.2.30 on 2026-10-16 23:51
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('spaces', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Event',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_name', models.CharField(max_length=200)),
+                ('start_datetime', models.DateTimeField()),
+                ('end_datetime', models.DateTimeField()),
+                ('organizer_name', models.CharField(max_length=100)),
+                ('organizer_email', models.EmailField(max_length=254)),
+                ('event_type', models.CharField(choices=[('meeting', 'Meeting'), ('conference', 'Conference'), ('webinar', 'Webinar'), ('workshop', 'Workshop')], default='meeting', help_text='Type of event being booked', max_length=50)),
+                ('attendance', models.PositiveIntegerField(blank=True, help_text='Expected number of attendees', null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('confirmed', 'Confirmed'), ('cancelled', 'Cancelled'), ('completed', 'Completed'), ('rejected', 'Rejected')], default='pending', help_text='Status of the event', max_length=20)),
+                ('space', models.ForeignKey(help_text='Space where the event will be held', on_delete=django.db.models.deletion.CASCADE, related_name='events', to='spaces.space')),
+                ('user', models.ForeignKey(help_text='User who created the event', on_delete=django.db.models.deletion.CASCADE, related_name='events', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['start_datetime'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Booking',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_name', models.CharField(max_length=255)),
+                ('start_datetime', models.DateTimeField()),
+                ('end_datetime', models.DateTimeField()),
+                ('organizer_name', models.CharField(max_length=255)),
+                ('organizer_email', models.EmailField(max_length=254)),
+                ('event_type', models.CharField(choices=[('internal', 'Internal Event'), ('external', 'External Event'), ('conference', 'Conference'), ('workshop', 'Workshop'), ('meeting', 'Meeting'), ('other', 'Other')], max_length=50)),
+                ('attendance', models.PositiveIntegerField(help_text='Expected number of attendees')),
+                ('required_resources', models.TextField(blank=True, help_text='Required resources for the event (comma separated)', null=True)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('confirmed', 'Confirmed'), ('cancelled', 'Cancelled'), ('completed', 'Completed')], default='pending', max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('space', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='spaces.space')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-start_datetime'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='booking',
+            constraint=models.CheckConstraint(check=models.Q(('start_datetime__lt', models.F('end_datetime'))), name='start_before_end'),
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 4.2.30 on 2026-10-16 23:51
+
+import apps.bookings.constraints
+from django.db import migrations
+from django.db.models import Exists, OuterRef
+
+from apps.bookings.operations import BtreeGistExtensionOnPostgres
+
+# Frozen copy of apps.bookings.availability.ACTIVE_STATUSES
+ACTIVE_STATUSES = ('pending', 'confirmed')
+REPORT_LIMIT = 50
+
+
+def check_no_overlaps(apps, schema_editor):
+    """
+    Refuse to add the no-overlap constraints while active rows already
+    overlap, listing them so they can be cancelled or moved first; adding
+    the constraint would fail on PostgreSQL anyway, with less to go on.
+    """
+    problems = []
+    for model_name in ('Event', 'Booking'):
+        model = apps.get_model('bookings', model_name)
+        active = model.objects.using(schema_editor.connection.alias).filter(status__in=ACTIVE_STATUSES)
+        overlapping = active.filter(
+            space=OuterRef('space'),
+            start_datetime__lt=OuterRef('end_datetime'),
+            end_datetime__gt=OuterRef('start_datetime')
+        ).exclude(pk=OuterRef('pk'))
+        rows = active.filter(Exists(overlapping)).order_by('space', 'start_datetime', 'pk').values_list(
+            'pk', 'space', 'start_datetime', 'end_datetime', 'status'
+        )
+        count = rows.count()
+        if count:
+            problems.append(f'{count} overlapping active {model._meta.db_table} rows:')
+            problems.extend(
+                f'  id={pk} space={space} {start:%Y-%m-%d %H:%M} - {end:%Y-%m-%d %H:%M} ({status})'
+                for pk, space, start, end, status in rows[:REPORT_LIMIT]
+            )
+    if problems:
+        raise RuntimeError(
+            'Cancel or move these before migrating, so that no space has two '
+            'pending/confirmed bookings at the same time:\n' + '\n'.join(problems)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0002_emailoutbox_taskwatermark_bookingticket_series'),
+    ]
+
+    operations = [
+        BtreeGistExtensionOnPostgres(),
+        migrations.RunPython(check_no_overlaps, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='booking',
+            constraint=apps.bookings.constraints.NoOverlapConstraint(name='bookings_booking_no_overlap', statuses=('pending', 'confirmed'), violation_error_message='This space is already booked during the selected time period'),
+        ),
+        migrations.AddConstraint(
+            model_name='event',
+            constraint=apps.bookings.constraints.NoOverlapConstraint(name='bookings_event_no_overlap', statuses=('pending', 'confirmed'), violation_error_message='Space already booked for this time'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.30 on 2026-10-16 23:51
+
+from django.db import migrations, models
+
+from apps.bookings.operations import AddIndexConcurrentlyOnPostgres
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('bookings', '0003_no_overlap_constraints'),
+    ]
+
+    operations = [
+        AddIndexConcurrentlyOnPostgres(
+            model_name='booking',
+            index=models.Index(condition=models.Q(('status__in', ('pending', 'confirmed'))), fields=['space', 'start_datetime', 'end_datetime'], name='bookings_booking_active_span'),
+        ),
+        AddIndexConcurrentlyOnPostgres(
+            model_name='event',
+            index=models.Index(condition=models.Q(('status__in', ('pending', 'confirmed'))), fields=['space', 'start_datetime', 'end_datetime'], name='bookings_event_active_span'),
+        ),
+        AddIndexConcurrentlyOnPostgres(
+            model_name='event',
+            index=models.Index(fields=['status', 'start_datetime', 'id'], name='bookings_event_status_start'),
+        ),
+        AddIndexConcurrentlyOnPostgres(
+            model_name='event',
+            index=models.Index(fields=['user', 'start_datetime', 'id'], name='bookings_event_user_start'),
+        ),
+        AddIndexConcurrentlyOnPostgres(
+            model_name='event',
+            index=models.Index(fields=['status', 'end_datetime'], name='bookings_event_status_end'),
+        ),
+    ]
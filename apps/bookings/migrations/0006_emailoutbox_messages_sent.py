@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-17 00:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0005_emailoutbox_lease'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='emailoutbox',
+            name='messages_sent',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -1,8 +1,13 @@
+import uuid
+from datetime import timedelta
+
 from django.db import models
 from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.utils import timezone
 from apps.spaces.models import Space
+from .availability import ACTIVE_STATUSES
+from .constraints import NoOverlapConstraint
 
 class Event(models.Model):
     event_name = models.CharField(max_length=200)
@@ -74,6 +79,12 @@ class Event(models.Model):
         related_name='events',
         help_text="Space where the event will be held"
     )
+    series = models.UUIDField(
+        null=True,
+        blank=True,
+        db_index=True,
+        help_text="Shared by the occurrences of a recurring booking"
+    )
 
     def clean(self):
         if self.start_datetime and self.end_datetime:
@@ -91,6 +102,27 @@ class Event(models.Model):
 
     class Meta:
         ordering = ['start_datetime']
+        indexes = [
+            # Serves the conflict engine's lookup (apps.bookings.conflicts)
+            models.Index(
+                fields=['space', 'start_datetime', 'end_datetime'],
+                name='bookings_event_active_span',
+                condition=models.Q(status__in=ACTIVE_STATUSES)
+            ),
+            # Upcoming events and pending reminders, paged on (start, id)
+            models.Index(fields=['status', 'start_datetime', 'id'], name='bookings_event_status_start'),
+            # My events, paged on (start, id)
+            models.Index(fields=['user', 'start_datetime', 'id'], name='bookings_event_user_start'),
+            # Completion sweep and ending-soon scheduling
+            models.Index(fields=['status', 'end_datetime'], name='bookings_event_status_end'),
+        ]
+        constraints = [
+            NoOverlapConstraint(
+                name='bookings_event_no_overlap',
+                statuses=ACTIVE_STATUSES,
+                violation_error_message='Space already booked for this time'
+            ),
+        ]
 
 class Booking(models.Model):
     STATUS_CHOICES = [
@@ -128,10 +160,105 @@ class Booking(models.Model):
         
     class Meta:
         ordering = ['-start_datetime']
+        indexes = [
+            models.Index(
+                fields=['space', 'start_datetime', 'end_datetime'],
+                name='bookings_booking_active_span',
+                condition=models.Q(status__in=ACTIVE_STATUSES)
+            ),
+        ]
         # Ensure no double bookings for the same space
         constraints = [
             models.CheckConstraint(
                 check=models.Q(start_datetime__lt=models.F('end_datetime')),
                 name='start_before_end'
-            )
-        ]
\ No newline at end of file
+            ),
+            NoOverlapConstraint(
+                name='bookings_booking_no_overlap',
+                statuses=ACTIVE_STATUSES,
+                violation_error_message='This space is already booked during the selected time period'
+            ),
+        ]
+
+
+class EmailOutbox(models.Model):
+    """
+    Booking emails written in the same transaction as the booking itself and
+    rendered/sent after commit by apps.bookings.tasks.drain_email_outbox.
+    """
+    KIND_CHOICES = [
+        ('booking_submitted', 'Booking Submitted'),
+        ('booking_approved', 'Booking Approved'),
+        ('booking_series_submitted', 'Booking Series Submitted'),
+    ]
+
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+
+    # Sending attempts before a message is given up on
+    MAX_ATTEMPTS = 5
+    # How long a drain owns the rows it claimed; 'sending' rows whose lease
+    # ran out (e.g. the worker died) are claimed again
+    LEASE = timedelta(minutes=10)
+
+    kind = models.CharField(max_length=50, choices=KIND_CHOICES)
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='outbox_emails')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    # Messages of the row the mail server already accepted, skipped on retry
+    messages_sent = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    claimed_until = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.get_kind_display()} for event {self.event_id} ({self.status})"
+
+    class Meta:
+        ordering = ['id']
+
+
+class TaskWatermark(models.Model):
+    """High-water mark of a periodic task that only looks at rows changed since its last run"""
+    name = models.CharField(max_length=100, unique=True)
+    value = models.DateTimeField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} @ {self.value}"
+
+
+class BookingTicket(models.Model):
+    """
+    A booking request accepted in async mode and processed by the Celery
+    partition that owns its space (see apps.bookings.partitions).
+    """
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('booked', 'Booked'),
+        ('rejected', 'Rejected'),
+        ('failed', 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='booking_tickets')
+    space = models.ForeignKey(Space, on_delete=models.CASCADE, related_name='booking_tickets')
+    payload = models.JSONField(help_text="Booking request as submitted")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    result = models.JSONField(default=dict, blank=True)
+    event = models.ForeignKey(Event, on_delete=models.SET_NULL, null=True, blank=True, related_name='tickets')
+    callback_url = models.URLField(blank=True, default='', help_text="Notified with the result once processed")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Ticket {self.id} ({self.status})"
+
+    class Meta:
+        ordering = ['-created_at']
+
@@ -0,0 +1,92 @@
+import base64
+import json
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination keyed on (start_datetime, id).
+
+    Each page is one indexed range query that continues after the last row of
+    the previous page, so deep pages cost the same as the first one and rows
+    inserted meanwhile neither repeat nor get skipped. The cursor is an opaque
+    base64 token. The total count is computed for the first page (where the
+    listings always returned it) and for later pages only with ?count=true.
+    A view that already knows the total can set count_hint to skip the COUNT.
+    """
+    page_size = 20
+    max_limit = 100
+    limit_query_param = 'limit'
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    count_hint = None
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.limit = self.get_limit(request)
+        position = self.decode_cursor(request)
+
+        queryset = queryset.order_by('start_datetime', 'id')
+        remaining = queryset
+        if position is not None:
+            start, pk = position
+            remaining = queryset.filter(Q(start_datetime__gt=start) | Q(start_datetime=start, id__gt=pk))
+
+        page = list(remaining[:self.limit + 1])
+        self.has_next = len(page) > self.limit
+        page = page[:self.limit]
+        self.next_position = self.get_position(page[-1]) if self.has_next else None
+
+        if position is None and not self.has_next:
+            # A first page that is not full already holds every row
+            self.count = len(page)
+        elif position is None or request.query_params.get(self.count_query_param, '').lower() in ('1', 'true', 'yes'):
+            self.count = self.count_hint if self.count_hint is not None else queryset.count()
+        else:
+            self.count = None
+        return page
+
+    @staticmethod
+    def get_position(row):
+        # Pages hold model instances or, for values() querysets, dicts
+        if isinstance(row, dict):
+            return row['start_datetime'], row['id']
+        return row.start_datetime, row.pk
+
+    def get_limit(self, request):
+        try:
+            limit = int(request.query_params[self.limit_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(limit, 1), self.max_limit)
+
+    def encode_cursor(self, position):
+        start, pk = position
+        token = json.dumps([start.isoformat(), pk]).encode()
+        return base64.urlsafe_b64encode(token).decode().rstrip('=')
+
+    def decode_cursor(self, request):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+        try:
+            raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+            start, pk = json.loads(raw)
+            start = parse_datetime(start)
+            if start is None or not isinstance(pk, int):
+                raise ValueError
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        return start, pk
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.next_position))
@@ -0,0 +1,44 @@
+import hashlib
+from bisect import bisect
+from functools import lru_cache
+
+from django.conf import settings
+
+
+def _hash(value):
+    return int.from_bytes(hashlib.md5(str(value).encode()).digest()[:8], 'big')
+
+
+class HashRing:
+    """
+    Consistent hash ring over a set of nodes. Every node owns `replicas`
+    points on the ring and a key goes to the first point at or after its
+    hash, so adding or removing a node only moves about 1/N of the keys.
+    """
+
+    def __init__(self, nodes, replicas=64):
+        if not nodes:
+            raise ValueError('A hash ring needs at least one node')
+        self._points = sorted(
+            (_hash(f'{node}:{replica}'), node)
+            for node in nodes
+            for replica in range(replicas)
+        )
+        self._hashes = [point for point, _ in self._points]
+
+    def node_for(self, key):
+        index = bisect(self._hashes, _hash(key)) % len(self._points)
+        return self._points[index][1]
+
+
+@lru_cache(maxsize=8)
+def _ring(prefix, partitions):
+    return HashRing([f'{prefix}.p{number}' for number in range(partitions)])
+
+
+def queue_for_space(space_id):
+    """Celery queue of the partition that serialises bookings for a space"""
+    return _ring(
+        getattr(settings, 'BOOKING_QUEUE_PREFIX', 'bookings'),
+        getattr(settings, 'BOOKING_QUEUE_PARTITIONS', 4)
+    ).node_for(space_id)
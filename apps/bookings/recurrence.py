@@ -0,0 +1,227 @@
+import calendar
+import re
+from collections import namedtuple
+from datetime import date, timedelta
+from itertools import islice
+from math import gcd
+
+from dateutil.parser import isoparse
+from dateutil.rrule import rrule, rrulestr
+from django.conf import settings
+from django.utils import timezone
+
+FREQUENCIES = ('YEARLY', 'MONTHLY', 'WEEKLY', 'DAILY', 'HOURLY', 'MINUTELY')
+WEEKDAYS = ['MO', 'TU', 'WE', 'TH', 'FR', 'SA', 'SU']
+BYDAY_RE = re.compile(r'^([+-]?\d{1,2})?(MO|TU|WE|TH|FR|SA|SU)$')
+# name: (lowest, highest, negative values count from the end)
+BY_RANGES = {
+    'BYMONTH': (1, 12, False),
+    'BYMONTHDAY': (1, 31, True),
+    'BYYEARDAY': (1, 366, True),
+    'BYWEEKNO': (1, 53, True),
+    'BYHOUR': (0, 23, False),
+    'BYMINUTE': (0, 59, False),
+    'BYSECOND': (0, 59, False),
+}
+STEP_MINUTES = {'DAILY': 1440, 'HOURLY': 60, 'MINUTELY': 1}
+WEEK_MINUTES = 7 * 1440
+
+SINGLE_RULE_MESSAGE = 'Expected a single RRULE such as FREQ=WEEKLY;COUNT=10'
+
+# A parsed rule whose UNTIL is capped at the booking horizon. COUNT is kept
+# apart because dateutil deprecates rules carrying both COUNT and UNTIL.
+Recurrence = namedtuple('Recurrence', ['rule', 'freq', 'count'])
+
+
+def recurrence_horizon(now=None):
+    """Occurrences starting after this are not booked"""
+    days = getattr(settings, 'RECURRENCE_HORIZON_DAYS', 365)
+    return (now or timezone.now()) + timedelta(days=days)
+
+
+def _parts(value):
+    """Split NAME=VALUE;... into an upper-cased dict, rejecting repeated names"""
+    parts = {}
+    for part in value.upper().split(';'):
+        name, separator, part_value = part.partition('=')
+        if not separator or not name or not part_value or name in parts:
+            raise ValueError(SINGLE_RULE_MESSAGE)
+        parts[name] = part_value
+    return parts
+
+
+def _positive_int(parts, name):
+    if name not in parts:
+        return None
+    try:
+        value = int(parts[name])
+    except ValueError:
+        raise ValueError(f'{name} must be a positive integer')
+    if value <= 0:
+        raise ValueError(f'{name} must be a positive integer')
+    return value
+
+
+def _int_list(parts, name):
+    try:
+        return [int(item) for item in parts[name].split(',')]
+    except ValueError:
+        raise ValueError(f'{name} must be a list of integers')
+
+
+def _by_values(parts):
+    """The range-checked BY* values of a rule, {name: set of ints}"""
+    values = {}
+    for name, (low, high, signed) in BY_RANGES.items():
+        if name not in parts:
+            continue
+        numbers = _int_list(parts, name)
+        if any(not low <= (abs(number) if signed else number) <= high for number in numbers):
+            bounds = f'±{low} and ±{high}' if signed else f'{low} and {high}'
+            raise ValueError(f'{name} values must be between {bounds}')
+        values[name] = set(numbers)
+    if 'BYDAY' in parts:
+        weekdays = set()
+        for item in parts['BYDAY'].split(','):
+            match = BYDAY_RE.match(item)
+            if not match:
+                raise ValueError(f'Invalid BYDAY value {item}')
+            weekdays.add(WEEKDAYS.index(match.group(2)))
+        # Ordinals (2MO, -1FR) narrow this further; ignoring them only makes
+        # the checks below accept more
+        values['BYDAY'] = weekdays
+    return values
+
+
+def _day_matches(day, values):
+    month_days = calendar.monthrange(day.year, day.month)[1]
+    year_days = 366 if calendar.isleap(day.year) else 365
+    year_day = day.timetuple().tm_yday
+    checks = {
+        'BYMONTH': lambda month: month == day.month,
+        'BYMONTHDAY': lambda number: day.day in (number, month_days + 1 + number),
+        'BYYEARDAY': lambda number: year_day in (number, year_days + 1 + number),
+        'BYDAY': lambda weekday: weekday == day.weekday(),
+    }
+    return all(
+        any(check(number) for number in values[name])
+        for name, check in checks.items() if name in values
+    )
+
+
+def _calendar_can_match(values):
+    """
+    Whether any date satisfies the BYMONTH/BYMONTHDAY/BYYEARDAY/BYDAY
+    filters together, e.g. not February 30th. Weekdays and leap years repeat
+    every 28 years between 1901 and 2099, so one such cycle is enough.
+    """
+    if not values.keys() & {'BYMONTH', 'BYMONTHDAY', 'BYYEARDAY', 'BYDAY'}:
+        return True
+    day, last = date(2024, 1, 1), date(2051, 12, 31)
+    while day <= last:
+        if _day_matches(day, values):
+            return True
+        day += timedelta(days=1)
+    return False
+
+
+def _steps_can_match(freq, interval, dtstart, values):
+    """
+    Whether stepping INTERVAL from dtstart ever reaches the BY* values the
+    frequency filters on, e.g. FREQ=DAILY;INTERVAL=7;BYDAY=TU from a Monday
+    never does. DAILY/HOURLY/MINUTELY positions repeat every week, and
+    MONTHLY ones every twelve steps.
+    """
+    if freq == 'MONTHLY':
+        if 'BYMONTH' not in values:
+            return True
+        reachable = {(dtstart.month - 1 + step * interval) % 12 + 1 for step in range(12)}
+        return bool(reachable & values['BYMONTH'])
+    if freq not in STEP_MINUTES:
+        return True
+
+    # Coarser BY* parts expand the set instead of filtering it
+    filters = {'BYDAY': lambda position: position // 1440}
+    if freq in ('HOURLY', 'MINUTELY'):
+        filters['BYHOUR'] = lambda position: position % 1440 // 60
+    if freq == 'MINUTELY':
+        filters['BYMINUTE'] = lambda position: position % 60
+    filters = {name: get for name, get in filters.items() if name in values}
+    if not filters:
+        return True
+
+    step = STEP_MINUTES[freq] * interval
+    start = dtstart.weekday() * 1440 + dtstart.hour * 60 + dtstart.minute
+    for lap in range(WEEK_MINUTES // gcd(step, WEEK_MINUTES)):
+        position = (start + lap * step) % WEEK_MINUTES
+        if all(get(position) in values[name] for name, get in filters.items()):
+            return True
+    return False
+
+
+def _parse_until(value, tzinfo):
+    try:
+        until = isoparse(value)
+    except ValueError:
+        raise ValueError('UNTIL must be a date or date-time such as 20261231T000000Z')
+    if timezone.is_naive(until):
+        until = timezone.make_aware(until, tzinfo)
+    return until
+
+
+def parse_rule(value, dtstart, horizon):
+    """
+    Parse a single RRULE (with or without the "RRULE:" prefix) anchored at
+    dtstart, with its UNTIL capped at horizon. Raises ValueError for anything
+    else, including DTSTART/EXDATE lines, sub-minute frequencies,
+    non-positive INTERVAL/COUNT and BY* values that can never match.
+
+    dateutil only checks UNTIL when a date matches, so a rule that never
+    matches would be searched up to the year 9999; the checks above reject
+    those before anything is expanded.
+    """
+    value = value.strip()
+    if value.upper().startswith('RRULE:'):
+        value = value[len('RRULE:'):]
+    if not value or '\n' in value or ':' in value:
+        raise ValueError(SINGLE_RULE_MESSAGE)
+
+    parts = _parts(value)
+    freq = parts.get('FREQ')
+    if freq == 'SECONDLY':
+        raise ValueError('Recurrences more frequent than every minute are not supported')
+    if freq not in FREQUENCIES:
+        raise ValueError(f'FREQ must be one of {", ".join(FREQUENCIES)}')
+    interval = _positive_int(parts, 'INTERVAL') or 1
+    count = _positive_int(parts, 'COUNT')
+    if count is not None and 'UNTIL' in parts:
+        raise ValueError('COUNT and UNTIL cannot be combined')
+
+    # Expand in local time so a weekly 09:00 meeting stays at 09:00 across DST
+    local_start = timezone.localtime(dtstart)
+    values = _by_values(parts)
+    if not _calendar_can_match(values) or not _steps_can_match(freq, interval, local_start, values):
+        raise ValueError('Recurrence never occurs')
+
+    until = timezone.localtime(horizon)
+    if 'UNTIL' in parts:
+        until = min(until, _parse_until(parts['UNTIL'], local_start.tzinfo))
+    bounded = ';'.join(f'{name}={part}' for name, part in parts.items() if name not in ('COUNT', 'UNTIL'))
+    rule = rrulestr(bounded, dtstart=local_start)
+    if not isinstance(rule, rrule):
+        raise ValueError(SINGLE_RULE_MESSAGE)
+    return Recurrence(rule.replace(until=until), freq, count)
+
+
+def occurrences(start, end, recurrence, limit):
+    """
+    Lazily yield the (start, end) pairs of a parsed recurrence, at most
+    limit + 1 of them so callers can tell an over-long series apart
+    without ever materialising an unbounded one.
+    """
+    duration = end - start
+    starts = iter(recurrence.rule)
+    if recurrence.count is not None:
+        starts = islice(starts, recurrence.count)
+    for occurrence in islice(starts, limit + 1):
+        yield occurrence, occurrence + duration
@@ -1,19 +1,30 @@
+from django.conf import settings
+from django.utils import timezone
 from rest_framework import serializers
-from .models import Event
+from core.serializers import SparseFieldsMixin
+from .models import BookingTicket, Event
+from .recurrence import occurrences, parse_rule, recurrence_horizon
 from apps.spaces.models import Space
 from apps.spaces.serializers import SpaceSerializer
 
 class EventSerializer(serializers.ModelSerializer):
     space_name = serializers.CharField(source='space.name', read_only=True)
+    recurrence = serializers.CharField(
+        write_only=True,
+        required=False,
+        allow_blank=True,
+        help_text='RRULE repeating the event, e.g. FREQ=WEEKLY;BYDAY=MO;COUNT=12'
+    )
     
     class Meta:
         model = Event
         fields = [
             'id', 'event_name', 'start_datetime', 'end_datetime',
             'organizer_name', 'organizer_email', 'event_type', 
-            'attendance', 'status', 'space', 'space_name'
+            'attendance', 'status', 'space', 'space_name',
+            'recurrence', 'series'
         ]
-        read_only_fields = ['id', 'status', 'space_name']
+        read_only_fields = ['id', 'status', 'space_name', 'series']
 
     def validate(self, data):
         """
@@ -29,9 +40,72 @@ class EventSerializer(serializers.ModelSerializer):
                     "End datetime must be after start datetime"
                 )
 
+        # Expand a recurrence into 'occurrences' [(start, end), ...]
+        recurrence = data.pop('recurrence', '')
+        if recurrence and start_datetime and end_datetime:
+            try:
+                rule = parse_rule(recurrence, start_datetime, recurrence_horizon())
+            except ValueError as exc:
+                raise serializers.ValidationError({'recurrence': str(exc)})
+            limit = getattr(settings, 'RECURRENCE_MAX_OCCURRENCES', 200)
+            data['occurrences'] = list(occurrences(start_datetime, end_datetime, rule, limit))
+            if not data['occurrences']:
+                raise serializers.ValidationError({
+                    'recurrence': 'Recurrence has no occurrences within the booking horizon'
+                })
+            if len(data['occurrences']) > limit:
+                raise serializers.ValidationError({
+                    'recurrence': f'Recurrence expands to more than {limit} occurrences'
+                })
+
+        return data
+
+class HoldSerializer(serializers.Serializer):
+    space = serializers.PrimaryKeyRelatedField(queryset=Space.objects.all())
+    start_datetime = serializers.DateTimeField()
+    end_datetime = serializers.DateTimeField()
+    minutes = serializers.IntegerField(
+        required=False,
+        min_value=1,
+        help_text='How long to hold the slot, capped at BOOKING_HOLD_MAX_MINUTES'
+    )
+
+    def validate(self, data):
+        if data['start_datetime'] >= data['end_datetime']:
+            raise serializers.ValidationError("End datetime must be after start datetime")
+        if data['start_datetime'] < timezone.now():
+            raise serializers.ValidationError("Start datetime cannot be in the past")
         return data
 
-class EventListSerializer(serializers.ModelSerializer):
+class BookingTicketSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = BookingTicket
+        fields = ['id', 'status', 'result', 'event', 'space', 'created_at', 'updated_at']
+        read_only_fields = fields
+
+class BatchSpaceField(serializers.PrimaryKeyRelatedField):
+    """Resolves spaces from context['spaces'], loaded once per batch, instead of a query per row"""
+
+    def to_internal_value(self, data):
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            pk = int(data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        space = self.context['spaces'].get(pk)
+        if space is None:
+            self.fail('does_not_exist', pk_value=data)
+        return space
+
+class BulkEventSerializer(EventSerializer):
+    """EventSerializer for one row of a bulk booking"""
+    space = BatchSpaceField(queryset=Space.objects.all())
+
+    class Meta(EventSerializer.Meta):
+        fields = [field for field in EventSerializer.Meta.fields if field != 'recurrence']
+
+class EventListSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     space_name = serializers.CharField(source='space.name', read_only=True)
     
     class Meta:
@@ -41,7 +115,12 @@ class EventListSerializer(serializers.ModelSerializer):
             'status', 'space_name'
         ]
 
+from contextlib import contextmanager
+from django.db import IntegrityError, transaction
 from rest_framework import serializers
+from rest_framework.settings import api_settings
+from .conflicts import booking_conflicts
+from .constraints import is_overlap_violation
 from .models import Booking
 from apps.spaces.serializers import SpaceSerializer
 
@@ -76,24 +155,47 @@ class BookingSerializer(serializers.ModelSerializer):
         if data['start_datetime'] >= data['end_datetime']:
             raise serializers.ValidationError("End datetime must be after start datetime")
         
-        # Check for booking conflicts
-        space = data['space']
-        start = data['start_datetime']
-        end = data['end_datetime']
-        
-        # Exclude current booking when updating
-        booking_id = self.instance.id if self.instance else None
-        
-        conflicts = Booking.objects.filter(
-            space=space,
-            start_datetime__lt=end,
-            end_datetime__gt=start
-        )
-        
-        if booking_id:
-            conflicts = conflicts.exclude(id=booking_id)
-            
-        if conflicts.exists():
-            raise serializers.ValidationError("This space is already booked during the selected time period")
-            
-        return data
\ No newline at end of file
+        # Booking conflicts are enforced by the no-overlap constraint when the
+        # row is written, see create()/update()
+        return data
+
+    def create(self, validated_data):
+        with self.conflicts_as_validation_errors():
+            return super().create(validated_data)
+
+    def update(self, instance, validated_data):
+        with self.conflicts_as_validation_errors():
+            return super().update(instance, validated_data)
+
+    @contextmanager
+    def conflicts_as_validation_errors(self):
+        """
+        Turn away known conflicts through the conflict engine before writing,
+        and report the no-overlap constraint catching a racing writer the
+        same way
+        """
+        data = self.validated_data
+        instance = self.instance
+        space = data.get('space', getattr(instance, 'space', None))
+        status = data.get('status', getattr(instance, 'status', 'pending'))
+        start = data.get('start_datetime', getattr(instance, 'start_datetime', None))
+        end = data.get('end_datetime', getattr(instance, 'end_datetime', None))
+        if status in booking_conflicts.statuses and booking_conflicts.find(
+            space.pk, start, end, exclude=getattr(instance, 'pk', None)
+        ) is not None:
+            self.raise_conflict()
+
+        try:
+            with transaction.atomic():
+                yield
+        except IntegrityError as exc:
+            if not is_overlap_violation(exc, Booking):
+                raise
+            self.raise_conflict()
+
+    def raise_conflict(self):
+        raise serializers.ValidationError({
+            api_settings.NON_FIELD_ERRORS_KEY: [
+                "This space is already booked during the selected time period"
+            ]
+        })
\ No newline at end of file
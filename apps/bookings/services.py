@@ -0,0 +1,360 @@
+import uuid
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Exists, OuterRef
+
+from apps.spaces.models import Space
+from apps.spaces.signals import invalidate_spaces_cache
+from .availability import availability_index
+from .calendar import invalidate_calendars
+from .conflicts import event_conflicts
+from .constraints import is_overlap_violation
+from .emails import queue_booking_email, queue_booking_emails
+from .holds import active_holds
+from .models import Event
+
+
+def _column(model, field_name):
+    return connection.ops.quote_name(model._meta.get_field(field_name).column)
+
+
+def _datetime_param(value):
+    return connection.ops.adapt_datetimefield_value(value)
+
+
+def complete_ended_events_sql(now, since=None, event_ids=None, ends_at=None):
+    """The (sql, params) of the UPDATE ... RETURNING run by complete_ended_events"""
+    table = connection.ops.quote_name(Event._meta.db_table)
+    status = _column(Event, 'status')
+    end = _column(Event, 'end_datetime')
+    sql = (
+        f'UPDATE {table} SET {status} = %s, {_column(Event, "updated_at")} = %s '
+        f'WHERE {status} = %s AND {end} < %s'
+    )
+    params = ['completed', _datetime_param(now), 'confirmed', _datetime_param(now)]
+    if since is not None:
+        sql += f' AND {end} >= %s'
+        params.append(_datetime_param(since))
+    if event_ids is not None:
+        sql += f' AND {_column(Event, "id")} IN ({", ".join(["%s"] * len(event_ids))})'
+        params.extend(event_ids)
+    if ends_at is not None:
+        sql += f' AND {end} = %s'
+        params.append(_datetime_param(ends_at))
+    sql += f' RETURNING {_column(Event, "id")}, {_column(Event, "space")}'
+    return sql, params
+
+
+def complete_ended_events(now, since=None, event_ids=None, ends_at=None):
+    """
+    Mark every confirmed event that ended before `now` (and not before
+    `since`, when given) as completed with a single UPDATE ... RETURNING.
+    event_ids and ends_at narrow the update to those events / that exact
+    end time. Returns a list of (event_id, space_id) for the completed events.
+    """
+    if event_ids is not None:
+        event_ids = list(event_ids)
+        if not event_ids:
+            return []
+    sql, params = complete_ended_events_sql(now, since=since, event_ids=event_ids, ends_at=ends_at)
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [tuple(row) for row in cursor.fetchall()]
+
+
+def free_idle_spaces_sql(space_ids, now):
+    """The (sql, params) of the UPDATE ... RETURNING run by free_idle_spaces"""
+    space_table = connection.ops.quote_name(Space._meta.db_table)
+    event_table = connection.ops.quote_name(Event._meta.db_table)
+    space_pk = _column(Space, 'id')
+    placeholders = ', '.join(['%s'] * len(space_ids))
+    sql = (
+        f'UPDATE {space_table} SET {_column(Space, "status")} = %s, {_column(Space, "updated_at")} = %s '
+        f'WHERE {_column(Space, "status")} = %s AND {space_pk} IN ({placeholders}) '
+        f'AND NOT EXISTS ('
+        f'SELECT 1 FROM {event_table} WHERE {event_table}.{_column(Event, "space")} = {space_table}.{space_pk} '
+        f'AND {event_table}.{_column(Event, "status")} = %s AND {event_table}.{_column(Event, "end_datetime")} > %s'
+        f') RETURNING {space_pk}'
+    )
+    params = ['free', _datetime_param(now), 'booked', *space_ids, 'confirmed', _datetime_param(now)]
+    return sql, params
+
+
+def free_idle_spaces(space_ids, now):
+    """
+    Set the given booked spaces back to free unless they still have a
+    current or future confirmed event, in one UPDATE ... RETURNING.
+    Returns the ids of the freed spaces.
+    """
+    space_ids = list(space_ids)
+    if not space_ids:
+        return []
+    sql, params = free_idle_spaces_sql(space_ids, now)
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [row[0] for row in cursor.fetchall()]
+
+
+def complete_events(now, since=None, event_ids=None, ends_at=None):
+    """
+    Complete ended events (see complete_ended_events) and free the spaces
+    they leave idle in the same transaction.
+    Returns (completed [(event_id, space_id)], freed space ids).
+    """
+    with transaction.atomic():
+        completed = complete_ended_events(now, since=since, event_ids=event_ids, ends_at=ends_at)
+        space_ids = {space_id for _, space_id in completed}
+        freed = free_idle_spaces(space_ids, now)
+        # The raw updates bypass the Event and Space signals
+        transaction.on_commit(lambda: availability_index.invalidate(space_ids))
+        if completed:
+            invalidate_spaces_cache()
+            # Owners are unknown here, so every feed is refreshed
+            invalidate_calendars(everything=True)
+    return completed, freed
+
+
+def count_ended_events(now):
+    """What complete_events(now) would do, as (events, spaces) counts, without writing"""
+    ended = Event.objects.filter(status='confirmed', end_datetime__lt=now)
+    still_booked = Event.objects.filter(space=OuterRef('pk'), status='confirmed', end_datetime__gt=now)
+    spaces = Space.objects.filter(
+        status='booked',
+        pk__in=ended.values('space_id')
+    ).exclude(Exists(still_booked))
+    return ended.count(), spaces.count()
+
+
+def book_event(user, data):
+    """
+    Book one event from EventSerializer data as a pending request.
+    Known conflicts are answered from the availability index; otherwise the
+    row is inserted optimistically and the no-overlap constraint has the last
+    word, since the index can lag behind other processes' writes.
+    Returns (event, None) or (None, the conflicting event or interval, which
+    is None when it went away before it could be looked up).
+    """
+    space_id = data['space'].id
+    start, end = data['start_datetime'], data['end_datetime']
+    conflict = event_conflicts.find(space_id, start, end)
+    if conflict is not None:
+        return None, conflict
+
+    with transaction.atomic():
+        try:
+            with transaction.atomic():
+                event = Event.objects.create(**data, user=user, status='pending')
+        except IntegrityError as exc:
+            if not is_overlap_violation(exc, Event):
+                raise
+            return None, event_conflicts.overlapping(space_id, start, end).first()
+
+        # Notification emails are queued in this transaction and sent
+        # by a worker after commit, keeping SMTP off the request path
+        queue_booking_email('booking_submitted', event)
+    return event, None
+
+
+def conflict_details(conflict):
+    """Describe the event (or index interval) blocking a booking, like BookEventView's 409"""
+    return {
+        'booked_event': conflict.event_name,
+        'from': conflict.start_datetime.strftime('%Y-%m-%d %H:%M'),
+        'to': conflict.end_datetime.strftime('%Y-%m-%d %H:%M'),
+        'status': conflict.status
+    }
+
+
+def _validate_rows(rows):
+    """
+    Run every row through BulkEventSerializer with the spaces they name
+    loaded in one query. Returns ({row: Event}, {row: result}).
+    """
+    from .serializers import BulkEventSerializer
+
+    space_ids = set()
+    for row in rows:
+        try:
+            space_ids.add(int(row.get('space')))
+        except (AttributeError, TypeError, ValueError):
+            pass
+    context = {'spaces': Space.objects.in_bulk(space_ids)}
+
+    candidates, results = {}, {}
+    for index, row in enumerate(rows):
+        if not isinstance(row, dict):
+            results[index] = {'row': index, 'status': 'invalid', 'errors': {'non_field_errors': ['Expected an object']}}
+            continue
+        serializer = BulkEventSerializer(data=row, context=context)
+        if not serializer.is_valid():
+            results[index] = {'row': index, 'status': 'invalid', 'errors': serializer.errors}
+            continue
+        event = Event(**serializer.validated_data)
+        try:
+            # bulk_create() skips Event.save(), which is where clean() runs
+            event.clean()
+        except DjangoValidationError as exc:
+            results[index] = {'row': index, 'status': 'invalid', 'errors': {'non_field_errors': exc.messages}}
+            continue
+        if event.space.status != 'free':
+            results[index] = {
+                'row': index,
+                'status': 'unavailable',
+                'error': f'Space "{event.space.name}" is currently {event.space.status}'
+            }
+            continue
+        candidates[index] = event
+    return candidates, results
+
+
+def find_batch_conflicts(candidates, user_id=None):
+    """
+    Check {row: Event} against the active events of their spaces and against
+    each other with the conflict engine's batch lookup (see
+    apps.bookings.conflicts). Slots held by users other than user_id count
+    as taken. Returns {row: result} for the rows that lose.
+    """
+    holds = {}
+    conflicts = {}
+    ranges = []
+    for index, event in candidates.items():
+        space_id, start, end = event.space_id, event.start_datetime, event.end_datetime
+        if space_id not in holds:
+            holds[space_id] = [hold for hold in active_holds(space_id) if hold.user_id != user_id]
+        if any(hold.start_datetime < end and hold.end_datetime > start for hold in holds[space_id]):
+            conflicts[index] = {'row': index, 'status': 'conflict', 'error': 'Slot is being held by another user'}
+        else:
+            ranges.append((index, space_id, start, end))
+
+    for index, conflict in event_conflicts.find_many(ranges).items():
+        if conflict.interval is not None:
+            conflicts[index] = {
+                'row': index,
+                'status': 'conflict',
+                'error': 'Space already booked for this time',
+                'details': conflict_details(conflict.interval)
+            }
+        else:
+            conflicts[index] = {
+                'row': index,
+                'status': 'conflict',
+                'error': f'Overlaps row {conflict.batch_key} of this batch',
+                'details': conflict_details(candidates[conflict.batch_key])
+            }
+    return conflicts
+
+
+def _insert_events(candidates, results):
+    """
+    bulk_create the candidates. When another writer took one of the slots in
+    the meantime the overlap constraint rejects the whole insert, so the rows
+    are retried one savepoint at a time to find out which ones lost.
+    """
+    events = list(candidates.values())
+    try:
+        with transaction.atomic():
+            return Event.objects.bulk_create(events)
+    except IntegrityError as exc:
+        if not is_overlap_violation(exc, Event):
+            raise
+
+    created = []
+    for index, event in candidates.items():
+        event.pk = None
+        try:
+            with transaction.atomic():
+                Event.objects.bulk_create([event])
+        except IntegrityError as exc:
+            if not is_overlap_violation(exc, Event):
+                raise
+            results[index] = {'row': index, 'status': 'conflict', 'error': 'Space already booked for this time'}
+        else:
+            created.append(event)
+    return created
+
+
+def _book(user, candidates, results, atomic, queue_emails):
+    """
+    Insert the {row: Event} candidates that have no result yet as pending
+    bookings of user, recording a result for every candidate. queue_emails
+    is called with the created events inside the transaction.
+    """
+    for index in results:
+        candidates.pop(index, None)
+
+    created = []
+    if candidates and not (atomic and results):
+        for event in candidates.values():
+            event.user = user
+            event.status = 'pending'
+
+        with transaction.atomic():
+            created = _insert_events(candidates, results)
+            if atomic and results:
+                # Another writer took a slot during the insert
+                transaction.set_rollback(True)
+                for event in created:
+                    event.pk = None
+                created = []
+            elif created:
+                space_ids = {event.space_id for event in created}
+                # bulk_create() bypasses the Event signals
+                transaction.on_commit(lambda: availability_index.invalidate(space_ids))
+                invalidate_spaces_cache()
+                invalidate_calendars(space_ids=space_ids, user_ids=[user.pk])
+                queue_emails(created)
+
+    for index, event in candidates.items():
+        if index not in results:
+            if event.pk is None:
+                results[index] = {'row': index, 'status': 'skipped', 'error': 'Batch rolled back'}
+            else:
+                results[index] = {'row': index, 'status': 'created', 'id': event.pk}
+    return created
+
+
+def book_events(user, rows, atomic=False):
+    """
+    Book many events for one user as pending requests: validation, conflict
+    detection and the insert are all batched. With atomic=True nothing is
+    written unless every row can be booked.
+    Returns (created events, per-row results in row order).
+    """
+    candidates, results = _validate_rows(rows)
+    results.update(find_batch_conflicts(candidates, user_id=user.pk))
+    created = _book(
+        user, candidates, results, atomic,
+        lambda events: queue_booking_emails('booking_submitted', events)
+    )
+    return created, [results[index] for index in sorted(results)]
+
+
+def book_series(user, data, atomic=False):
+    """
+    Book the occurrences of a recurring event, as validated by
+    EventSerializer, under one series id. Occurrences that clash with
+    existing events are skipped (or, with atomic=True, fail the whole
+    series) and the user gets one digest email for the rest.
+    Returns (created events, per-occurrence results in start order).
+    """
+    data = dict(data)
+    spans = data.pop('occurrences')
+    del data['start_datetime'], data['end_datetime']
+    series = uuid.uuid4()
+    candidates = {
+        index: Event(**data, start_datetime=start, end_datetime=end, series=series)
+        for index, (start, end) in enumerate(spans)
+    }
+    results = find_batch_conflicts(candidates, user_id=user.pk)
+    # The digest is keyed on the first booked occurrence
+    created = _book(
+        user, candidates, results, atomic,
+        lambda events: queue_booking_emails('booking_series_submitted', events[:1])
+    )
+    for index, (start, end) in enumerate(spans):
+        results[index]['start_datetime'] = start
+        results[index]['end_datetime'] = end
+    return created, [results[index] for index in sorted(results)]
@@ -0,0 +1,36 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .availability import availability_index, interval_for_event
+from .calendar import invalidate_calendars
+from .models import Event
+from apps.spaces.models import Space
+
+
+@receiver(post_save, sender=Event)
+def sync_availability_on_save(sender, instance, **kwargs):
+    """Keep the in-process availability index current once the write commits"""
+    space_id = instance.space_id
+    interval = interval_for_event(instance)
+    transaction.on_commit(lambda: availability_index.record(space_id, interval))
+
+
+@receiver(post_delete, sender=Event)
+def sync_availability_on_delete(sender, instance, **kwargs):
+    event_id = instance.pk
+    transaction.on_commit(lambda: availability_index.forget(event_id))
+
+
+@receiver(post_save, sender=Event)
+@receiver(post_delete, sender=Event)
+def invalidate_calendars_on_change(sender, instance, **kwargs):
+    invalidate_calendars(space_ids=[instance.space_id], user_ids=[instance.user_id])
+
+
+@receiver(post_save, sender=Space)
+@receiver(post_delete, sender=Space)
+def invalidate_calendars_on_space_change(sender, instance, **kwargs):
+    """VEVENT LOCATION and calendar names show the space, in any user's feed"""
+    invalidate_calendars(everything=True)
+
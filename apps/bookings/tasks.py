@@ -1,45 +1,113 @@
+import hashlib
+import hmac
+import logging
+from datetime import datetime, timedelta
+
 from celery import shared_task
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.mail import get_connection
+from django.db import transaction
+from django.db.models import Q
 from django.utils import timezone
-from .models import Event
+from .models import BookingTicket, Event, EmailOutbox, TaskWatermark
+from .holds import find_hold_conflict, get_hold, hold_covers, release_hold
+from .partitions import queue_for_space
+from .services import book_event, complete_events, conflict_details
+from .webhooks import UnsafeCallback, post_callback
 from apps.spaces.models import Space
 
+logger = logging.getLogger(__name__)
+
+
+def completion_horizon(now):
+    return now + timedelta(seconds=getattr(settings, 'EVENT_COMPLETION_HORIZON', 7200))
+
+
+def schedule_event_completion(event):
+    """
+    Queue complete_event for the end time of a confirmed event. Events that end
+    beyond EVENT_COMPLETION_HORIZON are scheduled by a later
+    update_space_status run instead, so ETA tasks never wait in the broker for
+    long. Call this after the confirmation has committed.
+    """
+    if event.status != 'confirmed' or event.end_datetime > completion_horizon(timezone.now()):
+        return None
+    try:
+        return complete_event.apply_async(
+            (event.pk, event.end_datetime.isoformat()),
+            eta=event.end_datetime
+        )
+    except Exception:
+        # update_space_status still completes the event, just later
+        logger.warning('Could not schedule completion of event %s', event.pk, exc_info=True)
+        return None
+
+
 @shared_task
-def update_space_status():
+def complete_event(event_id, end_datetime):
     """
-    Check for events that have ended and update their space status to 'free'
+    Complete one confirmed event at its end time and free its space if
+    nothing else holds it.
+
+    end_datetime is the end time the task was scheduled for. If the event has
+    been rescheduled, rejected, cancelled or already completed since, the
+    update matches no row and the task does nothing, so stale and duplicate
+    deliveries are harmless.
     """
-    # Find all confirmed events that have ended
-    ended_events = Event.objects.filter(
-        end_datetime__lt=timezone.now(),
-        status='confirmed'
-    ).select_related('space')
-    
-    # Update space status for each event
-    updated_spaces = 0
-    completed_events = 0
-    
-    for event in ended_events:
-        # Check if there are any upcoming events for this space
-        has_upcoming_events = Event.objects.filter(
-            space=event.space,
-            end_datetime__gt=timezone.now(),
-            status='confirmed'
-        ).exclude(id=event.id).exists()
-        
-        if not has_upcoming_events:
-            # If no upcoming events, mark space as free
-            space = event.space
-            if space.status != 'free':
-                space.status = 'free'
-                space.save(update_fields=['status'])
-                updated_spaces += 1
-        
-        # Update event status to 'completed'
-        event.status = 'completed'
-        event.save(update_fields=['status'])
-        completed_events += 1
-    
-    return f"Completed {completed_events} events and freed {updated_spaces} spaces"
+    completed, freed = complete_events(
+        timezone.now(),
+        event_ids=[event_id],
+        ends_at=datetime.fromisoformat(end_datetime)
+    )
+    if not completed:
+        return f"Event {event_id} is no longer due for completion"
+
+    return f"Completed event {event_id} and freed {len(freed)} spaces"
+
+
+@shared_task
+def update_space_status(full=False):
+    """
+    Complete confirmed events that have ended and free their spaces when
+    nothing else is booked there, in a constant number of statements.
+
+    Only events that ended since the previous run (the watermark) are
+    considered; pass full=True to sweep every ended event, which the beat
+    schedule does daily for events confirmed after they ended. Events are normally
+    completed on time by complete_event, so this runs as a safety net that
+    also schedules complete_event for confirmed events that came within
+    EVENT_COMPLETION_HORIZON since the previous run.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        # Locking the watermark keeps overlapping runs from sweeping the same window
+        watermark = TaskWatermark.objects.select_for_update().filter(name='update_space_status').first()
+        previous_run = watermark.value if watermark is not None else None
+        since = None if full else previous_run
+
+        completed, freed = complete_events(now, since=since)
+
+        if watermark is None:
+            TaskWatermark.objects.create(name='update_space_status', value=now)
+        else:
+            TaskWatermark.objects.filter(pk=watermark.pk).update(value=now)
+
+    ending_soon = Event.objects.filter(
+        status='confirmed',
+        end_datetime__gte=now,
+        end_datetime__lte=completion_horizon(now)
+    ).only('id', 'status', 'end_datetime')
+    if since is not None:
+        # Events already within the previous run's horizon were scheduled by
+        # that run, or on approval if they were confirmed inside it. Any
+        # duplicate that still slips through (e.g. overlapping runs) is
+        # harmless: complete_event is a no-op once the event is completed.
+        ending_soon = ending_soon.filter(end_datetime__gt=completion_horizon(previous_run))
+    for event in ending_soon:
+        schedule_event_completion(event)
+
+    return f"Completed {len(completed)} events and freed {len(freed)} spaces"
 
 @shared_task
 def check_pending_events():
@@ -65,6 +133,245 @@ def update_space_on_approval(event_id):
             space = event.space
             space.status = 'booked'
             space.save(update_fields=['status'])
+            schedule_event_completion(event)
             return f"Space '{space.name}' marked as booked for event '{event.event_name}'"
     except Event.DoesNotExist:
         return f"Event with ID {event_id} not found"
+
+def claim_outbox_batch(batch_size, after_id=0):
+    """
+    Mark up to batch_size pending outbox rows with ids above after_id (or
+    'sending' ones whose lease expired) as 'sending' for EmailOutbox.LEASE,
+    and return them with their events loaded.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        # skip_locked lets concurrent drains claim different rows
+        ids = list(
+            EmailOutbox.objects.select_for_update(skip_locked=True).filter(
+                Q(status='pending') | Q(status='sending', claimed_until__lt=now),
+                id__gt=after_id
+            ).order_by('id').values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return []
+        EmailOutbox.objects.filter(pk__in=ids).update(status='sending', claimed_until=now + EmailOutbox.LEASE)
+    return list(
+        EmailOutbox.objects.filter(pk__in=ids).select_related(
+            'event__space__organizer', 'event__user'
+        ).order_by('id')
+    )
+
+
+@shared_task(bind=True, max_retries=5, default_retry_delay=60)
+def drain_email_outbox(self, batch_size=100):
+    """
+    Render and send queued booking emails in batches, each batch over a
+    single SMTP connection. Messages that fail are retried up to
+    EmailOutbox.MAX_ATTEMPTS times.
+
+    Rows are claimed first: marked 'sending' with a lease in a short
+    transaction that commits before any SMTP traffic, so no lock or
+    transaction is held while talking to the mail server. A row may hold
+    several messages (user, organizer, admin); each one is recorded in
+    messages_sent as soon as the server accepts it, so a retry resumes
+    after it instead of sending it again. Only a worker dying in between
+    leaves a message to be sent twice once its lease runs out.
+    """
+    from .emails import EMAIL_BUILDERS
+
+    sent = 0
+    failed = 0
+    last_id = 0
+    while True:
+        batch = claim_outbox_batch(batch_size, last_id)
+        if not batch:
+            break
+        last_id = batch[-1].id
+
+        connection = get_connection()
+        try:
+            connection.open()
+        except Exception as exc:
+            EmailOutbox.objects.filter(pk__in=[outbox.pk for outbox in batch], status='sending').update(
+                status='pending', claimed_until=None
+            )
+            raise self.retry(exc=exc)
+
+        try:
+            for outbox in batch:
+                try:
+                    messages = EMAIL_BUILDERS[outbox.kind](outbox.event)
+                    for position in range(outbox.messages_sent, len(messages)):
+                        connection.send_messages([messages[position]])
+                        EmailOutbox.objects.filter(pk=outbox.pk).update(messages_sent=position + 1)
+                except Exception as exc:
+                    attempts = outbox.attempts + 1
+                    EmailOutbox.objects.filter(pk=outbox.pk).update(
+                        status='failed' if attempts >= EmailOutbox.MAX_ATTEMPTS else 'pending',
+                        attempts=attempts,
+                        last_error=str(exc),
+                        claimed_until=None
+                    )
+                    failed += 1
+                else:
+                    EmailOutbox.objects.filter(pk=outbox.pk).update(
+                        status='sent', sent_at=timezone.now(), claimed_until=None
+                    )
+                    sent += 1
+        finally:
+            connection.close()
+
+    if failed:
+        # Leftover pending rows get another pass after the retry delay
+        raise self.retry(countdown=self.default_retry_delay * (self.request.retries + 1))
+
+    return f"Sent {sent} queued emails"
+
+
+def enqueue_booking_ticket(ticket):
+    """
+    Send a ticket to the partition queue that owns its space. Call this after
+    the ticket has committed; requeue_booking_tickets retries it if the
+    broker is unreachable.
+    """
+    try:
+        return process_booking_ticket.apply_async((str(ticket.pk),), queue=queue_for_space(ticket.space_id))
+    except Exception:
+        logger.warning('Could not queue booking ticket %s', ticket.pk, exc_info=True)
+        return None
+
+
+def book_ticket(ticket, data, hold):
+    """Book validated ticket data and record the outcome on the ticket"""
+    held = find_hold_conflict(data['space'].id, data['start_datetime'], data['end_datetime'], user_id=ticket.user_id)
+    try:
+        event, conflict = (None, None) if held else book_event(ticket.user, data)
+    except DjangoValidationError as exc:
+        # e.g. the start went by while the ticket was queued
+        event, conflict = None, None
+        ticket.result = {'message': 'Failed to book event', 'errors': {'non_field_errors': exc.messages}}
+
+    if event is not None:
+        ticket.status = 'booked'
+        ticket.event = event
+        ticket.result = {
+            'message': 'Event booked successfully',
+            'event_name': event.event_name,
+            'space': data['space'].name,
+            'start_time': event.start_datetime.strftime('%Y-%m-%d %H:%M'),
+            'status': event.status
+        }
+        if hold is not None:
+            transaction.on_commit(lambda: release_hold(hold))
+    else:
+        ticket.status = 'rejected'
+        if held is not None:
+            ticket.result = {'message': 'Slot is being held by another user'}
+        elif conflict is not None:
+            ticket.result = {
+                'message': 'Space already booked for this time',
+                'details': conflict_details(conflict)
+            }
+        elif not ticket.result:
+            ticket.result = {'message': 'Space already booked for this time'}
+
+
+@shared_task
+def process_booking_ticket(ticket_id):
+    """
+    Book a queued ticket. Every ticket of a space lands on the same partition
+    queue, whose single worker process books them one after another against
+    its warm availability index, so same-space requests never race each
+    other. Processing a ticket twice is a no-op.
+    """
+    from .serializers import EventSerializer
+
+    with transaction.atomic():
+        ticket = BookingTicket.objects.select_for_update().select_related('user').filter(
+            pk=ticket_id,
+            status='queued'
+        ).first()
+        if ticket is None:
+            return f"Ticket {ticket_id} was already processed"
+
+        serializer = EventSerializer(data=ticket.payload)
+        if not serializer.is_valid():
+            ticket.status = 'rejected'
+            ticket.result = {'message': 'Failed to book event', 'errors': serializer.errors}
+        else:
+            data = serializer.validated_data
+            space = data['space']
+            hold = get_hold(ticket.payload.get('hold') or '')
+            if space.status != 'free':
+                # Same checks as the synchronous BookEventView, against the
+                # space and holds as they are now rather than at enqueue time
+                ticket.status = 'rejected'
+                ticket.result = {
+                    'message': 'Space is not available for booking',
+                    'error': f'Space "{space.name}" is currently {space.status}'
+                }
+            elif hold is not None and not hold_covers(
+                hold, ticket.user_id, space.id, data['start_datetime'], data['end_datetime']
+            ):
+                ticket.status = 'rejected'
+                ticket.result = {
+                    'message': 'Failed to book event',
+                    'errors': {'hold': ['Hold does not cover this booking']}
+                }
+            else:
+                book_ticket(ticket, data, hold)
+        ticket.save()
+
+        if ticket.callback_url:
+            transaction.on_commit(lambda: deliver_booking_webhook.delay(str(ticket.pk)))
+
+    return f"Ticket {ticket_id} {ticket.status}"
+
+
+@shared_task(bind=True, max_retries=5, default_retry_delay=30)
+def deliver_booking_webhook(self, ticket_id):
+    """
+    POST a processed ticket to its callback_url. The body is signed with
+    HMAC-SHA256 over SECRET_KEY in the X-Eventspace-Signature header. The
+    URL goes through apps.bookings.webhooks, which refuses non-public hosts
+    and does not follow redirects.
+    """
+    from core.renderers import json_dumps
+    from .serializers import BookingTicketSerializer
+
+    ticket = BookingTicket.objects.filter(pk=ticket_id).first()
+    if ticket is None or not ticket.callback_url:
+        return f"Ticket {ticket_id} has no callback"
+
+    body = json_dumps(BookingTicketSerializer(ticket).data)
+    signature = hmac.new(settings.SECRET_KEY.encode(), body, hashlib.sha256).hexdigest()
+    headers = {'Content-Type': 'application/json', 'X-Eventspace-Signature': f'sha256={signature}'}
+    try:
+        response_status = post_callback(ticket.callback_url, body, headers)
+    except UnsafeCallback as exc:
+        # Checked again here: the host may resolve elsewhere by now
+        logger.warning('Not delivering ticket %s: %s', ticket_id, exc)
+        return f"Refused callback of ticket {ticket_id}: {exc}"
+    except OSError as exc:
+        raise self.retry(exc=exc, countdown=self.default_retry_delay * (self.request.retries + 1))
+    if 300 <= response_status < 400:
+        # Redirects are not followed, and retrying would not change that
+        return f"Callback of ticket {ticket_id} redirected ({response_status}), not followed"
+    if response_status >= 400:
+        raise self.retry(
+            exc=OSError(f'Callback answered {response_status}'),
+            countdown=self.default_retry_delay * (self.request.retries + 1)
+        )
+    return f"Delivered ticket {ticket_id} to its callback"
+
+
+@shared_task
+def requeue_booking_tickets(older_than=60):
+    """Queue again tickets whose enqueue after commit was lost (e.g. the broker was down)"""
+    cutoff = timezone.now() - timedelta(seconds=older_than)
+    tickets = list(BookingTicket.objects.filter(status='queued', created_at__lt=cutoff).only('id', 'space_id'))
+    for ticket in tickets:
+        enqueue_booking_ticket(ticket)
+    return f"Requeued {len(tickets)} booking tickets"
+
@@ -1,3 +1,1355 @@
-from django.test import TestCase
+import json
+import threading
+import time
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from io import StringIO
 
-# Create your tests here.
+from unittest import mock
+
+from django.core import mail
+from django.core.management import call_command
+from django.core.cache import cache
+from django.db import IntegrityError, OperationalError, connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import http_date
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient, APITestCase
+
+from apps.authentication.models import User
+from apps.spaces.models import Space
+from core.serializers import ValuesPlan
+from .availability import Interval, SpaceSchedule, availability_index
+from .calendar import calendar_token, fold
+from .conflicts import booking_conflicts, event_conflicts
+from .holds import active_holds, get_hold, place_hold
+from .models import Booking, BookingTicket, EmailOutbox, Event, TaskWatermark
+from .partitions import HashRing, queue_for_space
+from .webhooks import post_callback
+from .serializers import BookingSerializer, EventListSerializer
+from .tasks import (
+    claim_outbox_batch, complete_event, deliver_booking_webhook, drain_email_outbox, process_booking_ticket,
+    schedule_event_completion, update_space_status
+)
+
+
+class SpaceScheduleTestCase(TestCase):
+
+    def setUp(self):
+        self.base = timezone.now().replace(microsecond=0) + timedelta(days=1)
+
+    def at(self, hours):
+        return self.base + timedelta(hours=hours)
+
+    def test_find_conflict_returns_earliest_overlap(self):
+        """Overlapping lookups return the earliest-starting interval"""
+        schedule = SpaceSchedule([
+            Interval(1, 'Long', self.at(0), self.at(10), 'confirmed'),
+            Interval(2, 'Short', self.at(2), self.at(3), 'pending'),
+            Interval(3, 'Late', self.at(12), self.at(13), 'pending'),
+        ])
+
+        self.assertEqual(schedule.find_conflict(self.at(2), self.at(4)).id, 1)
+        self.assertEqual(schedule.find_conflict(self.at(11), self.at(12.5)).id, 3)
+        self.assertIsNone(schedule.find_conflict(self.at(10), self.at(12)))
+
+    def test_find_conflict_honours_statuses_and_exclude(self):
+        """Status filters and excluded ids are skipped"""
+        schedule = SpaceSchedule([
+            Interval(1, 'Pending', self.at(0), self.at(2), 'pending'),
+            Interval(2, 'Confirmed', self.at(1), self.at(3), 'confirmed'),
+        ])
+
+        self.assertEqual(schedule.find_conflict(self.at(0), self.at(1), statuses=('confirmed',)), None)
+        self.assertEqual(schedule.find_conflict(self.at(0), self.at(4), exclude=1).id, 2)
+
+        schedule.discard(2)
+        self.assertIsNone(schedule.find_conflict(self.at(0), self.at(4), exclude=1))
+
+
+class BookEventViewTestCase(APITestCase):
+
+    def setUp(self):
+        """Set up test data"""
+        availability_index.clear()
+        self.url = reverse('book-event')
+        self.user = User.objects.create_user(
+            email='organizer@example.com',
+            first_name='Test',
+            last_name='Organizer',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.space = Space.objects.create(
+            name='Main Hall',
+            location='Building A',
+            capacity=200,
+            price_per_hour='1500.00'
+        )
+        self.start = timezone.now().replace(microsecond=0) + timedelta(days=2)
+        self.existing = Event.objects.create(
+            event_name='Board Meeting',
+            start_datetime=self.start,
+            end_datetime=self.start + timedelta(hours=2),
+            organizer_name='Test Organizer',
+            organizer_email='organizer@example.com',
+            user=self.user,
+            space=self.space,
+            status='confirmed'
+        )
+
+    def booking_data(self, start, end):
+        return {
+            'event_name': 'Team Workshop',
+            'start_datetime': start.isoformat(),
+            'end_datetime': end.isoformat(),
+            'organizer_name': 'Test Organizer',
+            'organizer_email': 'organizer@example.com',
+            'event_type': 'workshop',
+            'space': self.space.id,
+        }
+
+    def test_conflict_detected_from_database(self):
+        """A cold index still rejects overlapping bookings"""
+        data = self.booking_data(self.start + timedelta(hours=1), self.start + timedelta(hours=3))
+
+        response = self.client.post(self.url, data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.data['details']['booked_event'], 'Board Meeting')
+
+    def test_repeated_conflicts_served_from_index(self):
+        """Once a space schedule is warm, rejections need no overlap query"""
+        data = self.booking_data(self.start + timedelta(hours=1), self.start + timedelta(hours=3))
+        self.client.post(self.url, data, format='json')
+
+        # Remaining queries: the space lookup done by the serializer
+        with self.assertNumQueries(1):
+            response = self.client.post(self.url, data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.data['details']['status'], 'confirmed')
+
+    def test_constraint_violation_returns_conflict(self):
+        """Bookings the index has not seen yet are rejected by the database constraint"""
+        later = self.start + timedelta(days=1)
+        availability_index.find_conflict(self.space.id, later, later + timedelta(hours=1))
+        # Saved inside the test transaction, so the warm index never hears about it
+        Event.objects.create(
+            event_name='Late Addition',
+            start_datetime=later,
+            end_datetime=later + timedelta(hours=2),
+            organizer_name='Someone Else',
+            organizer_email='else@example.com',
+            user=self.user,
+            space=self.space
+        )
+
+        response = self.client.post(self.url, self.booking_data(later, later + timedelta(hours=1)), format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.data['details']['booked_event'], 'Late Addition')
+        self.assertEqual(Event.objects.filter(space=self.space).count(), 2)
+
+    def test_inactive_events_do_not_block(self):
+        """Cancelled and rejected events are outside the no-overlap constraint"""
+        self.existing.status = 'cancelled'
+        self.existing.save()
+
+        Event.objects.create(
+            event_name='Replacement',
+            start_datetime=self.start,
+            end_datetime=self.start + timedelta(hours=2),
+            organizer_name='Test Organizer',
+            organizer_email='organizer@example.com',
+            user=self.user,
+            space=self.space
+        )
+        with self.assertRaises(IntegrityError):
+            Event.objects.create(
+                event_name='Double Booking',
+                start_datetime=self.start + timedelta(hours=1),
+                end_datetime=self.start + timedelta(hours=3),
+                organizer_name='Test Organizer',
+                organizer_email='organizer@example.com',
+                user=self.user,
+                space=self.space
+            )
+
+    def test_booking_queues_email_instead_of_sending(self):
+        """Booking writes an outbox row and leaves SMTP to the drain task"""
+        data = self.booking_data(self.start + timedelta(days=1), self.start + timedelta(days=1, hours=1))
+
+        with mock.patch('apps.bookings.tasks.drain_email_outbox.delay') as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(self.url, data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(EmailOutbox.objects.filter(kind='booking_submitted', status='pending').count(), 1)
+        delay.assert_called_once_with()
+
+        drain_email_outbox()
+
+        self.assertEqual(EmailOutbox.objects.get().status, 'sent')
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['organizer@example.com'])
+        self.assertIn('Team Workshop', mail.outbox[0].subject)
+
+    def test_outbox_rows_are_claimed_before_sending(self):
+        outbox = EmailOutbox.objects.create(kind='booking_submitted', event=self.existing)
+        seen = []
+
+        def send_messages(messages):
+            # The claim has been written before the SMTP conversation starts
+            seen.append(EmailOutbox.objects.get(pk=outbox.pk).status)
+            return len(messages)
+
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend.send_messages', side_effect=send_messages):
+            drain_email_outbox()
+        self.assertEqual(seen, ['sending'])
+        outbox.refresh_from_db()
+        self.assertEqual((outbox.status, outbox.claimed_until), ('sent', None))
+
+        # Claims that are still leased are left alone; expired ones are taken over
+        leased = EmailOutbox.objects.create(
+            kind='booking_submitted', event=self.existing, status='sending',
+            claimed_until=timezone.now() + timedelta(minutes=5)
+        )
+        expired = EmailOutbox.objects.create(
+            kind='booking_submitted', event=self.existing, status='sending',
+            claimed_until=timezone.now() - timedelta(minutes=5)
+        )
+        self.assertEqual(claim_outbox_batch(10), [expired])
+        leased.refresh_from_db()
+        self.assertEqual(leased.status, 'sending')
+
+    def test_retried_outbox_row_does_not_resend_accepted_messages(self):
+        outbox = EmailOutbox.objects.create(kind='booking_submitted', event=self.existing)
+        accepted = []
+        failures = [ConnectionError('Connection reset')]
+
+        def send_messages(messages):
+            # The second message fails once, after the first was accepted
+            if len(accepted) == 1 and failures:
+                raise failures.pop()
+            accepted.extend(message.to for message in messages)
+            return len(messages)
+
+        with override_settings(ADMIN_EMAIL='admin@example.com'), mock.patch(
+            'django.core.mail.backends.locmem.EmailBackend.send_messages', side_effect=send_messages
+        ):
+            # Eager retries run straight away
+            drain_email_outbox.apply()
+
+        outbox.refresh_from_db()
+        self.assertEqual((outbox.status, outbox.attempts, outbox.messages_sent), ('sent', 1, 2))
+        self.assertEqual(len(accepted), 2)
+        self.assertNotEqual(accepted[0], accepted[1])
+
+    def test_index_follows_event_changes(self):
+        """Saving and deleting events updates the warm index on commit"""
+        availability_index.find_conflict(self.space.id, self.start, self.start + timedelta(hours=1))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.existing.status = 'cancelled'
+            self.existing.save()
+        self.assertIsNone(
+            availability_index.find_conflict(self.space.id, self.start, self.start + timedelta(hours=1))
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.existing.status = 'pending'
+            self.existing.save()
+        self.assertEqual(
+            availability_index.find_conflict(self.space.id, self.start, self.start + timedelta(hours=1)).id,
+            self.existing.id
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.existing.delete()
+        self.assertIsNone(
+            availability_index.find_conflict(self.space.id, self.start, self.start + timedelta(hours=1))
+        )
+
+
+class BookingSerializerTestCase(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='organizer@example.com',
+            first_name='Test',
+            last_name='Organizer',
+            password='testpass123'
+        )
+        self.space = Space.objects.create(
+            name='Main Hall',
+            location='Building A',
+            capacity=200,
+            price_per_hour='1500.00'
+        )
+        self.start = timezone.now().replace(microsecond=0) + timedelta(days=2)
+
+    def booking_data(self, offset_hours):
+        return {
+            'event_name': 'Planning Session',
+            'start_datetime': (self.start + timedelta(hours=offset_hours)).isoformat(),
+            'end_datetime': (self.start + timedelta(hours=offset_hours + 2)).isoformat(),
+            'organizer_name': 'Test Organizer',
+            'organizer_email': 'organizer@example.com',
+            'event_type': 'meeting',
+            'attendance': 20,
+            'user': self.user.id,
+            'space': self.space.id,
+        }
+
+    def test_overlapping_booking_reported_as_validation_error(self):
+        first = BookingSerializer(data=self.booking_data(0))
+        self.assertTrue(first.is_valid(), first.errors)
+        first.save()
+
+        second = BookingSerializer(data=self.booking_data(1))
+        self.assertTrue(second.is_valid(), second.errors)
+        with self.assertRaises(ValidationError) as raised:
+            second.save()
+
+        self.assertIn('non_field_errors', raised.exception.detail)
+        self.assertEqual(Booking.objects.count(), 1)
+
+
+class ConcurrentBookingTestCase(TransactionTestCase):
+
+    threads = 8
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='organizer@example.com',
+            first_name='Test',
+            last_name='Organizer',
+            password='testpass123'
+        )
+        self.space = Space.objects.create(
+            name='Main Hall',
+            location='Building A',
+            capacity=200,
+            price_per_hour='1500.00'
+        )
+        self.start = timezone.now().replace(microsecond=0) + timedelta(days=2)
+
+    def book(self, barrier, results, index):
+        try:
+            barrier.wait()
+            # SQLite reports a locked table instead of waiting for the other
+            # writer, so retry the way a busy timeout would
+            for attempt in range(50):
+                try:
+                    Event.objects.create(
+                        event_name=f'Attempt {index}',
+                        start_datetime=self.start + timedelta(minutes=index),
+                        end_datetime=self.start + timedelta(hours=2),
+                        organizer_name='Test Organizer',
+                        organizer_email='organizer@example.com',
+                        user=self.user,
+                        space=self.space
+                    )
+                    results.append('created')
+                    return
+                except IntegrityError:
+                    results.append('conflict')
+                    return
+                except OperationalError:
+                    time.sleep(0.01)
+            results.append('gave up')
+        finally:
+            connection.close()
+
+    def test_only_one_booking_wins_the_slot(self):
+        """Many threads booking the same slot end up with exactly one event"""
+        barrier = threading.Barrier(self.threads)
+        results = []
+        workers = [
+            threading.Thread(target=self.book, args=(barrier, results, index))
+            for index in range(self.threads)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        self.assertEqual(results.count('created'), 1)
+        self.assertEqual(results.count('conflict'), self.threads - 1)
+        self.assertEqual(Event.objects.filter(space=self.space).count(), 1)
+
+
+class MarkAsConfirmedTestCase(TestCase):
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser(
+            email='admin@example.com',
+            first_name='Site',
+            last_name='Admin',
+            password='adminpass123'
+        )
+        self.client.force_login(self.admin)
+        self.url = reverse('admin:bookings_event_changelist')
+        self.spaces = [
+            Space.objects.create(name=f'Room {index}', location='Building A', capacity=20, price_per_hour='100.00')
+            for index in range(2)
+        ]
+        self.start = timezone.now().replace(microsecond=0) + timedelta(days=2)
+
+    def create_pending(self, count, offset=0):
+        return [
+            Event.objects.create(
+                event_name=f'Request {index}',
+                start_datetime=self.start + timedelta(hours=2 * index),
+                end_datetime=self.start + timedelta(hours=2 * index + 1),
+                organizer_name='Test Organizer',
+                organizer_email='organizer@example.com',
+                user=self.admin,
+                space=self.spaces[index % 2]
+            )
+            for index in range(offset, offset + count)
+        ]
+
+    def confirm(self, events):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.url, {
+                'action': 'mark_as_confirmed',
+                '_selected_action': [event.pk for event in events],
+            })
+        self.assertEqual(response.status_code, 302)
+        return len(queries)
+
+    def test_confirms_selection_in_constant_queries(self):
+        """Query count does not grow with the number of selected events"""
+        small = self.confirm(self.create_pending(2))
+        large = self.confirm(self.create_pending(10, offset=2))
+
+        self.assertEqual(small, large)
+        self.assertEqual(Event.objects.filter(status='confirmed').count(), 12)
+        self.assertEqual(EmailOutbox.objects.filter(kind='booking_approved').count(), 12)
+
+
+class UpdateSpaceStatusTestCase(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='test@example.com',
+            first_name='Test',
+            last_name='User',
+            password='testpass123'
+        )
+        self.spaces = [
+            Space.objects.create(name=f'Room {index}', location='Building A', capacity=20, price_per_hour='100.00', status='booked')
+            for index in range(2)
+        ]
+        self.now = timezone.now().replace(microsecond=0)
+
+    def create_event(self, space, start, end, status='confirmed'):
+        event = Event.objects.create(
+            event_name='Event',
+            start_datetime=self.now + timedelta(days=30),
+            end_datetime=self.now + timedelta(days=30, hours=1),
+            organizer_name='Test Organizer',
+            organizer_email='organizer@example.com',
+            user=self.user,
+            space=space,
+            status=status
+        )
+        # Event.save() refuses past starts, so move it into place directly
+        Event.objects.filter(pk=event.pk).update(start_datetime=start, end_datetime=end)
+        event.refresh_from_db()
+        return event
+
+    def test_completes_ended_events_and_frees_idle_spaces(self):
+        update_space_status()
+        # Ended after the previous run
+        ended = self.create_event(self.spaces[0], self.now - timedelta(hours=3), timezone.now())
+        self.create_event(self.spaces[1], self.now - timedelta(hours=3), timezone.now())
+        upcoming = self.create_event(self.spaces[1], self.now + timedelta(days=1), self.now + timedelta(days=1, hours=1))
+
+        # Savepoints, watermark, two UPDATE ... RETURNING, watermark, releases,
+        # then the events to schedule completions for
+        with self.assertNumQueries(9):
+            result = update_space_status()
+
+        self.assertEqual(result, 'Completed 2 events and freed 1 spaces')
+        ended.refresh_from_db()
+        upcoming.refresh_from_db()
+        self.assertEqual(ended.status, 'completed')
+        self.assertEqual(upcoming.status, 'confirmed')
+        self.spaces[0].refresh_from_db()
+        self.spaces[1].refresh_from_db()
+        self.assertEqual(self.spaces[0].status, 'free')
+        self.assertEqual(self.spaces[1].status, 'booked')
+
+    def test_watermark_skips_events_ended_before_last_run(self):
+        update_space_status()
+        # Ended before the previous run but was never swept
+        missed = self.create_event(self.spaces[0], self.now - timedelta(hours=3), self.now - timedelta(hours=2))
+
+        self.assertEqual(update_space_status(), 'Completed 0 events and freed 0 spaces')
+        self.assertEqual(update_space_status(full=True), 'Completed 1 events and freed 1 spaces')
+        missed.refresh_from_db()
+        self.assertEqual(missed.status, 'completed')
+
+    def test_complete_event_frees_space_at_end_time(self):
+        end = self.now - timedelta(minutes=1)
+        event = self.create_event(self.spaces[0], self.now - timedelta(hours=1), end)
+
+        self.assertEqual(complete_event(event.pk, end.isoformat()), f'Completed event {event.pk} and freed 1 spaces')
+        event.refresh_from_db()
+        self.spaces[0].refresh_from_db()
+        self.assertEqual(event.status, 'completed')
+        self.assertEqual(self.spaces[0].status, 'free')
+        # Redelivery is a no-op
+        self.assertEqual(complete_event(event.pk, end.isoformat()), f'Event {event.pk} is no longer due for completion')
+
+    def test_complete_event_ignores_rescheduled_and_rejected_events(self):
+        end = self.now - timedelta(minutes=1)
+        moved = self.create_event(self.spaces[0], self.now - timedelta(hours=1), self.now + timedelta(hours=1))
+        rejected = self.create_event(self.spaces[1], self.now - timedelta(hours=1), end, status='rejected')
+
+        complete_event(moved.pk, end.isoformat())
+        complete_event(rejected.pk, end.isoformat())
+
+        moved.refresh_from_db()
+        rejected.refresh_from_db()
+        self.assertEqual(moved.status, 'confirmed')
+        self.assertEqual(rejected.status, 'rejected')
+        self.assertEqual(Space.objects.filter(status='booked').count(), 2)
+
+    def test_schedules_completion_within_horizon_only(self):
+        soon = self.create_event(self.spaces[0], self.now + timedelta(minutes=10), self.now + timedelta(minutes=40))
+        later = self.create_event(self.spaces[1], self.now + timedelta(days=3), self.now + timedelta(days=3, hours=1))
+
+        with mock.patch('apps.bookings.tasks.complete_event.apply_async') as apply_async:
+            schedule_event_completion(soon)
+            schedule_event_completion(later)
+
+        apply_async.assert_called_once_with((soon.pk, soon.end_datetime.isoformat()), eta=soon.end_datetime)
+
+    def test_sweep_schedules_each_completion_once(self):
+        soon = self.create_event(self.spaces[0], self.now + timedelta(minutes=10), self.now + timedelta(minutes=40))
+        with mock.patch('apps.bookings.tasks.complete_event.apply_async') as apply_async:
+            update_space_status()
+            update_space_status()
+        apply_async.assert_called_once_with((soon.pk, soon.end_datetime.isoformat()), eta=soon.end_datetime)
+
+        # An event that entered the horizon since the previous run is picked up
+        TaskWatermark.objects.update(value=self.now - timedelta(hours=1))
+        later = self.create_event(self.spaces[1], self.now + timedelta(minutes=70), self.now + timedelta(minutes=90))
+        with mock.patch('apps.bookings.tasks.complete_event.apply_async') as apply_async:
+            update_space_status()
+        apply_async.assert_called_once_with((later.pk, later.end_datetime.isoformat()), eta=later.end_datetime)
+
+    def test_check_status_endpoint_completes_in_one_pass(self):
+        admin = User.objects.create_superuser(
+            email='admin@example.com',
+            first_name='Site',
+            last_name='Admin',
+            password='adminpass123'
+        )
+        client = APIClient()
+        client.force_authenticate(user=admin)
+        url = reverse('check-event-status')
+        ended = [
+            self.create_event(space, self.now - timedelta(hours=3), self.now - timedelta(hours=2))
+            for space in self.spaces
+        ]
+
+        response = client.post(f'{url}?dry_run=1')
+        self.assertEqual(response.json()['events_completed'], 2)
+        self.assertEqual(response.json()['spaces_freed'], 2)
+        self.assertEqual(Event.objects.filter(status='confirmed').count(), 2)
+
+        response = client.post(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['completed_event_ids'], sorted(event.pk for event in ended))
+        self.assertEqual(response.json()['freed_space_ids'], sorted(space.pk for space in self.spaces))
+        self.assertFalse(Event.objects.filter(status='confirmed').exists())
+
+
+class KeysetPaginationTestCase(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='test@example.com',
+            first_name='Test',
+            last_name='User',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('upcoming-events')
+        spaces = [
+            Space.objects.create(name=f'Room {index}', location='Building A', capacity=20, price_per_hour='100.00')
+            for index in range(2)
+        ]
+        start = timezone.now().replace(microsecond=0) + timedelta(days=1)
+        # Pairs of events share a start time, so the id breaks the tie
+        self.events = [
+            Event.objects.create(
+                event_name=f'Event {index}',
+                start_datetime=start + timedelta(hours=index // 2),
+                end_datetime=start + timedelta(hours=index // 2, minutes=30),
+                organizer_name='Test Organizer',
+                organizer_email='organizer@example.com',
+                user=self.user,
+                space=spaces[index % 2],
+                status='confirmed'
+            )
+            for index in range(5)
+        ]
+
+    def test_walks_every_event_once_in_order(self):
+        response = self.client.get(self.url, {'limit': 2})
+        self.assertEqual(response.data['count'], 5)
+        self.assertEqual(response.data['message'], 'Found 5 upcoming events')
+
+        seen = [event['id'] for event in response.data['data']]
+        while response.data['next']:
+            # ETag probe and the page itself
+            with self.assertNumQueries(2):
+                response = self.client.get(response.data['next'])
+            self.assertIsNone(response.data['count'])
+            seen.extend(event['id'] for event in response.data['data'])
+
+        self.assertEqual(seen, [event.pk for event in self.events])
+
+    def test_first_page_keeps_envelope_without_extra_count(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url)
+        self.assertEqual(response.data['count'], 5)
+        self.assertIsNone(response.data['next'])
+        self.assertEqual(len(response.data['data']), 5)
+
+    def test_rejects_invalid_cursor(self):
+        response = self.client.get(self.url, {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_my_events_status_histogram_is_one_query(self):
+        Event.objects.filter(pk=self.events[0].pk).update(status='pending')
+
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('my-events'), {'limit': 10})
+
+        self.assertEqual(response.data['events_by_status'], {'confirmed': 4, 'pending': 1})
+        self.assertEqual(response.data['count'], 5)
+
+    def test_streams_every_event_as_ndjson(self):
+        response = self.client.get(self.url, {'stream': 'ndjson'})
+
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(line)['id'] for line in lines], [event.pk for event in self.events])
+
+    def test_values_plan_matches_event_list_serializer(self):
+        queryset = Event.objects.select_related('space').order_by('start_datetime', 'id')
+        expected = JSONRenderer().render(EventListSerializer(queryset, many=True).data)
+
+        with self.assertNumQueries(1):
+            actual = JSONRenderer().render(ValuesPlan(EventListSerializer).serialize(queryset))
+        self.assertEqual(actual, expected)
+
+    def test_sparse_fields_keep_pagination_working(self):
+        response = self.client.get(self.url, {'limit': 2, 'fields': 'event_name'})
+
+        self.assertEqual(response.data['data'], [{'event_name': 'Event 0'}, {'event_name': 'Event 1'}])
+        response = self.client.get(response.data['next'])
+        self.assertEqual(response.data['data'], [{'event_name': 'Event 2'}, {'event_name': 'Event 3'}])
+
+    def test_unchanged_listing_is_not_modified(self):
+        response = self.client.get(self.url)
+        etag = response['ETag']
+        self.assertFalse(response.has_header('Last-Modified'))
+
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        Event.objects.filter(pk=self.events[0].pk).update(status='cancelled', updated_at=timezone.now())
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_renamed_space_changes_the_etag(self):
+        etag = self.client.get(self.url)['ETag']
+
+        space = self.events[0].space
+        space.name = 'Renamed room'
+        space.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['data'][0]['space_name'], 'Renamed room')
+
+    def test_if_modified_since_does_not_hide_deletions(self):
+        since = http_date(timezone.now().timestamp() + 60)
+        self.events[0].delete()
+        for url in [self.url, reverse('my-events')]:
+            response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=since)
+            self.assertEqual(response.status_code, status.HTTP_200_OK, url)
+
+
+class CalendarFeedTestCase(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            email='test@example.com',
+            first_name='Test',
+            last_name='User',
+            password='testpass123'
+        )
+        self.space = Space.objects.create(
+            name='Main Hall', location='Building A', capacity=50, price_per_hour='100.00'
+        )
+        start = timezone.now().replace(microsecond=0) + timedelta(days=1)
+        self.event = Event.objects.create(
+            event_name='Launch, Party; Night',
+            start_datetime=start,
+            end_datetime=start + timedelta(hours=2),
+            organizer_name='Test Organizer',
+            organizer_email='organizer@example.com',
+            user=self.user,
+            space=self.space,
+            status='pending'
+        )
+        self.url = reverse('space-calendar', args=[self.space.pk])
+
+    def test_space_feed_lists_active_events(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'text/calendar; charset=utf-8')
+        body = b''.join(response.streaming_content).decode()
+        self.assertTrue(body.startswith('BEGIN:VCALENDAR\r\n'))
+        self.assertIn('SUMMARY:Launch\\, Party\\; Night\r\n', body)
+        self.assertIn('STATUS:TENTATIVE\r\n', body)
+        self.assertTrue(body.endswith('END:VCALENDAR\r\n'))
+
+    def test_repeat_polls_are_served_from_cache(self):
+        response = self.client.get(self.url)
+        b''.join(response.streaming_content)
+        etag = response['ETag']
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertIn(b'Launch', response.content)
+
+    def test_event_change_refreshes_feed(self):
+        etag = self.client.get(self.url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.event.status = 'confirmed'
+            self.event.save()
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn(b'STATUS:CONFIRMED', b''.join(response.streaming_content))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.event.status = 'cancelled'
+            self.event.save()
+        response = self.client.get(self.url)
+        self.assertNotIn(b'BEGIN:VEVENT', b''.join(response.streaming_content))
+
+    def test_my_events_feed_needs_valid_token(self):
+        url = reverse('my-events-calendar')
+        response = self.client.get(url, {'token': 'forged'})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        self.client.force_authenticate(user=self.user)
+        link = self.client.get(reverse('my-events-calendar-link')).data['url']
+        self.client.force_authenticate(user=None)
+        self.assertIn(calendar_token(self.user), link)
+
+        response = self.client.get(url, {'token': calendar_token(self.user)})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn(b'SUMMARY:Launch', b''.join(response.streaming_content))
+
+    def test_calendar_token_is_rejected_once_revoked_expired_or_inactive(self):
+        url = reverse('my-events-calendar')
+        old_token = calendar_token(self.user)
+
+        self.client.force_authenticate(user=self.user)
+        link = self.client.post(reverse('my-events-calendar-link')).data['url']
+        self.client.force_authenticate(user=None)
+        response = self.client.get(url, {'token': old_token})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        response = self.client.get(link)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        token = link.split('token=')[1]
+        with mock.patch('django.core.signing.time.time', return_value=time.time() + 400 * 24 * 3600):
+            response = self.client.get(url, {'token': token})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        response = self.client.get(url, {'token': token})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_space_change_refreshes_feeds(self):
+        etag = self.client.get(self.url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.space.name = 'Great Hall'
+            self.space.save()
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn(b'LOCATION:Great Hall\\, Building A', b''.join(response.streaming_content))
+
+    def test_long_lines_are_folded(self):
+        lines = fold('DESCRIPTION:' + 'é' * 80)[:-2].split('\r\n')
+        self.assertGreater(len(lines), 1)
+        self.assertTrue(all(len(line.encode()) <= 75 for line in lines))
+        self.assertTrue(all(line.startswith(' ') for line in lines[1:]))
+
+
+class BulkBookEventsTestCase(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            email='test@example.com',
+            first_name='Test',
+            last_name='User',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('bulk-book-events')
+        self.spaces = [
+            Space.objects.create(name=f'Room {index}', location='Building A', capacity=20, price_per_hour='100.00')
+            for index in range(2)
+        ]
+        self.start = timezone.now().replace(microsecond=0) + timedelta(days=1)
+        self.existing = Event.objects.create(
+            event_name='Existing',
+            start_datetime=self.at(0),
+            end_datetime=self.at(2),
+            organizer_name='Test Organizer',
+            organizer_email='organizer@example.com',
+            user=self.user,
+            space=self.spaces[0],
+            status='confirmed'
+        )
+
+    def at(self, hours):
+        return self.start + timedelta(hours=hours)
+
+    def row(self, name, start, end, space=0):
+        return {
+            'event_name': name,
+            'start_datetime': self.at(start).isoformat(),
+            'end_datetime': self.at(end).isoformat(),
+            'organizer_name': 'Test Organizer',
+            'organizer_email': 'organizer@example.com',
+            'event_type': 'meeting',
+            'space': self.spaces[space].pk
+        }
+
+    def test_reports_every_row_and_books_the_rest(self):
+        rows = [
+            self.row('Clashes with existing', 1, 3),
+            self.row('First', 4, 6),
+            self.row('Overlaps first', 5, 7),
+            self.row('Other room', 0, 2, space=1),
+            {**self.row('Backwards', 9, 8)},
+            {**self.row('Nowhere', 10, 11), 'space': 9999},
+        ]
+        # Spaces, one range query per space, one insert, the email outbox and 4 savepoint statements
+        with mock.patch('apps.bookings.tasks.drain_email_outbox.delay'), self.captureOnCommitCallbacks(execute=True):
+            with self.assertNumQueries(9):
+                response = self.client.post(self.url, rows, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['created'], 2)
+        statuses = [result['status'] for result in response.data['results']]
+        self.assertEqual(statuses, ['conflict', 'created', 'conflict', 'created', 'invalid', 'invalid'])
+        self.assertEqual(response.data['results'][0]['details']['booked_event'], 'Existing')
+        self.assertEqual(response.data['results'][2]['error'], 'Overlaps row 1 of this batch')
+        self.assertEqual(
+            set(Event.objects.filter(status='pending').values_list('event_name', flat=True)),
+            {'First', 'Other room'}
+        )
+        self.assertEqual(EmailOutbox.objects.filter(kind='booking_submitted').count(), 2)
+        # The index was refreshed even though bulk_create skips the signals
+        self.assertIsNotNone(availability_index.find_conflict(self.spaces[1].pk, self.at(1), self.at(3)))
+
+    def test_atomic_batch_books_nothing_on_conflict(self):
+        rows = [self.row('First', 4, 6), self.row('Clashes', 1, 3)]
+        response = self.client.post(f'{self.url}?atomic=true', rows, format='json')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual([result['status'] for result in response.data['results']], ['skipped', 'conflict'])
+        self.assertFalse(Event.objects.filter(event_name='First').exists())
+
+    def test_accepts_csv(self):
+        header = 'event_name,start_datetime,end_datetime,organizer_name,organizer_email,event_type,attendance,space'
+        lines = [header] + [
+            f'Workshop {index},{self.at(3 + index).isoformat()},{self.at(4 + index).isoformat()},'
+            f'Test Organizer,organizer@example.com,workshop,,{self.spaces[1].pk}'
+            for index in range(3)
+        ]
+        response = self.client.post(
+            self.url, ('\ufeff' + '\r\n'.join(lines)).encode(), content_type='text/csv'
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['created'], 3)
+        self.assertEqual(Event.objects.filter(space=self.spaces[1], attendance__isnull=True).count(), 3)
+
+    def test_rejects_empty_and_oversized_batches(self):
+        response = self.client.post(self.url, [], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        with self.settings(BULK_BOOKING_MAX_ROWS=1):
+            response = self.client.post(self.url, [self.row('A', 4, 5), self.row('B', 6, 7)], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class RecurringBookingTestCase(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            email='test@example.com',
+            first_name='Test',
+            last_name='User',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.space = Space.objects.create(
+            name='Main Hall', location='Building A', capacity=50, price_per_hour='100.00'
+        )
+        self.start = timezone.now().replace(microsecond=0) + timedelta(days=1)
+
+    def book(self, recurrence, query=''):
+        return self.client.post(f"{reverse('book-event')}{query}", {
+            'event_name': 'Standup',
+            'start_datetime': self.start.isoformat(),
+            'end_datetime': (self.start + timedelta(hours=1)).isoformat(),
+            'organizer_name': 'Test Organizer',
+            'organizer_email': 'organizer@example.com',
+            'event_type': 'meeting',
+            'space': self.space.pk,
+            'recurrence': recurrence
+        }, format='json')
+
+    def test_books_free_occurrences_and_sends_one_digest(self):
+        Event.objects.create(
+            event_name='Existing',
+            start_datetime=self.start + timedelta(weeks=2),
+            end_datetime=self.start + timedelta(weeks=2, hours=1),
+            organizer_name='Test Organizer',
+            organizer_email='organizer@example.com',
+            user=self.user,
+            space=self.space,
+            status='confirmed'
+        )
+        with mock.patch('apps.bookings.tasks.drain_email_outbox.delay'), self.captureOnCommitCallbacks(execute=True):
+            response = self.book('RRULE:FREQ=WEEKLY;COUNT=5')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['booked'], 4)
+        self.assertEqual(response.data['skipped'][0]['details']['booked_event'], 'Existing')
+        series = Event.objects.filter(series=response.data['series'])
+        self.assertEqual(series.count(), 4)
+        self.assertEqual(set(series.values_list('status', flat=True)), {'pending'})
+
+        outbox = EmailOutbox.objects.get()
+        self.assertEqual(outbox.kind, 'booking_series_submitted')
+        drain_email_outbox.apply()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn('Occurrences (4)', mail.outbox[0].body)
+
+    def test_atomic_series_books_nothing_on_conflict(self):
+        Event.objects.create(
+            event_name='Existing',
+            start_datetime=self.start + timedelta(days=1),
+            end_datetime=self.start + timedelta(days=1, hours=1),
+            organizer_name='Test Organizer',
+            organizer_email='organizer@example.com',
+            user=self.user,
+            space=self.space,
+            status='pending'
+        )
+        response = self.book('FREQ=DAILY;COUNT=3', query='?atomic=true')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(len(response.data['skipped']), 3)
+        self.assertFalse(Event.objects.filter(event_name='Standup').exists())
+
+    def test_unbounded_rules_are_capped(self):
+        with self.settings(RECURRENCE_MAX_OCCURRENCES=50):
+            # Every 15 minutes forever: expansion stops after 51 occurrences
+            response = self.book('FREQ=MINUTELY;INTERVAL=15')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('recurrence', response.data['errors'])
+
+        response = self.book('FREQ=SECONDLY;COUNT=2')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.book('DTSTART:20200101T000000Z\nRRULE:FREQ=DAILY')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_rules_that_never_occur_are_rejected_quickly(self):
+        rules = [
+            'FREQ=MINUTELY;BYMONTH=2;BYMONTHDAY=30',
+            'FREQ=MINUTELY;BYSECOND=0;BYMINUTE=0;BYHOUR=0;BYMONTHDAY=31;BYMONTH=2',
+            'FREQ=MINUTELY;BYYEARDAY=366;BYMONTH=1',
+            'FREQ=MONTHLY;INTERVAL=12;BYMONTH=%d' % ((self.start.month % 12) + 1),
+            'FREQ=DAILY;INTERVAL=0',
+        ]
+        for rule in rules:
+            started = time.monotonic()
+            response = self.book(rule)
+            self.assertLess(time.monotonic() - started, 2, rule)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, rule)
+            self.assertIn('recurrence', response.data['errors'])
+
+        # Possible, but only beyond the horizon: dateutil stops at the capped UNTIL
+        started = time.monotonic()
+        with self.settings(RECURRENCE_HORIZON_DAYS=30):
+            response = self.book('FREQ=MINUTELY;BYMONTH=%d;BYMONTHDAY=1' % ((self.start.month + 5) % 12 + 1))
+        self.assertLess(time.monotonic() - started, 2)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_overlapping_occurrences_are_swept_within_the_series(self):
+        # Hour-long events every 30 minutes: every other one overlaps
+        response = self.book('FREQ=MINUTELY;INTERVAL=30;COUNT=4')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['booked'], 2)
+        self.assertEqual(len(response.data['skipped']), 2)
+
+
+class SlotHoldTestCase(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        availability_index.clear()
+        self.user = User.objects.create_user(
+            email='test@example.com',
+            first_name='Test',
+            last_name='User',
+            password='testpass123'
+        )
+        self.other = User.objects.create_user(
+            email='other@example.com',
+            first_name='Other',
+            last_name='User',
+            password='testpass123'
+        )
+        self.space = Space.objects.create(
+            name='Main Hall', location='Building A', capacity=50, price_per_hour='100.00'
+        )
+        self.start = timezone.now().replace(microsecond=0) + timedelta(days=1)
+        self.slot = {
+            'space': self.space.pk,
+            'start_datetime': self.start.isoformat(),
+            'end_datetime': (self.start + timedelta(hours=2)).isoformat(),
+        }
+
+    def hold(self, user, **extra):
+        self.client.force_authenticate(user=user)
+        return self.client.post(reverse('hold-slot'), {**self.slot, **extra}, format='json')
+
+    def book(self, user, **extra):
+        self.client.force_authenticate(user=user)
+        return self.client.post(reverse('book-event'), {
+            **self.slot,
+            'event_name': 'Launch',
+            'organizer_name': 'Test Organizer',
+            'organizer_email': 'organizer@example.com',
+            'event_type': 'meeting',
+            **extra
+        }, format='json')
+
+    def test_hold_blocks_others_and_is_consumed_by_booking(self):
+        response = self.hold(self.user)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        token = response.data['hold']
+
+        self.assertEqual(self.hold(self.other).status_code, status.HTTP_409_CONFLICT)
+        # Turned away after the serializer's space lookup, from the cache alone
+        with self.assertNumQueries(1):
+            response = self.book(self.other)
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.data['message'], 'Slot is being held by another user')
+
+        with mock.patch('apps.bookings.tasks.drain_email_outbox.delay'), self.captureOnCommitCallbacks(execute=True):
+            response = self.book(self.user, hold=token)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(active_holds(self.space.pk), [])
+
+    def test_hold_must_cover_the_booking(self):
+        token = self.hold(self.user).data['hold']
+        response = self.book(self.user, hold=token, end_datetime=(self.start + timedelta(hours=3)).isoformat())
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('hold', response.data['errors'])
+
+    def test_expired_holds_disappear(self):
+        self.hold(self.user, minutes=1)
+        later = timezone.now() + timedelta(minutes=2)
+        with mock.patch('apps.bookings.holds.timezone.now', return_value=later):
+            self.assertEqual(active_holds(self.space.pk), [])
+            self.assertEqual(self.hold(self.other).status_code, status.HTTP_201_CREATED)
+
+    def test_release_hold(self):
+        token = self.hold(self.user).data['hold']
+        self.client.force_authenticate(user=self.other)
+        response = self.client.delete(reverse('release-hold', args=[token]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        self.client.force_authenticate(user=self.user)
+        response = self.client.delete(reverse('release-hold', args=[token]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.hold(self.other).status_code, status.HTTP_201_CREATED)
+
+
+PUBLIC_ADDRESS = [(2, 1, 6, '', ('93.184.215.14', 443))]
+
+
+class AsyncBookingTestCase(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        availability_index.clear()
+        self.user = User.objects.create_user(
+            email='test@example.com',
+            first_name='Test',
+            last_name='User',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.space = Space.objects.create(
+            name='Main Hall', location='Building A', capacity=50, price_per_hour='100.00'
+        )
+        self.start = timezone.now().replace(microsecond=0) + timedelta(days=1)
+
+    def book(self, name, **extra):
+        with mock.patch('apps.bookings.tasks.process_booking_ticket.apply_async') as apply_async, \
+                self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(f"{reverse('book-event')}?async=true", {
+                'event_name': name,
+                'start_datetime': self.start.isoformat(),
+                'end_datetime': (self.start + timedelta(hours=2)).isoformat(),
+                'organizer_name': 'Test Organizer',
+                'organizer_email': 'organizer@example.com',
+                'event_type': 'meeting',
+                'space': self.space.pk,
+                **extra
+            }, format='json')
+        return response, apply_async
+
+    def test_ring_moves_few_spaces_when_a_partition_is_added(self):
+        before = HashRing([f'bookings.p{number}' for number in range(4)])
+        after = HashRing([f'bookings.p{number}' for number in range(5)])
+        moved = sum(before.node_for(space_id) != after.node_for(space_id) for space_id in range(1000))
+        self.assertLess(moved, 350)
+        self.assertEqual(len({before.node_for(space_id) for space_id in range(1000)}), 4)
+
+    def test_ticket_is_routed_by_space_and_processed_once(self):
+        response, apply_async = self.book('Launch')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertFalse(Event.objects.exists())
+        ticket_id = response.data['ticket']
+        apply_async.assert_called_once_with((ticket_id,), queue=queue_for_space(self.space.pk))
+
+        with mock.patch('apps.bookings.tasks.drain_email_outbox.delay'):
+            self.assertEqual(process_booking_ticket(ticket_id), f'Ticket {ticket_id} booked')
+            self.assertEqual(process_booking_ticket(ticket_id), f'Ticket {ticket_id} was already processed')
+
+        response = self.client.get(reverse('booking-ticket', args=[ticket_id]))
+        self.assertEqual(response.data['status'], 'booked')
+        self.assertEqual(response.data['result']['message'], 'Event booked successfully')
+        self.assertEqual(Event.objects.get().pk, response.data['event'])
+
+    def test_conflicting_ticket_is_rejected_and_webhook_notified(self):
+        first, _ = self.book('First')
+        with mock.patch('apps.bookings.webhooks.socket.getaddrinfo', return_value=PUBLIC_ADDRESS):
+            second, _ = self.book('Second', callback_url='https://example.com/hook')
+        with mock.patch('apps.bookings.tasks.drain_email_outbox.delay'):
+            process_booking_ticket(first.data['ticket'])
+            with mock.patch('apps.bookings.tasks.deliver_booking_webhook.delay') as delay, \
+                    self.captureOnCommitCallbacks(execute=True):
+                process_booking_ticket(second.data['ticket'])
+        delay.assert_called_once_with(second.data['ticket'])
+
+        ticket = BookingTicket.objects.get(pk=second.data['ticket'])
+        self.assertEqual(ticket.status, 'rejected')
+        self.assertEqual(ticket.result['details']['booked_event'], 'First')
+
+        with mock.patch('apps.bookings.tasks.post_callback', return_value=200) as post_callback:
+            deliver_booking_webhook(str(ticket.pk))
+        url, body, headers = post_callback.call_args[0]
+        self.assertEqual(url, 'https://example.com/hook')
+        self.assertTrue(headers['X-Eventspace-Signature'].startswith('sha256='))
+        self.assertEqual(json.loads(body)['status'], 'rejected')
+
+    def test_callbacks_to_internal_hosts_are_refused(self):
+        for url in ['http://169.254.169.254/latest/meta-data', 'http://127.0.0.1:8000/', 'http://localhost/', 'http://10.0.0.5/hook']:
+            response, apply_async = self.book('Launch', callback_url=url)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, url)
+            self.assertIn('callback_url', response.data['errors'])
+        self.assertFalse(BookingTicket.objects.exists())
+
+        with self.settings(BOOKING_WEBHOOK_ALLOWED_HOSTS=['localhost']):
+            response, _ = self.book('Launch', callback_url='http://localhost/hook')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+
+        # DNS may point elsewhere by delivery time: the worker checks again
+        ticket = BookingTicket.objects.get()
+        with mock.patch('apps.bookings.webhooks.http.client.HTTPConnection.request') as request:
+            self.assertIn('Refused callback', deliver_booking_webhook(str(ticket.pk)))
+        request.assert_not_called()
+
+    def test_webhook_does_not_follow_redirects(self):
+        hits = []
+
+        class Redirect(BaseHTTPRequestHandler):
+            def do_POST(self):
+                hits.append(self.path)
+                self.send_response(302)
+                self.send_header('Location', 'http://169.254.169.254/')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        server = HTTPServer(('127.0.0.1', 0), Redirect)
+        thread = threading.Thread(target=server.handle_request)
+        thread.start()
+        try:
+            with self.settings(BOOKING_WEBHOOK_ALLOWED_HOSTS=['127.0.0.1']):
+                response_status = post_callback(f'http://127.0.0.1:{server.server_port}/hook?a=1', b'{}', {})
+        finally:
+            thread.join(5)
+            server.server_close()
+        self.assertEqual(response_status, 302)
+        self.assertEqual(hits, ['/hook?a=1'])
+
+    def test_worker_rechecks_space_status(self):
+        response, _ = self.book('Launch')
+        Space.objects.filter(pk=self.space.pk).update(status='booked')
+        process_booking_ticket(response.data['ticket'])
+
+        ticket = BookingTicket.objects.get()
+        self.assertEqual(ticket.status, 'rejected')
+        self.assertEqual(ticket.result['message'], 'Space is not available for booking')
+        self.assertFalse(Event.objects.exists())
+
+    def test_worker_consumes_the_hold(self):
+        hold, _ = place_hold(self.user, self.space.pk, self.start, self.start + timedelta(hours=2))
+        response, _ = self.book('Launch', hold=hold.token)
+        with mock.patch('apps.bookings.tasks.drain_email_outbox.delay'), self.captureOnCommitCallbacks(execute=True):
+            process_booking_ticket(response.data['ticket'])
+        self.assertEqual(BookingTicket.objects.get().status, 'booked')
+        self.assertIsNone(get_hold(hold.token))
+        self.assertEqual(active_holds(self.space.pk), [])
+
+        # A hold that does not cover the booking is refused, like the synchronous path
+        other, _ = place_hold(self.user, self.space.pk, self.start + timedelta(days=1), self.start + timedelta(days=1, hours=1))
+        ticket = BookingTicket.objects.create(
+            user=self.user,
+            space=self.space,
+            payload=dict(BookingTicket.objects.get().payload, event_name='Later', hold=other.token)
+        )
+        process_booking_ticket(str(ticket.pk))
+        ticket.refresh_from_db()
+        self.assertEqual(ticket.status, 'rejected')
+        self.assertIn('hold', ticket.result['errors'])
+
+    def test_rejects_bad_callback_url(self):
+        response, apply_async = self.book('Launch', callback_url='ftp://example.com')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(BookingTicket.objects.exists())
+        apply_async.assert_not_called()
+
+    def test_other_users_cannot_poll_a_ticket(self):
+        response, _ = self.book('Launch')
+        other = User.objects.create_user(
+            email='other@example.com',
+            first_name='Other',
+            last_name='User',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=other)
+        response = self.client.get(reverse('booking-ticket', args=[response.data['ticket']]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class ConflictEngineTestCase(TestCase):
+
+    def setUp(self):
+        availability_index.clear()
+        self.user = User.objects.create_user(
+            email='test@example.com',
+            first_name='Test',
+            last_name='User',
+            password='testpass123'
+        )
+        self.spaces = [
+            Space.objects.create(name=f'Room {index}', location='Building A', capacity=20, price_per_hour='100.00')
+            for index in range(2)
+        ]
+        self.start = timezone.now().replace(microsecond=0) + timedelta(days=1)
+        self.events = [
+            Event.objects.create(
+                event_name=name,
+                start_datetime=self.at(offset),
+                end_datetime=self.at(offset + 2),
+                organizer_name='Test Organizer',
+                organizer_email='organizer@example.com',
+                user=self.user,
+                space=self.spaces[0],
+                status=event_status
+            )
+            for name, offset, event_status in [('Confirmed', 0, 'confirmed'), ('Cancelled', 4, 'cancelled')]
+        ]
+
+    def at(self, hours):
+        return self.start + timedelta(hours=hours)
+
+    def test_batch_is_one_query_per_space(self):
+        ranges = [
+            ('existing', self.spaces[0].pk, self.at(1), self.at(2)),
+            ('cancelled slot', self.spaces[0].pk, self.at(4), self.at(5)),
+            ('late', self.spaces[1].pk, self.at(1), self.at(3)),
+            ('early', self.spaces[1].pk, self.at(0), self.at(2)),
+        ]
+        with self.assertNumQueries(2):
+            conflicts = event_conflicts.find_many(ranges)
+
+        self.assertEqual(set(conflicts), {'existing', 'late'})
+        self.assertEqual(conflicts['existing'].interval.event_name, 'Confirmed')
+        self.assertEqual(conflicts['late'].batch_key, 'early')
+
+    def test_batch_can_stand_in_for_stored_rows(self):
+        confirmed = self.events[0]
+        ranges = [(confirmed.pk, self.spaces[0].pk, confirmed.start_datetime, confirmed.end_datetime)]
+        self.assertEqual(event_conflicts.find_many(ranges, exclude=[confirmed.pk]), {})
+
+    def test_single_lookup_matches_every_call_site_rule(self):
+        # Index first, database only when asked to verify a "no"
+        self.assertEqual(event_conflicts.find(self.spaces[0].pk, self.at(1), self.at(3)).event_name, 'Confirmed')
+        self.assertIsNone(event_conflicts.find(self.spaces[0].pk, self.at(4), self.at(5), verify=True))
+        self.assertIsNone(event_conflicts.find(
+            self.spaces[0].pk, self.at(0), self.at(2), exclude=self.events[0].pk, verify=True
+        ))
+        with self.assertNumQueries(1):
+            self.assertIsNone(booking_conflicts.find(self.spaces[0].pk, self.at(0), self.at(2)))
+
+
+class ExplainHotQueriesTestCase(TestCase):
+    def test_hot_queries_use_indexes(self):
+        out = StringIO()
+        call_command('explain_hot_queries', spaces=5, users=3, events=200, stdout=out)
+
+        output = out.getvalue()
+        for name in ['booking conflict', 'upcoming list', 'my events', 'status sweep']:
+            self.assertIn(f'{name}: ok', output)
+        self.assertIn('Every hot query uses an index.', output)
+        self.assertFalse(Event.objects.exists())
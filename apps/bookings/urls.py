@@ -1,16 +1,28 @@
 from django.urls import path
 from .views import (
     BookEventView, 
+    BulkBookEventsView,
+    BookingTicketView,
+    HoldSlotView,
+    ReleaseHoldView,
     ListUpcomingEventsView, 
     ListMyEventsView, 
     ApproveEventView,
-    CheckEventStatusView
+    CheckEventStatusView,
+    my_events_calendar,
+    my_events_calendar_link
 )
 
 urlpatterns = [
     path('book/', BookEventView.as_view(), name='book-event'),
+    path('bulk/', BulkBookEventsView.as_view(), name='bulk-book-events'),
+    path('tickets/<uuid:ticket_id>/', BookingTicketView.as_view(), name='booking-ticket'),
+    path('hold/', HoldSlotView.as_view(), name='hold-slot'),
+    path('hold/<str:token>/', ReleaseHoldView.as_view(), name='release-hold'),
     path('upcoming/', ListUpcomingEventsView.as_view(), name='upcoming-events'),
     path('my-events/', ListMyEventsView.as_view(), name='my-events'),
+    path('my-events.ics', my_events_calendar, name='my-events-calendar'),
+    path('my-events/calendar-link/', my_events_calendar_link, name='my-events-calendar-link'),
     path('approve/<int:event_id>/', ApproveEventView.as_view(), name='approve-event'),
     path('check-status/', CheckEventStatusView.as_view(), name='check-event-status'),
 ]
\ No newline at end of file
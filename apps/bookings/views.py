@@ -4,20 +4,58 @@ from rest_framework.generics import CreateAPIView, ListAPIView
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from rest_framework.permissions import IsAuthenticated, IsAdminUser
+from rest_framework.permissions import AllowAny, IsAuthenticated, IsAdminUser
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 from django.db import transaction
-from django.core.mail import send_mail, EmailMultiAlternatives
-from django.template.loader import render_to_string
+from django.db.models import Count, Max
 from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.validators import URLValidator
+from django.urls import reverse
 from rest_framework import viewsets, permissions
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.settings import api_settings
+from rest_framework.decorators import api_view, authentication_classes, permission_classes, renderer_classes
 
-from .models import Event, Booking
-from .serializers import EventSerializer, EventListSerializer, BookingSerializer
-from .tasks import update_space_on_approval
+from .models import BookingTicket, Event, Booking
+from .serializers import (
+    BookingSerializer, BookingTicketSerializer, EventListSerializer, EventSerializer, HoldSerializer
+)
+from .tasks import enqueue_booking_ticket, update_space_on_approval
+from .conflicts import event_conflicts
+from .holds import HoldsBusy, find_hold_conflict, get_hold, hold_covers, place_hold, release_hold
+from .calendar import ICalendarRenderer, calendar_response, calendar_token, rotate_calendar_token, user_for_token
+from .services import book_event, book_events, book_series, complete_events, conflict_details, count_ended_events
+from .pagination import KeysetPagination
+from .webhooks import UnsafeCallback, resolve_callback
 from apps.spaces.models import Space
+from core.conditional import make_etag, not_modified, set_validators
+from core.parsers import CSVParser
+from core.serializers import ValuesPlan
+from core.streaming import stream_format, streaming_response
+
+def conflict_response(conflict):
+    """409 payload describing the event (or index interval) that blocks a booking"""
+    if conflict is None:
+        # The blocking event went away between the failed insert and the lookup
+        return Response({
+            'message': 'Space already booked for this time'
+        }, status=status.HTTP_409_CONFLICT)
+    return Response({
+        'message': 'Space already booked for this time',
+        'details': conflict_details(conflict)
+    }, status=status.HTTP_409_CONFLICT)
+
+def held_response(hold):
+    """409 payload for a range someone else is holding"""
+    return Response({
+        'message': 'Slot is being held by another user',
+        'details': {
+            'from': hold.start_datetime.strftime('%Y-%m-%d %H:%M'),
+            'to': hold.end_datetime.strftime('%Y-%m-%d %H:%M'),
+            'expires_at': hold.expires_at
+        }
+    }, status=status.HTTP_409_CONFLICT)
 
 class BookEventView(CreateAPIView):
     """
@@ -41,7 +79,10 @@ class BookEventView(CreateAPIView):
                 'organizer_email': openapi.Schema(type=openapi.TYPE_STRING, format='email', description='Email of the event organizer'),
                 'event_type': openapi.Schema(type=openapi.TYPE_STRING, enum=['meeting', 'conference', 'webinar', 'workshop'], description='Type of event being booked'),
                 'attendance': openapi.Schema(type=openapi.TYPE_INTEGER, description='Expected number of attendees (optional)', nullable=True),
-                'space': openapi.Schema(type=openapi.TYPE_INTEGER, description='ID of the space where the event will be held')
+                'space': openapi.Schema(type=openapi.TYPE_INTEGER, description='ID of the space where the event will be held'),
+                'callback_url': openapi.Schema(type=openapi.TYPE_STRING, format='uri', description='With ?async=true, URL that receives the ticket once processed (optional). It must resolve to a public address unless its host is in BOOKING_WEBHOOK_ALLOWED_HOSTS; redirects are not followed'),
+                'hold': openapi.Schema(type=openapi.TYPE_STRING, description='Token from /api/bookings/hold/ covering this slot (optional); consumed by the booking'),
+                'recurrence': openapi.Schema(type=openapi.TYPE_STRING, description='RRULE repeating the event, e.g. FREQ=WEEKLY;BYDAY=MO;COUNT=12 (optional). Occurrences are expanded up to RECURRENCE_HORIZON_DAYS ahead; clashing ones are skipped unless ?atomic=true')
             }
         ),
         responses={
@@ -49,6 +90,9 @@ class BookEventView(CreateAPIView):
                 description='Event booked successfully',
                 schema=EventSerializer
             ),
+            202: openapi.Response(
+                description='Queued with ?async=true - poll the returned ticket'
+            ),
             400: openapi.Response(
                 description='Bad request - validation errors'
             ),
@@ -64,125 +108,324 @@ class BookEventView(CreateAPIView):
         serializer = self.get_serializer(data=request.data)
         
         if serializer.is_valid():
-            with transaction.atomic():
-                space = serializer.validated_data['space']
-                start_time = serializer.validated_data['start_datetime']
-                end_time = serializer.validated_data['end_datetime']
-                
-                # Check if space is available
-                if space.status != 'free':
-                    return Response({
-                        'message': 'Space is not available for booking',
-                        'error': f'Space "{space.name}" is currently {space.status}'
-                    }, status=status.HTTP_409_CONFLICT)
-                
-                # Check for any conflicting bookings (both pending and confirmed events)
-                conflicting_events = Event.objects.filter(
-                    space=space,
-                    status__in=['pending', 'confirmed'],  # Check both pending and confirmed events
-                    start_datetime__lt=end_time,
-                    end_datetime__gt=start_time
-                )
-                
-                if conflicting_events.exists():
-                    # Get the conflicting event details
-                    conflict = conflicting_events.first()
+            space = serializer.validated_data['space']
+            start_time = serializer.validated_data['start_datetime']
+            end_time = serializer.validated_data['end_datetime']
+            
+            # Check if space is available
+            if space.status != 'free':
+                return Response({
+                    'message': 'Space is not available for booking',
+                    'error': f'Space "{space.name}" is currently {space.status}'
+                }, status=status.HTTP_409_CONFLICT)
+
+            if 'occurrences' in serializer.validated_data:
+                return self.create_series(request, serializer, space)
+
+            # Other users' holds are a cache read away, so contended slots
+            # are turned down before any database work
+            hold = None
+            hold_token = request.data.get('hold')
+            if hold_token:
+                hold = get_hold(hold_token)
+                if hold is not None and not hold_covers(hold, request.user.pk, space.id, start_time, end_time):
                     return Response({
-                        'message': 'Space already booked for this time',
-                        'details': {
-                            'booked_event': conflict.event_name,
-                            'from': conflict.start_datetime.strftime('%Y-%m-%d %H:%M'),
-                            'to': conflict.end_datetime.strftime('%Y-%m-%d %H:%M'),
-                            'status': conflict.status
-                        }
-                    }, status=status.HTTP_409_CONFLICT)
-                
-                # Create the event with pending status (requires admin approval)
-                event = serializer.save(
-                    user=request.user,
-                    status='pending'  # Always start as pending
-                )
-                
-                # Space remains 'free' until event is approved by admin
-                # (No space status change here)
-
-                # --- Email Notification Trigger ---
-                subject = f'Event Booking Submitted: {event.event_name}'
-                
-                # Plain text version (fallback)
-                message = (
-                    f'Your event "{event.event_name}" has been submitted and is pending approval.\n'
-                    f'Space: {space.name}\n'
-                    f'Start: {start_time}\n'
-                    f'End: {end_time}\n'
-                    f'Status: pending\n'
-                    f'You will be notified once an admin approves your event.\n'
-                )
-                
-                # User email
-                user_email = request.user.email
-                user_name = request.user.get_full_name() if hasattr(request.user, 'get_full_name') and callable(request.user.get_full_name) else request.user.username
-                
-                # Organizer email (assuming space.organizer.email exists)
-                organizer_email = getattr(space.organizer, 'email', None)
-                
-                # Admin email (from settings)
-                admin_email = getattr(settings, 'ADMIN_EMAIL', None)
-
-                recipient_list = [email for email in [user_email, organizer_email, admin_email] if email]
-                
-                # HTML version for the user
-                context = {
-                    'subject': subject,
-                    'user_name': user_name,
-                    'event_name': event.event_name,
-                    'space_name': space.name,
-                    'start_datetime': start_time,
-                    'end_datetime': end_time,
-                }
-                html_message = render_to_string('emails/booking_submitted.html', context)
-                
-                # Send to user with HTML
-                if user_email:
-                    email_message = EmailMultiAlternatives(
-                        subject=subject,
-                        body=message,
-                        from_email=settings.DEFAULT_FROM_EMAIL,
-                        to=[user_email]
-                    )
-                    email_message.attach_alternative(html_message, "text/html")
-                    email_message.send(fail_silently=True)
-                
-                # Send to others (organizer, admin) without HTML template
-                other_recipients = [email for email in [organizer_email, admin_email] if email]
-                if other_recipients:
-                    send_mail(
-                        subject,
-                        message,
-                        settings.DEFAULT_FROM_EMAIL,
-                        other_recipients,
-                        fail_silently=True
-                    )
-                # --- End Email Notification ---
+                        'message': 'Failed to book event',
+                        'errors': {'hold': ['Hold does not cover this booking']}
+                    }, status=status.HTTP_400_BAD_REQUEST)
+            held = find_hold_conflict(space.id, start_time, end_time, user_id=request.user.pk)
+            if held is not None:
+                return held_response(held)
+            
+            if request.query_params.get('async', '').lower() in ('1', 'true'):
+                return self.enqueue(request, space)
 
-                return Response({
-                    'message': 'Event booked successfully',
-                    'event_name': event.event_name,
-                    'space': space.name,
-                    'start_time': start_time.strftime('%Y-%m-%d %H:%M'),
-                    'status': event.status
-                }, status=status.HTTP_201_CREATED)
+            # Known conflicts are rejected from the in-process availability
+            # index; the no-overlap constraint catches the rest on insert
+            event, conflict = book_event(request.user, serializer.validated_data)
+            if event is None:
+                return conflict_response(conflict)
+
+            # Space remains 'free' until event is approved by admin
+            # (No space status change here)
+            if hold is not None:
+                release_hold(hold)
+
+            return Response({
+                'message': 'Event booked successfully',
+                'event_name': event.event_name,
+                'space': space.name,
+                'start_time': start_time.strftime('%Y-%m-%d %H:%M'),
+                'status': event.status
+            }, status=status.HTTP_201_CREATED)
         
         return Response({
             'message': 'Failed to book event',
             'errors': serializer.errors
         }, status=status.HTTP_400_BAD_REQUEST)
 
+    def enqueue(self, request, space):
+        """Hand the booking to its space's partition worker and return a ticket"""
+        callback_url = request.data.get('callback_url', '')
+        if callback_url:
+            try:
+                URLValidator(schemes=['http', 'https'])(callback_url)
+                # Checked again on delivery, as DNS can change in between
+                resolve_callback(callback_url)
+            except DjangoValidationError:
+                return Response({
+                    'message': 'Failed to book event',
+                    'errors': {'callback_url': ['Enter a valid http(s) URL']}
+                }, status=status.HTTP_400_BAD_REQUEST)
+            except UnsafeCallback as exc:
+                return Response({
+                    'message': 'Failed to book event',
+                    'errors': {'callback_url': [str(exc)]}
+                }, status=status.HTTP_400_BAD_REQUEST)
+
+        payload = {key: request.data[key] for key in request.data if key not in ('callback_url', 'recurrence')}
+        with transaction.atomic():
+            ticket = BookingTicket.objects.create(
+                user=request.user,
+                space=space,
+                payload=payload,
+                callback_url=callback_url
+            )
+            transaction.on_commit(lambda: enqueue_booking_ticket(ticket))
+
+        return Response({
+            'message': 'Booking queued',
+            'ticket': str(ticket.pk),
+            'status': ticket.status,
+            'status_url': request.build_absolute_uri(reverse('booking-ticket', args=[ticket.pk]))
+        }, status=status.HTTP_202_ACCEPTED)
+
+    def create_series(self, request, serializer, space):
+        """Book every free occurrence of a recurring event in one batch"""
+        if serializer.validated_data['start_datetime'] < timezone.now():
+            return Response({
+                'message': 'Failed to book event',
+                'errors': {'start_datetime': ['Start datetime cannot be in the past']}
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        atomic = request.query_params.get('atomic', '').lower() in ('1', 'true')
+        created, results = book_series(request.user, serializer.validated_data, atomic=atomic)
+        skipped = [
+            {
+                'start_time': result['start_datetime'].strftime('%Y-%m-%d %H:%M'),
+                'error': result['error'],
+                **({'details': result['details']} if 'details' in result else {})
+            }
+            for result in results if result['status'] != 'created'
+        ]
+        if not created:
+            return Response({
+                'message': 'No occurrence could be booked',
+                'skipped': skipped
+            }, status=status.HTTP_409_CONFLICT)
+
+        return Response({
+            'message': f'Booked {len(created)} of {len(results)} occurrences',
+            'event_name': created[0].event_name,
+            'space': space.name,
+            'series': str(created[0].series),
+            'start_time': created[0].start_datetime.strftime('%Y-%m-%d %H:%M'),
+            'status': 'pending',
+            'booked': len(created),
+            'skipped': skipped
+        }, status=status.HTTP_201_CREATED)
+
+class BookingTicketView(APIView):
+    """
+    Poll an async booking
+    """
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_summary='Get booking ticket',
+        operation_description='Status of a booking made with ?async=true: queued, booked or rejected, with the '
+                              'same result payload the synchronous endpoint would have returned',
+        responses={
+            200: openapi.Response(description='Ticket details', schema=BookingTicketSerializer),
+            404: openapi.Response(description='Ticket not found')
+        }
+    )
+    def get(self, request, ticket_id):
+        ticket = get_object_or_404(BookingTicket, pk=ticket_id, user=request.user)
+        return Response(BookingTicketSerializer(ticket).data, status=status.HTTP_200_OK)
+
+class HoldSlotView(APIView):
+    """
+    Hold a slot for a few minutes while the booking form is filled in
+    """
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_summary='Hold a slot',
+        operation_description='Reserve a space for a time range for a few minutes (BOOKING_HOLD_MINUTES, at most '
+                              'BOOKING_HOLD_MAX_MINUTES). Other users cannot book or hold an overlapping range until '
+                              'the hold expires or is consumed by booking with its token.',
+        request_body=HoldSerializer,
+        responses={
+            201: openapi.Response(description='Slot held'),
+            400: openapi.Response(description='Bad request - validation errors'),
+            409: openapi.Response(description='Conflict - slot booked or held by another user')
+        }
+    )
+    def post(self, request):
+        serializer = HoldSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response({
+                'message': 'Failed to hold slot',
+                'errors': serializer.errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        space = serializer.validated_data['space']
+        start_time = serializer.validated_data['start_datetime']
+        end_time = serializer.validated_data['end_datetime']
+        if space.status != 'free':
+            return Response({
+                'message': 'Space is not available for booking',
+                'error': f'Space "{space.name}" is currently {space.status}'
+            }, status=status.HTTP_409_CONFLICT)
+
+        conflict = event_conflicts.find(space.id, start_time, end_time)
+        if conflict is not None:
+            return conflict_response(conflict)
+
+        try:
+            hold, held = place_hold(
+                request.user, space.id, start_time, end_time,
+                minutes=serializer.validated_data.get('minutes')
+            )
+        except HoldsBusy:
+            return Response({
+                'message': 'Space is busy, please try again'
+            }, status=status.HTTP_409_CONFLICT)
+        if held is not None:
+            return held_response(held)
+
+        return Response({
+            'message': 'Slot held successfully',
+            'hold': hold.token,
+            'space': space.name,
+            'start_time': start_time.strftime('%Y-%m-%d %H:%M'),
+            'end_time': end_time.strftime('%Y-%m-%d %H:%M'),
+            'expires_at': hold.expires_at
+        }, status=status.HTTP_201_CREATED)
+
+class ReleaseHoldView(APIView):
+    """
+    Give a held slot back before it expires
+    """
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_summary='Release a hold',
+        operation_description='Give up a slot held with POST /api/bookings/hold/',
+        responses={
+            200: openapi.Response(description='Hold released'),
+            404: openapi.Response(description='Hold not found or expired')
+        }
+    )
+    def delete(self, request, token):
+        hold = get_hold(token)
+        if hold is None or hold.user_id != request.user.pk:
+            return Response({'error': 'Hold not found'}, status=status.HTTP_404_NOT_FOUND)
+        release_hold(hold)
+        return Response({'message': 'Hold released'}, status=status.HTTP_200_OK)
+
+class BulkBookEventsView(APIView):
+    """
+    Book many events in one request
+    """
+    permission_classes = [IsAuthenticated]
+    parser_classes = api_settings.DEFAULT_PARSER_CLASSES + [CSVParser]
+
+    @swagger_auto_schema(
+        operation_summary='Bulk book events',
+        operation_description='Book up to BULK_BOOKING_MAX_ROWS events at once from a JSON list (or {"events": [...]}) '
+                              'or a text/csv body with a header row. Every row is validated like a single booking '
+                              'and checked for conflicts with existing events and with the rest of the batch. '
+                              'Rows that pass are created as pending; the report has one result per row.',
+        manual_parameters=[
+            openapi.Parameter(
+                'atomic',
+                openapi.IN_QUERY,
+                description='Book nothing unless every row can be booked',
+                type=openapi.TYPE_BOOLEAN,
+                required=False
+            )
+        ],
+        request_body=openapi.Schema(
+            type=openapi.TYPE_ARRAY,
+            items=openapi.Schema(type=openapi.TYPE_OBJECT, description='Same fields as a single booking')
+        ),
+        responses={
+            201: openapi.Response(description='At least one event booked, with a per-row report'),
+            400: openapi.Response(description='Bad request - nothing could be booked'),
+            409: openapi.Response(description='Atomic batch with conflicts - nothing booked')
+        }
+    )
+    def post(self, request):
+        rows = request.data
+        if isinstance(rows, dict) and 'events' in rows:
+            rows = rows['events']
+        if not isinstance(rows, list) or not rows:
+            return Response({
+                'message': 'Failed to book events',
+                'error': 'Expected a non-empty list of events'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        max_rows = getattr(settings, 'BULK_BOOKING_MAX_ROWS', 500)
+        if len(rows) > max_rows:
+            return Response({
+                'message': 'Failed to book events',
+                'error': f'At most {max_rows} events can be booked at once'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        atomic = request.query_params.get('atomic', '').lower() in ('1', 'true')
+        created, results = book_events(request.user, rows, atomic=atomic)
+
+        if created:
+            response_status = status.HTTP_201_CREATED
+        elif atomic and any(result['status'] == 'conflict' for result in results):
+            response_status = status.HTTP_409_CONFLICT
+        else:
+            response_status = status.HTTP_400_BAD_REQUEST
+        return Response({
+            'message': f'Booked {len(created)} of {len(rows)} events',
+            'created': len(created),
+            'failed': len(rows) - len(created),
+            'results': results
+        }, status=response_status)
+
+def listing_validators(request, queryset, *parts):
+    """
+    ETag and total count of an event listing from one MAX(updated_at)/COUNT
+    probe. The count catches deletions and events leaving the filter, the
+    spaces' MAX(updated_at) catches renamed spaces (the listing shows
+    space_name), and the query string tells pages, limits and field
+    selections apart.
+    There is deliberately no Last-Modified: MAX(updated_at) does not move
+    when a row is deleted or drops out of the filter, so If-Modified-Since
+    alone would answer 304 for a listing that changed.
+    """
+    probe = queryset.order_by().aggregate(
+        last_modified=Max('updated_at'), space_modified=Max('space__updated_at'), total=Count('id')
+    )
+    etag = make_etag(
+        probe['last_modified'], probe['space_modified'], probe['total'],
+        request.get_full_path(), request.META.get('HTTP_ACCEPT'), *parts
+    )
+    return etag, probe['total']
+
 class ListUpcomingEventsView(ListAPIView):
     """
     List all upcoming events
     """
     serializer_class = EventListSerializer
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
         """Get all upcoming events (confirmed and in the future)"""
@@ -203,6 +446,43 @@ class ListUpcomingEventsView(ListAPIView):
                 type=openapi.TYPE_STRING,
                 enum=['meeting', 'conference', 'webinar', 'workshop']
             ),
+            openapi.Parameter(
+                'cursor',
+                openapi.IN_QUERY,
+                description='Opaque cursor from the previous page\'s "next" link',
+                type=openapi.TYPE_STRING
+            ),
+            openapi.Parameter(
+                'limit',
+                openapi.IN_QUERY,
+                description=f'Events per page (default {KeysetPagination.page_size}, max {KeysetPagination.max_limit})',
+                type=openapi.TYPE_INTEGER
+            ),
+            openapi.Parameter(
+                'count',
+                openapi.IN_QUERY,
+                description='Also count all matching events on pages after the first',
+                type=openapi.TYPE_BOOLEAN
+            ),
+            openapi.Parameter(
+                'stream',
+                openapi.IN_QUERY,
+                description='Stream every matching event unpaginated, as a JSON array (1) or NDJSON (ndjson)',
+                type=openapi.TYPE_STRING,
+                enum=['1', 'ndjson']
+            ),
+            openapi.Parameter(
+                'fields',
+                openapi.IN_QUERY,
+                description='Comma-separated fields to include, e.g. id,event_name,start_datetime',
+                type=openapi.TYPE_STRING
+            ),
+            openapi.Parameter(
+                'omit',
+                openapi.IN_QUERY,
+                description='Comma-separated fields to leave out',
+                type=openapi.TYPE_STRING
+            ),
         ],
         responses={
             200: openapi.Response(
@@ -219,13 +499,31 @@ class ListUpcomingEventsView(ListAPIView):
         if event_type_filter:
             queryset = queryset.filter(event_type=event_type_filter)
         
-        serializer = self.get_serializer(queryset, many=True)
+        etag, total = listing_validators(request, queryset)
+        unchanged = not_modified(request, etag)
+        if unchanged is not None:
+            return unchanged
         
-        return Response({
-            'message': f'Found {queryset.count()} upcoming events',
-            'count': queryset.count(),
-            'data': serializer.data
-        })
+        fmt = stream_format(request)
+        if fmt:
+            response = streaming_response(
+                queryset.order_by('start_datetime', 'id'), self.get_serializer_class(),
+                fmt=fmt, context=self.get_serializer_context()
+            )
+            return set_validators(response, etag)
+        
+        # Read-only listing, so rows skip model instances (see ValuesPlan)
+        plan = ValuesPlan(self.get_serializer_class(), context=self.get_serializer_context())
+        self.paginator.count_hint = total
+        page = self.paginate_queryset(plan.values(queryset, 'start_datetime', 'id'))
+        count = self.paginator.count
+        
+        return set_validators(Response({
+            'message': f'Found {count} upcoming events' if count is not None else f'Showing {len(page)} more upcoming events',
+            'count': count,
+            'next': self.paginator.get_next_link(),
+            'data': [plan.to_representation(row) for row in page]
+        }), etag)
 
 class ListMyEventsView(ListAPIView):
     """
@@ -233,6 +531,7 @@ class ListMyEventsView(ListAPIView):
     """
     serializer_class = EventListSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
         """
@@ -245,6 +544,45 @@ class ListMyEventsView(ListAPIView):
     @swagger_auto_schema(
         operation_summary='List all my events',
         operation_description='Get a list of all events created by the current user regardless of status',
+        manual_parameters=[
+            openapi.Parameter(
+                'cursor',
+                openapi.IN_QUERY,
+                description='Opaque cursor from the previous page\'s "next" link',
+                type=openapi.TYPE_STRING
+            ),
+            openapi.Parameter(
+                'limit',
+                openapi.IN_QUERY,
+                description=f'Events per page (default {KeysetPagination.page_size}, max {KeysetPagination.max_limit})',
+                type=openapi.TYPE_INTEGER
+            ),
+            openapi.Parameter(
+                'count',
+                openapi.IN_QUERY,
+                description='Also count all matching events on pages after the first',
+                type=openapi.TYPE_BOOLEAN
+            ),
+            openapi.Parameter(
+                'stream',
+                openapi.IN_QUERY,
+                description='Stream every matching event unpaginated, as a JSON array (1) or NDJSON (ndjson)',
+                type=openapi.TYPE_STRING,
+                enum=['1', 'ndjson']
+            ),
+            openapi.Parameter(
+                'fields',
+                openapi.IN_QUERY,
+                description='Comma-separated fields to include, e.g. id,event_name,start_datetime',
+                type=openapi.TYPE_STRING
+            ),
+            openapi.Parameter(
+                'omit',
+                openapi.IN_QUERY,
+                description='Comma-separated fields to leave out',
+                type=openapi.TYPE_STRING
+            ),
+        ],
         responses={
             200: openapi.Response(
                 description='User events retrieved successfully',
@@ -254,22 +592,37 @@ class ListMyEventsView(ListAPIView):
     )
     def get(self, request, *args, **kwargs):
         queryset = self.get_queryset()
-        serializer = self.get_serializer(queryset, many=True)
         
-        # Group events by status
-        events_by_status = {}
-        for event in queryset:
-            status_key = event.status
-            if status_key not in events_by_status:
-                events_by_status[status_key] = 0
-            events_by_status[status_key] += 1
+        etag, total = listing_validators(request, queryset, request.user.pk)
+        unchanged = not_modified(request, etag)
+        if unchanged is not None:
+            return unchanged
         
-        return Response({
-            'message': f'Found {queryset.count()} events for user {request.user.email}',
-            'count': queryset.count(),
+        fmt = stream_format(request)
+        if fmt:
+            response = streaming_response(
+                queryset.order_by('start_datetime', 'id'), self.get_serializer_class(),
+                fmt=fmt, context=self.get_serializer_context()
+            )
+            return set_validators(response, etag)
+        
+        plan = ValuesPlan(self.get_serializer_class(), context=self.get_serializer_context())
+        self.paginator.count_hint = total
+        page = self.paginate_queryset(plan.values(queryset, 'start_datetime', 'id'))
+        count = self.paginator.count
+        
+        # Group events by status in the database rather than walking every row
+        events_by_status = dict(
+            queryset.order_by().values('status').annotate(total=Count('id')).values_list('status', 'total')
+        )
+        
+        return set_validators(Response({
+            'message': f'Found {count} events for user {request.user.email}' if count is not None else f'Showing {len(page)} more events for user {request.user.email}',
+            'count': count,
             'events_by_status': events_by_status,
-            'data': serializer.data
-        }, status=status.HTTP_200_OK)
+            'next': self.paginator.get_next_link(),
+            'data': [plan.to_representation(row) for row in page]
+        }, status=status.HTTP_200_OK), etag)
         
 class ApproveEventView(APIView):
     """
@@ -338,7 +691,17 @@ class CheckEventStatusView(APIView):
     
     @swagger_auto_schema(
         operation_summary='Check event status',
-        operation_description='Mark completed events and update space status',
+        operation_description='Mark ended confirmed events as completed and free the spaces they leave idle, '
+                              'in one pass. With dry_run only the counts are reported.',
+        manual_parameters=[
+            openapi.Parameter(
+                'dry_run',
+                openapi.IN_QUERY,
+                description='Only report how many events and spaces would be updated',
+                type=openapi.TYPE_BOOLEAN,
+                required=False
+            )
+        ],
         responses={
             200: openapi.Response(
                 description='Events checked and updated'
@@ -346,22 +709,90 @@ class CheckEventStatusView(APIView):
         }
     )
     def post(self, request):
-        # Find all confirmed events that have ended
-        ended_events = Event.objects.filter(
-            status='confirmed',
-            end_datetime__lt=timezone.now()
-        )
-        
-        count = 0
-        for event in ended_events:
-            event.status = 'completed'
-            event.save()  # This will trigger the signal to update space status
-            count += 1
-        
+        now = timezone.now()
+
+        if request.query_params.get('dry_run', '').lower() in ('1', 'true', 'yes'):
+            event_count, space_count = count_ended_events(now)
+            return Response({
+                'message': f'Dry run. {event_count} events would be marked as completed.',
+                'events_completed': event_count,
+                'spaces_freed': space_count,
+            }, status=status.HTTP_200_OK)
+
+        completed, freed = complete_events(now)
+
         return Response({
-            'message': f'Checked event status. Marked {count} events as completed.',
+            'message': f'Checked event status. Marked {len(completed)} events as completed.',
+            'events_completed': len(completed),
+            'spaces_freed': len(freed),
+            'completed_event_ids': sorted(event_id for event_id, _ in completed),
+            'freed_space_ids': sorted(freed),
         }, status=status.HTTP_200_OK)
 
+@swagger_auto_schema(
+    method='get',
+    operation_summary='My events calendar link',
+    operation_description='Get the private .ics subscription URL for the current user\'s pending and confirmed events',
+    responses={200: openapi.Response(description='Subscription URL')}
+)
+@swagger_auto_schema(
+    method='post',
+    operation_summary='Rotate my events calendar link',
+    operation_description='Revoke every calendar link issued so far and return a new one',
+    responses={200: openapi.Response(description='Subscription URL')}
+)
+@api_view(['GET', 'POST'])
+@permission_classes([IsAuthenticated])
+def my_events_calendar_link(request):
+    """
+    Return the signed my-events.ics URL to paste into a calendar app.
+    POST revokes the links handed out before and returns a new one.
+    """
+    if request.method == 'POST':
+        token = rotate_calendar_token(request.user)
+    else:
+        token = calendar_token(request.user)
+    url = reverse('my-events-calendar')
+    return Response({
+        'message': 'Subscribe to this URL in your calendar app',
+        'url': request.build_absolute_uri(f'{url}?token={token}'),
+    }, status=status.HTTP_200_OK)
+
+@swagger_auto_schema(
+    method='get',
+    operation_summary='My events calendar feed',
+    operation_description='iCalendar feed of a user\'s pending and confirmed events, authenticated by the '
+                          'token from the calendar link endpoint',
+    manual_parameters=[
+        openapi.Parameter(
+            'token',
+            openapi.IN_QUERY,
+            description='Signed calendar token',
+            type=openapi.TYPE_STRING,
+            required=True
+        )
+    ],
+    responses={200: 'text/calendar feed', 403: 'Invalid token'}
+)
+@api_view(['GET'])
+@authentication_classes([])
+@permission_classes([AllowAny])
+@renderer_classes([ICalendarRenderer])
+def my_events_calendar(request):
+    """
+    Subscribable .ics feed of one user's bookings, cached until one of them changes.
+    Calendar apps cannot send a JWT, so the user comes from a signed token,
+    which is checked against the user on every poll.
+    """
+    user = user_for_token(request.query_params.get('token', ''))
+    if user is None:
+        return Response({'error': 'Invalid calendar token'}, status=status.HTTP_403_FORBIDDEN)
+
+    def load():
+        return f'{user.email} bookings', Event.objects.filter(user_id=user.pk)
+
+    return calendar_response(request, 'user', user.pk, load)
+
 class BookingViewSet(viewsets.ModelViewSet):
     queryset = Booking.objects.all()
     serializer_class = BookingSerializer
@@ -0,0 +1,82 @@
+import http.client
+import ipaddress
+import socket
+import ssl
+from urllib.parse import urlsplit
+
+from django.conf import settings
+
+
+class UnsafeCallback(ValueError):
+    """A callback URL the workers must not call"""
+
+
+def resolve_callback(url):
+    """
+    Check a callback URL and resolve its host. Returns (split url, address).
+
+    Unless the host is listed in BOOKING_WEBHOOK_ALLOWED_HOSTS, every address
+    it resolves to must be public, so a booking cannot make a worker call
+    loopback, private or link-local hosts such as 169.254.169.254.
+    Raises UnsafeCallback.
+    """
+    parts = urlsplit(url)
+    try:
+        port = parts.port
+    except ValueError:
+        raise UnsafeCallback('Enter a valid http(s) URL')
+    if parts.scheme not in ('http', 'https') or not parts.hostname:
+        raise UnsafeCallback('Enter a valid http(s) URL')
+    port = port or (443 if parts.scheme == 'https' else 80)
+
+    try:
+        addresses = [info[4][0] for info in socket.getaddrinfo(parts.hostname, port, type=socket.SOCK_STREAM)]
+    except (socket.gaierror, UnicodeError):
+        raise UnsafeCallback(f'Cannot resolve {parts.hostname}')
+
+    if parts.hostname not in getattr(settings, 'BOOKING_WEBHOOK_ALLOWED_HOSTS', []):
+        for address in addresses:
+            ip = ipaddress.ip_address(address.split('%')[0])
+            if not ip.is_global or ip.is_multicast:
+                raise UnsafeCallback(f'{parts.hostname} resolves to a non-public address')
+    return parts, addresses[0]
+
+
+class _PinnedHTTPConnection(http.client.HTTPConnection):
+    """Connects to an address vetted by resolve_callback rather than resolving the host again"""
+
+    def __init__(self, host, port, address, timeout):
+        super().__init__(host, port, timeout=timeout)
+        self.address = address
+
+    def connect(self):
+        self.sock = socket.create_connection((self.address, self.port), self.timeout)
+
+
+class _PinnedHTTPSConnection(http.client.HTTPSConnection):
+    def __init__(self, host, port, address, timeout):
+        self.ssl_context = ssl.create_default_context()
+        super().__init__(host, port, timeout=timeout, context=self.ssl_context)
+        self.address = address
+
+    def connect(self):
+        sock = socket.create_connection((self.address, self.port), self.timeout)
+        # The certificate is still checked against the host name
+        self.sock = self.ssl_context.wrap_socket(sock, server_hostname=self.host)
+
+
+def post_callback(url, body, headers, timeout=10):
+    """
+    POST body to a callback URL that passes resolve_callback, connecting to
+    the address that was checked. Redirects are not followed.
+    Returns the response status.
+    """
+    parts, address = resolve_callback(url)
+    connection_class = _PinnedHTTPSConnection if parts.scheme == 'https' else _PinnedHTTPConnection
+    connection = connection_class(parts.hostname, parts.port, address, timeout)
+    path = (parts.path or '/') + (f'?{parts.query}' if parts.query else '')
+    try:
+        connection.request('POST', path, body=body, headers=headers)
+        return connection.getresponse().status
+    finally:
+        connection.close()
@@ -0,0 +1,45 @@
+import time
+
+from django.core.mail import EmailMessage
+from django.core.mail.backends.smtp import EmailBackend as StockSMTPBackend
+from django.core.management.base import BaseCommand
+
+from apps.notifications.testing import LocalSMTPServer
+from core.backends.email_backend import EmailBackend as PooledEmailBackend, clear_pools
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare messages per second of Django\'s SMTP backend and the pooled '
+        'backend against a local SMTP stand-in, one send() per message as the '
+        'views do.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--messages', type=int, default=200)
+        parser.add_argument(
+            '--handshake-delay-ms', type=float, default=30.0,
+            help='Simulated connect + STARTTLS + AUTH latency per new session'
+        )
+
+    def handle(self, *args, **options):
+        count = options['messages']
+        delay = options['handshake_delay_ms'] / 1000
+        for label, backend_class in [('django smtp', StockSMTPBackend), ('pooled', PooledEmailBackend)]:
+            clear_pools()
+            with LocalSMTPServer(handshake_delay=delay) as server:
+                started = time.perf_counter()
+                for index in range(count):
+                    backend = backend_class(
+                        host='127.0.0.1', port=server.port, username='', password='',
+                        use_tls=False, use_ssl=False, fail_silently=False
+                    )
+                    backend.send_messages([
+                        EmailMessage(f'Benchmark {index}', 'Body', 'noreply@example.com', ['user@example.com'])
+                    ])
+                elapsed = time.perf_counter() - started
+            clear_pools()
+            self.stdout.write(
+                f'{label}: {count} messages in {elapsed:.2f}s = {count / elapsed:.1f} msg/s '
+                f'over {server.connections} connections'
+            )
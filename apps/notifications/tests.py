@@ -1,3 +1,73 @@
-from django.test import TestCase
+import smtplib
 
-# Create your tests here.
+from django.core.mail import EmailMessage
+from django.test import SimpleTestCase, override_settings
+
+from core.backends.email_backend import EmailBackend, clear_pools
+from .testing import LocalSMTPServer
+
+
+class PooledEmailBackendTestCase(SimpleTestCase):
+
+    def setUp(self):
+        clear_pools()
+        self.server = LocalSMTPServer()
+        self.server.__enter__()
+
+    def tearDown(self):
+        clear_pools()
+        self.server.__exit__(None, None, None)
+
+    def backend(self):
+        return EmailBackend(
+            host='127.0.0.1',
+            port=self.server.port,
+            username='',
+            password='',
+            use_tls=False,
+            use_ssl=False,
+            fail_silently=False
+        )
+
+    def send(self, count):
+        for index in range(count):
+            message = EmailMessage(f'Message {index}', 'Body', 'noreply@example.com', ['user@example.com'])
+            self.assertEqual(self.backend().send_messages([message]), 1)
+
+    def test_sends_reuse_one_session(self):
+        """Separate send() calls share a pooled SMTP session"""
+        self.send(10)
+
+        self.assertEqual(self.server.messages, 10)
+        self.assertEqual(self.server.connections, 1)
+
+    def test_reconnects_when_session_dropped(self):
+        """A pooled session closed by the server is replaced transparently"""
+        self.server.drop_after = 2
+        self.send(4)
+
+        self.assertEqual(self.server.messages, 4)
+        self.assertEqual(self.server.connections, 2)
+
+    def test_does_not_resend_after_data(self):
+        """A session lost after DATA may have delivered the message, so it is not retried"""
+        self.send(1)
+        self.server.hang_up_on_data = True
+        message = EmailMessage('Once', 'Body', 'noreply@example.com', ['user@example.com'])
+
+        with self.assertRaises(smtplib.SMTPServerDisconnected):
+            self.backend().send_messages([message])
+        self.assertEqual(self.server.messages, 2)
+
+        # The unusable session was discarded rather than pooled
+        self.send(1)
+        self.assertEqual(self.server.messages, 3)
+        self.assertEqual(self.server.connections, 2)
+
+    @override_settings(EMAIL_POOL_IDLE_TIMEOUT=0)
+    def test_idle_sessions_expire(self):
+        """Sessions idle for longer than the timeout are closed, not reused"""
+        self.send(3)
+
+        self.assertEqual(self.server.messages, 3)
+        self.assertEqual(self.server.connections, 3)
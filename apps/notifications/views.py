@@ -120,7 +120,8 @@ def notify_booking_created(request):
 
     return JsonResponse({'success': True, 'message': message})
 
-def send_booking_approved_notification(event, spaces, user):
+def booking_approved_message(event, spaces, user):
+    """Build the approval email without sending it (used by the booking outbox)"""
     user_email = user.email
     user_name = user.get_full_name() if callable(getattr(user, 'get_full_name', None)) else getattr(user, 'username', user.email)
     first_name = user.first_name if hasattr(user, 'first_name') else user_name
@@ -155,7 +156,6 @@ def send_booking_approved_notification(event, spaces, user):
     }
     html_message = render_to_string('emails/booking_approved.html', context)
     
-    # Send email
     email = EmailMultiAlternatives(
         subject,
         message_plain,
@@ -163,7 +163,10 @@ def send_booking_approved_notification(event, spaces, user):
         [user_email]
     )
     email.attach_alternative(html_message, "text/html")
-    email.send()
+    return email
+
+def send_booking_approved_notification(event, spaces, user):
+    booking_approved_message(event, spaces, user).send()
 
 def send_booking_rejected_notification(event, spaces, user):
     user_email = user.email 
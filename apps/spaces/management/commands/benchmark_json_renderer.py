@@ -0,0 +1,74 @@
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from apps.bookings.models import Event
+from apps.bookings.serializers import EventListSerializer
+from apps.spaces.models import Space
+from apps.spaces.serializers import SpaceSerializer
+from core.renderers import ORJSONRenderer
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare DRF\'s JSONRenderer with the orjson renderer on list_spaces and '
+        'upcoming-events sized payloads. Rows are built in memory, nothing is '
+        'written to the database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=2000)
+        parser.add_argument('--runs', type=int, default=20)
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        now = timezone.now()
+        spaces = [
+            Space(
+                id=index,
+                name=f'Space {index}',
+                location=f'Building {index % 7}',
+                capacity=10 + index % 200,
+                price_per_hour=Decimal('150.00') + index,
+                description='Bright room with natural light and a view over the gardens. ' * 4,
+                equipment='Projector, Whiteboard, Video conferencing',
+                features='Wheelchair access, Air conditioning',
+                created_at=now,
+                updated_at=now,
+            )
+            for index in range(rows)
+        ]
+        events = [
+            Event(
+                id=index,
+                event_name=f'Event {index}',
+                start_datetime=now + timedelta(hours=index),
+                end_datetime=now + timedelta(hours=index, minutes=90),
+                status='confirmed',
+                space=spaces[index % len(spaces)],
+            )
+            for index in range(rows)
+        ]
+        payloads = [
+            ('list_spaces', SpaceSerializer(spaces, many=True).data),
+            ('upcoming events', {
+                'message': f'Found {rows} upcoming events',
+                'count': rows,
+                'data': EventListSerializer(events, many=True).data,
+            }),
+        ]
+
+        for label, data in payloads:
+            for name, renderer in [('json', JSONRenderer()), ('orjson', ORJSONRenderer())]:
+                body = renderer.render(data)
+                started = time.perf_counter()
+                for _ in range(options['runs']):
+                    renderer.render(data)
+                elapsed = (time.perf_counter() - started) / options['runs']
+                self.stdout.write(
+                    f'{label} ({rows} rows, {len(body) / 1024:.0f} KiB) {name}: {elapsed * 1000:.2f} ms per render'
+                )
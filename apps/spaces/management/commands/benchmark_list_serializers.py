@@ -0,0 +1,97 @@
+import statistics
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from apps.authentication.models import User
+from apps.bookings.models import Event
+from apps.bookings.serializers import EventListSerializer
+from apps.spaces.models import Space
+from apps.spaces.serializers import SpaceSerializer
+from core.serializers import ValuesPlan
+
+
+class Rollback(Exception):
+    """Raised to throw away the seeded benchmark data"""
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed spaces and events inside a transaction, compare the ModelSerializer '
+        'and ValuesPlan read paths of list_spaces and the upcoming-events list, '
+        'and roll everything back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=5000)
+        parser.add_argument('--runs', type=int, default=10)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.seed(options['rows'])
+                self.run(options['rows'], options['runs'])
+                raise Rollback
+        except Rollback:
+            self.stdout.write('Seed data rolled back.')
+
+    def seed(self, rows):
+        user = User.objects.create_user(
+            email='benchmark@example.com',
+            first_name='Benchmark',
+            last_name='User',
+            password=None
+        )
+        spaces = Space.objects.bulk_create([
+            Space(
+                name=f'Benchmark space {index}',
+                location='Benchmark',
+                capacity=10 + index % 500,
+                price_per_hour=Decimal(500 + index % 5000),
+                image1='spaces/images/benchmark.jpg',
+                description='Bright room with natural light and a view over the gardens. ' * 4,
+                organizer=user,
+            )
+            for index in range(rows)
+        ])
+        start = timezone.now().replace(minute=0, second=0, microsecond=0) + timedelta(days=1)
+        Event.objects.bulk_create([
+            Event(
+                event_name=f'Benchmark event {index}',
+                start_datetime=start + timedelta(hours=index),
+                end_datetime=start + timedelta(hours=index, minutes=90),
+                organizer_name='Benchmark',
+                organizer_email='benchmark@example.com',
+                status='confirmed',
+                user=user,
+                space=spaces[index % len(spaces)],
+            )
+            for index in range(rows)
+        ])
+
+    def run(self, rows, runs):
+        spaces = Space.objects.filter(location='Benchmark')
+        events = Event.objects.filter(organizer_name='Benchmark').select_related('space')
+        cases = [
+            ('list_spaces', spaces, SpaceSerializer),
+            ('upcoming events', events, EventListSerializer),
+        ]
+        for label, queryset, serializer_class in cases:
+            for name, serialize in [
+                ('serializer', lambda: serializer_class(queryset.all(), many=True).data),
+                ('values plan', lambda: ValuesPlan(serializer_class).serialize(queryset.all())),
+            ]:
+                timings = []
+                for _ in range(runs):
+                    started = time.perf_counter()
+                    serialize()
+                    timings.append((time.perf_counter() - started) * 1000)
+                median = statistics.median(timings)
+                self.stdout.write(
+                    f'{label} {name}: {median:.1f}ms median for {rows} rows '
+                    f'({median * 1000 / rows:.1f}us per row)'
+                )
@@ -0,0 +1,114 @@
+import statistics
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from apps.authentication.models import User
+from apps.bookings.models import Event
+from apps.spaces.models import Space
+
+
+class Rollback(Exception):
+    """Raised to throw away the seeded benchmark data"""
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed spaces and events inside a transaction, time the "find me a room" '
+        'search query and roll everything back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--spaces', type=int, default=5000)
+        parser.add_argument('--events', type=int, default=1000000)
+        parser.add_argument('--runs', type=int, default=20)
+        parser.add_argument('--batch-size', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.seed(options['spaces'], options['events'], options['batch_size'])
+                self.run(options['runs'])
+                raise Rollback
+        except Rollback:
+            self.stdout.write('Seed data rolled back.')
+
+    def seed(self, space_count, event_count, batch_size):
+        started = time.perf_counter()
+        user = User.objects.create_user(
+            email='benchmark@example.com',
+            first_name='Benchmark',
+            last_name='User',
+            password=None
+        )
+        Space.objects.bulk_create(
+            [
+                Space(
+                    name=f'Benchmark space {index}',
+                    location='Benchmark',
+                    capacity=10 + index % 500,
+                    price_per_hour=Decimal(500 + index % 5000)
+                )
+                for index in range(space_count)
+            ],
+            batch_size=batch_size
+        )
+        space_ids = list(Space.objects.filter(location='Benchmark').values_list('id', flat=True))
+
+        # Back-to-back two hour slots per space, spread across past and future,
+        # so that every space has history but none has overlapping active events
+        self.origin = timezone.now().replace(minute=0, second=0, microsecond=0) - timedelta(days=30)
+        statuses = ['confirmed', 'pending', 'completed', 'cancelled']
+        per_space = max(1, event_count // max(1, len(space_ids)))
+        batch = []
+        for space_id in space_ids:
+            for slot in range(per_space):
+                start = self.origin + timedelta(hours=2 * slot + space_id % 7)
+                batch.append(Event(
+                    event_name='Benchmark event',
+                    start_datetime=start,
+                    end_datetime=start + timedelta(hours=2),
+                    organizer_name='Benchmark',
+                    organizer_email='benchmark@example.com',
+                    status=statuses[slot % len(statuses)],
+                    user=user,
+                    space_id=space_id,
+                ))
+                if len(batch) >= batch_size:
+                    Event.objects.bulk_create(batch)
+                    batch = []
+        if batch:
+            Event.objects.bulk_create(batch)
+
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+        self.stdout.write(
+            f'Seeded {len(space_ids)} spaces and {per_space * len(space_ids)} events '
+            f'in {time.perf_counter() - started:.1f}s'
+        )
+
+    def run(self, runs):
+        timings = []
+        found = 0
+        for run in range(runs):
+            start = self.origin + timedelta(hours=run * 5)
+            queryset = Space.objects.available_between(start, start + timedelta(hours=3)).filter(
+                capacity__gte=50,
+                price_per_hour__lte=Decimal('3000')
+            ).values_list('id', flat=True)
+            started = time.perf_counter()
+            found = len(list(queryset))
+            timings.append((time.perf_counter() - started) * 1000)
+
+        timings.sort()
+        self.stdout.write(
+            f'search: runs={runs} last_matches={found} '
+            f'median={statistics.median(timings):.2f}ms '
+            f'p95={timings[int(len(timings) * 0.95) - 1]:.2f}ms '
+            f'max={timings[-1]:.2f}ms'
+        )
@@ -1,5 +1,25 @@
+from django.apps import apps
 from django.db import models
+from django.db.models import Exists, OuterRef
 from django.contrib.auth import get_user_model
+from apps.bookings.availability import ACTIVE_STATUSES
+
+
+class SpaceQuerySet(models.QuerySet):
+    def available_between(self, start, end):
+        """
+        Spaces with no pending or confirmed event overlapping [start, end),
+        expressed as a single NOT EXISTS anti-join
+        """
+        Event = apps.get_model('bookings', 'Event')
+        overlapping = Event.objects.filter(
+            space=OuterRef('pk'),
+            status__in=ACTIVE_STATUSES,
+            start_datetime__lt=end,
+            end_datetime__gt=start
+        )
+        return self.filter(~Exists(overlapping))
+
 
 # Create your models here.
 class Space(models.Model):
@@ -33,6 +53,8 @@ class Space(models.Model):
         related_name='organized_spaces', blank=True, null=True
     )
 
+    objects = SpaceQuerySet.as_manager()
+
     def __str__(self):
         return self.name
 
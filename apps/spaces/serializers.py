@@ -1,7 +1,8 @@
 from rest_framework import serializers
+from core.serializers import SparseFieldsMixin
 from .models import Space
 
-class SpaceSerializer(serializers.ModelSerializer):
+class SpaceSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Space
         fields = '__all__'
@@ -0,0 +1,22 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.cache import bump_version
+from apps.bookings.models import Event
+from .models import Space
+
+SPACES_CACHE = 'spaces'
+
+
+def invalidate_spaces_cache():
+    """Drop the cached spaces responses once the current transaction commits"""
+    transaction.on_commit(lambda: bump_version(SPACES_CACHE))
+
+
+@receiver(post_save, sender=Space)
+@receiver(post_delete, sender=Space)
+@receiver(post_save, sender=Event)
+@receiver(post_delete, sender=Event)
+def invalidate_spaces_cache_on_change(sender, **kwargs):
+    invalidate_spaces_cache()
@@ -1,7 +1,27 @@
-from django.test import TestCase
+import io
+import json
+from decimal import Decimal
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
 from rest_framework.test import APITestCase
 from rest_framework import status
 from django.urls import reverse
+from django.utils import timezone
+from datetime import timedelta
+from apps.authentication.models import User
+from apps.bookings.models import Event
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+from core.parsers import ORJSONParser
+from core.renderers import ORJSONRenderer
+from core.serializers import ValuesPlan
+from rest_framework.test import APIRequestFactory
+from .serializers import SpaceSerializer
 from .models import Space
 
 class SpaceViewTestCase(APITestCase):
@@ -61,3 +81,274 @@ class SpaceViewTestCase(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data), 1)
         self.assertEqual(response.data[0]['name'], 'Test Conference Room')
+
+
+class SpaceAvailabilityTestCase(APITestCase):
+
+    def setUp(self):
+        """Set up a space with a few bookings on one day"""
+        self.user = User.objects.create_user(
+            email='organizer@example.com',
+            first_name='Test',
+            last_name='Organizer',
+            password='testpass123'
+        )
+        self.space = Space.objects.create(
+            name='Main Hall',
+            location='Building A',
+            capacity=200,
+            price_per_hour='1500.00'
+        )
+        self.day = (timezone.now() + timedelta(days=3)).replace(hour=8, minute=0, second=0, microsecond=0)
+        for name, start, end, event_status in [
+            ('Morning', 1, 2, 'confirmed'),
+            ('Back to back', 2, 3, 'pending'),
+            ('Tight gap', 3.25, 4, 'confirmed'),
+            ('Called off', 5, 6, 'cancelled'),
+        ]:
+            Event.objects.create(
+                event_name=name,
+                start_datetime=self.day + timedelta(hours=start),
+                end_datetime=self.day + timedelta(hours=end),
+                organizer_name='Test Organizer',
+                organizer_email='organizer@example.com',
+                user=self.user,
+                space=self.space,
+                status=event_status
+            )
+        self.url = reverse('space-availability', args=[self.space.pk])
+
+    def window(self, **params):
+        params.setdefault('from', self.day.isoformat())
+        params.setdefault('to', (self.day + timedelta(hours=8)).isoformat())
+        return self.client.get(self.url, params)
+
+    def test_free_busy_sweep(self):
+        """Active events are merged into busy blocks and short gaps are dropped"""
+        with self.assertNumQueries(2):
+            response = self.window(granularity=30)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['busy']), 2)
+        # The 15 minute gap before "Tight gap" is shorter than the minimum slot
+        self.assertEqual(len(response.data['free']), 2)
+
+        response = self.window(granularity=15)
+        self.assertEqual(len(response.data['free']), 3)
+
+    def test_invalid_window(self):
+        response = self.window(to=(self.day - timedelta(hours=1)).isoformat())
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.get(reverse('space-availability', args=[self.space.pk + 1]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class SpaceSearchTestCase(APITestCase):
+
+    def setUp(self):
+        """Set up spaces with differing capacity, price and bookings"""
+        self.url = reverse('search-spaces')
+        self.user = User.objects.create_user(
+            email='organizer@example.com',
+            first_name='Test',
+            last_name='Organizer',
+            password='testpass123'
+        )
+        self.start = (timezone.now() + timedelta(days=3)).replace(microsecond=0)
+        self.small = Space.objects.create(name='Huddle Room', location='A', capacity=6, price_per_hour='200.00')
+        self.busy = Space.objects.create(name='Main Hall', location='B', capacity=200, price_per_hour='1500.00')
+        self.cancelled = Space.objects.create(name='Side Hall', location='C', capacity=120, price_per_hour='900.00')
+        self.pricey = Space.objects.create(name='Auditorium', location='D', capacity=500, price_per_hour='9000.00')
+        # No overlapping event, but currently occupied, so not bookable
+        self.occupied = Space.objects.create(name='Lab', location='E', capacity=80, price_per_hour='400.00', status='booked')
+        for space, event_status in [(self.busy, 'pending'), (self.cancelled, 'cancelled')]:
+            Event.objects.create(
+                event_name='Existing booking',
+                start_datetime=self.start + timedelta(hours=1),
+                end_datetime=self.start + timedelta(hours=2),
+                organizer_name='Test Organizer',
+                organizer_email='organizer@example.com',
+                user=self.user,
+                space=space,
+                status=event_status
+            )
+
+    def test_search_excludes_booked_small_and_expensive_spaces(self):
+        """Only bookable free spaces within the capacity and price limits are returned, in one query"""
+        params = {
+            'start': self.start.isoformat(),
+            'end': (self.start + timedelta(hours=3)).isoformat(),
+            'min_capacity': 50,
+            'max_price': '5000',
+        }
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, params)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([space['name'] for space in response.data], ['Side Hall'])
+
+    def test_search_requires_window(self):
+        response = self.client.get(self.url, {'start': self.start.isoformat()})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_search_rejects_non_finite_max_price(self):
+        for max_price in ['NaN', 'sNaN', 'Infinity', '-inf']:
+            response = self.client.get(self.url, {
+                'start': self.start.isoformat(),
+                'end': (self.start + timedelta(hours=3)).isoformat(),
+                'max_price': max_price,
+            })
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, max_price)
+
+
+class SpaceCacheTestCase(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.list_url = reverse('list-spaces')
+        self.space = Space.objects.create(name='Main Hall', location='Building A', capacity=100, price_per_hour='500.00')
+
+    def test_list_is_served_from_cache_until_a_space_changes(self):
+        self.client.get(self.list_url)
+        with self.assertNumQueries(0):
+            response = self.client.get(self.list_url)
+        self.assertEqual([space['name'] for space in response.data], ['Main Hall'])
+
+        self.space.name = 'Grand Hall'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.space.save()
+
+        response = self.client.get(self.list_url)
+        self.assertEqual([space['name'] for space in response.data], ['Grand Hall'])
+
+    def test_conditional_get_skips_the_database(self):
+        etag = self.client.get(self.list_url)['ETag']
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.list_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.space.save()
+        response = self.client.get(self.list_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_detail_caches_missing_spaces_too(self):
+        url = reverse('space-detail', args=[self.space.pk + 1])
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_stale_entry_is_served_while_another_request_rebuilds(self):
+        self.client.get(self.list_url)
+        Space.objects.filter(pk=self.space.pk).update(name='Grand Hall')
+
+        with mock.patch('core.cache.time.time', return_value=timezone.now().timestamp() + 120):
+            # Another request holds the rebuild lock, so the stale copy is served
+            with mock.patch('core.cache.cache.add', return_value=False), self.assertNumQueries(0):
+                response = self.client.get(self.list_url)
+            self.assertEqual(response.data[0]['name'], 'Main Hall')
+
+            response = self.client.get(self.list_url)
+        self.assertEqual(response.data[0]['name'], 'Grand Hall')
+
+    def test_stream_matches_regular_response(self):
+        Space.objects.create(name='Side Hall', location='Building B', capacity=40, price_per_hour='250.50')
+        expected = self.client.get(self.list_url).json()
+
+        response = self.client.get(self.list_url, {'stream': '1'})
+        self.assertTrue(response.streaming)
+        self.assertEqual(json.loads(b''.join(response.streaming_content)), expected)
+
+        response = self.client.get(self.list_url, {'stream': 'ndjson'})
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(line) for line in lines], expected)
+
+
+class ORJSONRendererTestCase(SimpleTestCase):
+
+    def test_output_matches_drf_renderer(self):
+        data = {
+            'price_per_hour': Decimal('1250.50'),
+            'created_at': timezone.now().replace(microsecond=123456),
+            'date': timezone.now().date(),
+            'label': gettext_lazy('Space not found'),
+            'text': 'Caf\u00e9 \u2028 line',
+            1: [None, True, 1.5, 'x'],
+        }
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_indent_falls_back_to_stdlib(self):
+        rendered = ORJSONRenderer().render({'a': 1}, 'application/json; indent=2')
+        self.assertEqual(rendered, b'{\n  "a": 1\n}')
+
+    def test_parser_reads_utf8_and_rejects_invalid_json(self):
+        parser = ORJSONParser()
+        self.assertEqual(parser.parse(io.BytesIO('{"name": "Caf\u00e9"}'.encode())), {'name': 'Caf\u00e9'})
+        with self.assertRaises(ParseError):
+            parser.parse(io.BytesIO(b'{"name": NaN}'))
+
+
+class SpaceValuesPlanTestCase(TestCase):
+
+    def setUp(self):
+        organizer = User.objects.create_user(
+            email='organizer@example.com',
+            first_name='Space',
+            last_name='Organizer',
+            password='testpass123'
+        )
+        Space.objects.create(
+            name='Main Hall', location='Building A', capacity=100, price_per_hour='1250.50',
+            image1='spaces/images/hall.jpg', image2='', description='Big room', organizer=organizer
+        )
+        Space.objects.create(name='Side Room', location='Building B', capacity=8, price_per_hour='99.99')
+
+    def test_output_is_byte_identical_to_serializer(self):
+        request = APIRequestFactory().get('/api/spaces/')
+        for context in ({}, {'request': request}):
+            queryset = Space.objects.order_by('id')
+            expected = JSONRenderer().render(SpaceSerializer(queryset, many=True, context=context).data)
+            actual = JSONRenderer().render(ValuesPlan(SpaceSerializer, context=context).serialize(queryset))
+            self.assertEqual(actual, expected)
+
+    def test_reads_rows_in_one_query(self):
+        with self.assertNumQueries(1):
+            ValuesPlan(SpaceSerializer).serialize(Space.objects.all())
+
+    def test_sparse_fields_select_only_requested_columns(self):
+        cache.clear()
+        url = reverse('list-spaces')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {'fields': 'id,name,capacity'})
+
+        self.assertEqual(list(response.data[0]), ['id', 'name', 'capacity'])
+        select = queries.captured_queries[-1]['sql']
+        self.assertNotIn('description', select)
+        self.assertNotIn('image1', select)
+
+        response = self.client.get(url, {'omit': 'description,equipment,features'})
+        self.assertNotIn('description', response.data[0])
+        self.assertIn('image1', response.data[0])
+
+        space = Space.objects.get(name='Side Room')
+        response = self.client.get(reverse('space-detail', args=[space.pk]), {'fields': 'name'})
+        self.assertEqual(response.data, {'name': 'Side Room'})
+
+    def test_unknown_fields_are_rejected_before_caching(self):
+        space = Space.objects.get(name='Side Room')
+        with mock.patch('apps.spaces.views.get_or_build') as get_or_build:
+            for url in [reverse('list-spaces'), reverse('space-detail', args=[space.pk])]:
+                for params in [{'fields': 'name,junk'}, {'omit': "it's junk"}]:
+                    response = self.client.get(url, params)
+                    self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, params)
+        get_or_build.assert_not_called()
+        self.assertEqual(response.data, {'error': "Unknown fields: it's junk"})
+
+        cache.clear()
+        with mock.patch('apps.spaces.views.get_or_build', return_value=[]) as get_or_build:
+            self.client.get(reverse('list-spaces'), {'fields': 'name, id', 'omit': 'capacity'})
+        self.assertEqual(get_or_build.call_args.args[1], 'list:id,name:capacity')
+
@@ -1,7 +1,10 @@
 from django.urls import path
-from .views import list_spaces, space_detail
+from .views import list_spaces, space_detail, space_availability, search_spaces, space_calendar
 
 urlpatterns = [
     path('', list_spaces, name='list-spaces'),
+    path('search/', search_spaces, name='search-spaces'),
     path('<int:pk>/', space_detail, name='space-detail'),
+    path('<int:pk>/availability/', space_availability, name='space-availability'),
+    path('<int:pk>/calendar.ics', space_calendar, name='space-calendar'),
 ]
\ No newline at end of file
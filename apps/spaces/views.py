@@ -2,13 +2,55 @@ from django.shortcuts import render
 from rest_framework.generics import CreateAPIView
 from rest_framework.response import Response
 from rest_framework import status
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, renderer_classes
 from rest_framework import permissions
 from rest_framework.permissions import AllowAny
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
+from datetime import datetime, time, timedelta
+from decimal import Decimal, InvalidOperation
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework import serializers
+from django.conf import settings
+from core.cache import get_or_build, get_version
+from core.conditional import make_etag, not_modified, set_validators
+from core.serializers import ValuesPlan, fields_key, requested_fields
+from core.streaming import stream_format, streaming_response
 from .models import Space
 from .serializers import SpaceSerializer
+from .signals import SPACES_CACHE
+from apps.bookings.availability import ACTIVE_STATUSES, free_busy
+from apps.bookings.calendar import ICalendarRenderer, calendar_response
+from apps.bookings.models import Event
+
+# Largest window the availability endpoint will sweep in one request
+MAX_AVAILABILITY_WINDOW = timedelta(days=92)
+
+
+def spaces_etag(request, *parts):
+    """
+    ETag of a spaces response, derived from the spaces cache version so that
+    a conditional GET is answered without touching the database
+    """
+    return make_etag(get_version(SPACES_CACHE), request.META.get('HTTP_ACCEPT'), *parts)
+
+
+def selected_fields(request):
+    """
+    The ?fields= / ?omit= selection of a spaces request. Only SpaceSerializer
+    field names are accepted, since the selection is part of the cache key.
+    """
+    return requested_fields(request, allowed=SpaceSerializer().fields)
+
+
+def cached_response(key, build):
+    """Serve spaces response data from the versioned cache (see core.cache)"""
+    return get_or_build(
+        SPACES_CACHE, key, build,
+        timeout=settings.SPACES_CACHE_TIMEOUT,
+        stale_timeout=settings.SPACES_CACHE_STALE_TIMEOUT
+    )
 
 class CreateSpaceView(CreateAPIView):
     """
@@ -63,20 +105,77 @@ class CreateSpaceView(CreateAPIView):
             'errors': serializer.errors
         }, status=status.HTTP_400_BAD_REQUEST)
 
+@swagger_auto_schema(
+    method='get',
+    operation_description="List all spaces.",
+    manual_parameters=[
+        openapi.Parameter(
+            'stream',
+            openapi.IN_QUERY,
+            description='Stream the spaces as a JSON array (1) or NDJSON (ndjson) instead of building the whole response',
+            type=openapi.TYPE_STRING,
+            enum=['1', 'ndjson']
+        ),
+        openapi.Parameter(
+            'fields',
+            openapi.IN_QUERY,
+            description='Comma-separated fields to include, e.g. id,name,capacity',
+            type=openapi.TYPE_STRING
+        ),
+        openapi.Parameter(
+            'omit',
+            openapi.IN_QUERY,
+            description='Comma-separated fields to leave out',
+            type=openapi.TYPE_STRING
+        ),
+    ],
+    responses={200: SpaceSerializer(many=True), 400: 'Unknown fields'}
+)
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def list_spaces(request):
     """
     List all available spaces
     """
-    spaces = Space.objects.all()
-    serializer = SpaceSerializer(spaces, many=True)
-    return Response(serializer.data)
+    try:
+        fields, omit = selected_fields(request)
+    except ValueError as exc:
+        return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+    fmt = stream_format(request)
+    key = f'list:{fields_key(fields, omit)}'
+    etag = spaces_etag(request, key, fmt)
+    unchanged = not_modified(request, etag)
+    if unchanged is not None:
+        return unchanged
+
+    if fmt:
+        response = streaming_response(Space.objects.order_by('id'), SpaceSerializer, fmt=fmt, fields=fields, omit=omit)
+        return set_validators(response, etag)
+
+    def build():
+        # Only the selected columns are read (see ValuesPlan)
+        return ValuesPlan(SpaceSerializer, fields=fields, omit=omit).serialize(Space.objects.all())
+
+    return set_validators(Response(cached_response(key, build)), etag)
 
 @swagger_auto_schema(
     method='get',
     operation_description="Retrieve details of a space by its ID.",
-    responses={200: SpaceSerializer(), 404: 'Not Found'}
+    manual_parameters=[
+        openapi.Parameter(
+            'fields',
+            openapi.IN_QUERY,
+            description='Comma-separated fields to include, e.g. id,name,capacity',
+            type=openapi.TYPE_STRING
+        ),
+        openapi.Parameter(
+            'omit',
+            openapi.IN_QUERY,
+            description='Comma-separated fields to leave out',
+            type=openapi.TYPE_STRING
+        ),
+    ],
+    responses={200: SpaceSerializer(), 400: 'Unknown fields', 404: 'Not Found'}
 )
 @api_view(['GET'])
 @permission_classes([permissions.AllowAny])
@@ -85,11 +184,24 @@ def space_detail(request, pk):
     Retrieve details of a space by its ID.
     """
     try:
-        space = Space.objects.get(pk=pk)
-    except Space.DoesNotExist:
+        fields, omit = selected_fields(request)
+    except ValueError as exc:
+        return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+    key = f'detail:{pk}:{fields_key(fields, omit)}'
+    etag = spaces_etag(request, key)
+    unchanged = not_modified(request, etag)
+    if unchanged is not None:
+        return unchanged
+
+    def build():
+        plan = ValuesPlan(SpaceSerializer, fields=fields, omit=omit)
+        row = plan.values(Space.objects.filter(pk=pk)).first()
+        return None if row is None else plan.to_representation(row)
+
+    data = cached_response(key, build)
+    if data is None:
         return Response({"error": "Space not found"}, status=status.HTTP_404_NOT_FOUND)
-    serializer = SpaceSerializer(space)
-    return Response(serializer.data)
+    return set_validators(Response(data), etag)
 
 @swagger_auto_schema(
     method='get',
@@ -106,7 +218,137 @@ def space_images(request, pk):
         space = Space.objects.get(pk=pk)
     except Space.DoesNotExist:
         return Response({"error": "Space not found"}, status=status.HTTP_404_NOT_FOUND)
-    
 
 
+def parse_window_bound(value):
+    """Parse an ISO datetime or date query parameter into an aware datetime"""
+    parsed = parse_datetime(value)
+    if parsed is None:
+        parsed_date = parse_date(value)
+        if parsed_date is None:
+            raise ValueError(f'Invalid date/time: {value}')
+        parsed = datetime.combine(parsed_date, time.min)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+@swagger_auto_schema(
+    method='get',
+    operation_description="Free and busy blocks of a space within a time window, computed in a single query.",
+    manual_parameters=[
+        openapi.Parameter('from', openapi.IN_QUERY, description='Window start (ISO date or date-time, default now)', type=openapi.TYPE_STRING),
+        openapi.Parameter('to', openapi.IN_QUERY, description='Window end (ISO date or date-time, default 7 days after start)', type=openapi.TYPE_STRING),
+        openapi.Parameter('granularity', openapi.IN_QUERY, description='Minimum free slot length in minutes (default 30)', type=openapi.TYPE_INTEGER),
+    ],
+    responses={200: 'Free and busy intervals', 400: 'Invalid window', 404: 'Not Found'}
+)
+@api_view(['GET'])
+@permission_classes([permissions.AllowAny])
+def space_availability(request, pk):
+    """
+    Return merged busy blocks (pending and confirmed events) and the free
+    slots between them as compact [start, end] pairs.
+    """
+    try:
+        window_start = parse_window_bound(request.query_params['from']) if 'from' in request.query_params else timezone.now()
+        window_end = parse_window_bound(request.query_params['to']) if 'to' in request.query_params else window_start + timedelta(days=7)
+        granularity = int(request.query_params.get('granularity', 30))
+    except ValueError as exc:
+        return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+    if window_end <= window_start:
+        return Response({"error": "'to' must be after 'from'"}, status=status.HTTP_400_BAD_REQUEST)
+    if window_end - window_start > MAX_AVAILABILITY_WINDOW:
+        return Response(
+            {"error": f"Window cannot be longer than {MAX_AVAILABILITY_WINDOW.days} days"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if granularity <= 0:
+        return Response({"error": "granularity must be a positive number of minutes"}, status=status.HTTP_400_BAD_REQUEST)
+
+    if not Space.objects.filter(pk=pk).exists():
+        return Response({"error": "Space not found"}, status=status.HTTP_404_NOT_FOUND)
+
+    intervals = Event.objects.filter(
+        space_id=pk,
+        status__in=ACTIVE_STATUSES,
+        start_datetime__lt=window_end,
+        end_datetime__gt=window_start
+    ).order_by('start_datetime').values_list('start_datetime', 'end_datetime')
+
+    busy, free = free_busy(intervals, window_start, window_end, min_slot=timedelta(minutes=granularity))
+
+    to_representation = serializers.DateTimeField().to_representation
+    return Response({
+        'space': int(pk),
+        'from': to_representation(window_start),
+        'to': to_representation(window_end),
+        'granularity': granularity,
+        'busy': [[to_representation(start), to_representation(end)] for start, end in busy],
+        'free': [[to_representation(start), to_representation(end)] for start, end in free],
+    })
+
+@swagger_auto_schema(
+    method='get',
+    operation_description="Find every bookable (status free) space that has no booking in the whole window and fits the capacity and price limits.",
+    manual_parameters=[
+        openapi.Parameter('start', openapi.IN_QUERY, description='Window start (ISO date or date-time)', type=openapi.TYPE_STRING, required=True),
+        openapi.Parameter('end', openapi.IN_QUERY, description='Window end (ISO date or date-time)', type=openapi.TYPE_STRING, required=True),
+        openapi.Parameter('min_capacity', openapi.IN_QUERY, description='Minimum capacity', type=openapi.TYPE_INTEGER),
+        openapi.Parameter('max_price', openapi.IN_QUERY, description='Maximum price per hour', type=openapi.TYPE_NUMBER),
+    ],
+    responses={200: SpaceSerializer(many=True), 400: 'Invalid search parameters'}
+)
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def search_spaces(request):
+    """
+    Search for spaces that are free between start and end.
+    """
+    try:
+        start = parse_window_bound(request.query_params['start'])
+        end = parse_window_bound(request.query_params['end'])
+        min_capacity = request.query_params.get('min_capacity')
+        min_capacity = int(min_capacity) if min_capacity else None
+        max_price = request.query_params.get('max_price')
+        max_price = Decimal(max_price) if max_price else None
+        if max_price is not None and not max_price.is_finite():
+            raise ValueError('max_price must be a finite number')
+    except KeyError:
+        return Response({"error": "'start' and 'end' are required"}, status=status.HTTP_400_BAD_REQUEST)
+    except (ValueError, InvalidOperation) as exc:
+        return Response({"error": f"Invalid search parameters: {exc}"}, status=status.HTTP_400_BAD_REQUEST)
+
+    if end <= start:
+        return Response({"error": "'end' must be after 'start'"}, status=status.HTTP_400_BAD_REQUEST)
+
+    # Only spaces BookEventView would accept: 'booked' ones are occupied right now
+    spaces = Space.objects.filter(status='free').available_between(start, end)
+    if min_capacity is not None:
+        spaces = spaces.filter(capacity__gte=min_capacity)
+    if max_price is not None:
+        spaces = spaces.filter(price_per_hour__lte=max_price)
+
+    serializer = SpaceSerializer(spaces.order_by('capacity', 'price_per_hour', 'id'), many=True, context={'request': request})
+    return Response(serializer.data)
+
+@swagger_auto_schema(
+    method='get',
+    operation_description="iCalendar feed of the pending and confirmed events of a space, for calendar subscriptions.",
+    responses={200: 'text/calendar feed', 404: 'Not Found'}
+)
+@api_view(['GET'])
+@permission_classes([AllowAny])
+@renderer_classes([ICalendarRenderer])
+def space_calendar(request, pk):
+    """
+    Subscribable .ics feed of a space's bookings, cached until one of them changes.
+    """
+    def load():
+        space = Space.objects.filter(pk=pk).only('name').first()
+        if space is None:
+            return None
+        return f'{space.name} bookings', Event.objects.filter(space_id=pk)
+
+    return calendar_response(request, 'space', pk, load)
 
@@ -1,9 +1,121 @@
+import os
+import smtplib
 import ssl
+import threading
+import time
+from collections import deque
 
+from django.conf import settings
 from django.core.mail.backends.smtp import EmailBackend as SMTPBackend
+from django.core.mail.message import sanitize_address
 from django.utils.functional import cached_property
 
+
+class ConnectionPool:
+    """
+    Bounded set of authenticated SMTP sessions shared by the backends of one
+    worker process. Idle sessions are reused most-recently-used first, closed
+    once they have been idle for longer than idle_timeout, and probed with
+    NOOP before reuse when they have been idle for health_check_interval.
+    """
+
+    def __init__(self, size, idle_timeout, health_check_interval):
+        self.size = size
+        self.idle_timeout = idle_timeout
+        self.health_check_interval = health_check_interval
+        self.pid = os.getpid()
+        self._idle = deque()
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout=None):
+        """
+        Reserve a slot and return an idle healthy session, or None when the
+        caller has to open a new one. The slot is held until release().
+        """
+        if not self._slots.acquire(timeout=timeout):
+            raise smtplib.SMTPException(f'No SMTP connection available in the pool of {self.size}')
+
+        while True:
+            with self._lock:
+                if not self._idle:
+                    return None
+                connection, last_used = self._idle.pop()
+
+            idle_for = time.monotonic() - last_used
+            if idle_for > self.idle_timeout:
+                self._quit(connection)
+            elif idle_for > self.health_check_interval and not self._is_healthy(connection):
+                self._quit(connection)
+            else:
+                return connection
+
+    def release(self, connection, reusable=True):
+        """Give a session back to the pool (or close it) and free its slot"""
+        try:
+            if connection is not None:
+                if reusable:
+                    with self._lock:
+                        self._idle.append((connection, time.monotonic()))
+                else:
+                    self._quit(connection)
+        finally:
+            self._slots.release()
+
+    def clear(self):
+        with self._lock:
+            idle, self._idle = self._idle, deque()
+        for connection, _ in idle:
+            self._quit(connection)
+
+    @staticmethod
+    def _is_healthy(connection):
+        try:
+            return connection.noop()[0] == 250
+        except (smtplib.SMTPException, OSError):
+            return False
+
+    @staticmethod
+    def _quit(connection):
+        try:
+            connection.quit()
+        except (smtplib.SMTPException, OSError):
+            connection.close()
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(key):
+    """Pool for one (host, port, user, tls, ssl) combination in this process"""
+    with _pools_lock:
+        pool = _pools.get(key)
+        # Sockets must not be shared with a forked child (gunicorn/celery prefork)
+        if pool is None or pool.pid != os.getpid():
+            pool = _pools[key] = ConnectionPool(
+                size=getattr(settings, 'EMAIL_POOL_SIZE', 4),
+                idle_timeout=getattr(settings, 'EMAIL_POOL_IDLE_TIMEOUT', 60),
+                health_check_interval=getattr(settings, 'EMAIL_POOL_HEALTH_CHECK_INTERVAL', 10),
+            )
+        return pool
+
+
+def clear_pools():
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.clear()
+
+
 class EmailBackend(SMTPBackend):
+    """
+    SMTP backend that borrows authenticated sessions from a per-process pool
+    instead of running TCP + STARTTLS + AUTH for every send(), and reconnects
+    once when a pooled session turns out to be dead before DATA.
+    """
+
     @cached_property
     def ssl_context(self):
         if self.ssl_certfile or self.ssl_keyfile:
@@ -14,4 +126,106 @@ class EmailBackend(SMTPBackend):
             ssl_context = ssl.create_default_context()
             ssl_context.check_hostname = False
             ssl_context.verify_mode = ssl.CERT_NONE
-            return ssl_context
\ No newline at end of file
+            return ssl_context
+
+    @property
+    def pool(self):
+        return get_pool((self.host, self.port, self.username, self.use_tls, self.use_ssl))
+
+    def open(self):
+        if self.connection:
+            return False
+
+        self.connection = self.pool.acquire(timeout=getattr(settings, 'EMAIL_POOL_ACQUIRE_TIMEOUT', 10))
+        if self.connection is not None:
+            return True
+
+        try:
+            opened = super().open()
+        except BaseException:
+            # A half-open session (e.g. failed AUTH) must not leak its slot
+            connection, self.connection = self.connection, None
+            self.pool.release(connection, reusable=False)
+            raise
+        if not opened:
+            # Failed silently, give the slot back
+            connection, self.connection = self.connection, None
+            self.pool.release(connection, reusable=False)
+        return opened
+
+    def close(self, reusable=True):
+        if self.connection is None:
+            return
+        connection, self.connection = self.connection, None
+        self.pool.release(connection, reusable=reusable)
+
+    def _reconnect(self):
+        """Replace a dead pooled session with another one"""
+        self.close(reusable=False)
+        self.open()
+        return self.connection is not None
+
+    def _envelope(self, from_email, recipients, message):
+        """
+        EHLO, MAIL FROM and RCPT TO, the way SMTP.sendmail() starts. Nothing
+        has been delivered yet when these fail, so the caller may retry them
+        on another session.
+        """
+        connection = self.connection
+        connection.ehlo_or_helo_if_needed()
+        options = [f'size={len(message)}'] if connection.does_esmtp and connection.has_extn('size') else []
+        code, response = connection.mail(from_email, options)
+        if code == 421:
+            raise smtplib.SMTPServerDisconnected(response)
+        if code != 250:
+            connection.rset()
+            raise smtplib.SMTPSenderRefused(code, response, from_email)
+        refused = {}
+        for recipient in recipients:
+            code, response = connection.rcpt(recipient)
+            if code == 421:
+                raise smtplib.SMTPServerDisconnected(response)
+            if code not in (250, 251):
+                refused[recipient] = (code, response)
+        if len(refused) == len(recipients):
+            connection.rset()
+            raise smtplib.SMTPRecipientsRefused(refused)
+
+    def _send(self, email_message):
+        """
+        A helper method that does the actual sending. A session that drops
+        during the envelope is replaced once and the message retried; once
+        DATA has started the server may already have accepted the message,
+        so a failure there is raised instead of risking a duplicate.
+        """
+        if not email_message.recipients() or self.connection is None:
+            return False
+        encoding = email_message.encoding or settings.DEFAULT_CHARSET
+        from_email = sanitize_address(email_message.from_email, encoding)
+        recipients = [sanitize_address(addr, encoding) for addr in email_message.recipients()]
+        message = email_message.message().as_bytes(linesep='\r\n')
+
+        try:
+            for attempt in range(2):
+                try:
+                    self._envelope(from_email, recipients, message)
+                    break
+                except (smtplib.SMTPServerDisconnected, ConnectionError):
+                    if attempt == 0 and self._reconnect():
+                        continue
+                    raise
+
+            try:
+                code, response = self.connection.data(message)
+            except (smtplib.SMTPServerDisconnected, ConnectionError):
+                # Whether the message went out is unknown: never reuse the session
+                self.close(reusable=False)
+                raise
+            if code != 250:
+                self.connection.rset()
+                raise smtplib.SMTPDataError(code, response)
+            return True
+        except (smtplib.SMTPException, ConnectionError):
+            if not self.fail_silently:
+                raise
+            return False
@@ -0,0 +1,71 @@
+import time
+
+from django.core.cache import cache
+
+# Seconds a rebuild may hold a key's lock before another caller takes over
+LOCK_TIMEOUT = 10
+LOCK_POLL_INTERVAL = 0.05
+
+
+def version_key(namespace):
+    return f'{namespace}:version'
+
+
+def get_version(namespace):
+    """
+    Current version of a cache namespace. Versions start from a timestamp so
+    that one recreated after eviction never matches entries written earlier.
+    """
+    key = version_key(namespace)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(namespace):
+    """Invalidate every entry of a namespace by moving it to a new version"""
+    try:
+        return cache.incr(version_key(namespace))
+    except ValueError:
+        return get_version(namespace)
+
+
+def get_or_build(namespace, key, build, timeout, stale_timeout):
+    """
+    Return build() through the cache, under the namespace's current version.
+
+    Entries are fresh for `timeout` seconds and are then served stale for up
+    to `stale_timeout` more seconds while the one caller that wins a
+    cache.add() lock rebuilds them. On a miss the other callers wait for that
+    rebuild rather than all querying the database at once.
+    """
+    full_key = f'{namespace}:{get_version(namespace)}:{key}'
+    lock_key = f'{full_key}:lock'
+
+    entry = cache.get(full_key)
+    if entry is not None:
+        value, fresh_until = entry
+        if fresh_until > time.time() or not cache.add(lock_key, 1, LOCK_TIMEOUT):
+            return value
+        return _rebuild(full_key, lock_key, build, timeout, stale_timeout)
+
+    deadline = time.monotonic() + LOCK_TIMEOUT
+    while not cache.add(lock_key, 1, LOCK_TIMEOUT):
+        if time.monotonic() >= deadline:
+            break
+        time.sleep(LOCK_POLL_INTERVAL)
+        entry = cache.get(full_key)
+        if entry is not None:
+            return entry[0]
+    return _rebuild(full_key, lock_key, build, timeout, stale_timeout)
+
+
+def _rebuild(full_key, lock_key, build, timeout, stale_timeout):
+    try:
+        value = build()
+        cache.set(full_key, (value, time.time() + timeout), timeout + stale_timeout)
+        return value
+    finally:
+        cache.delete(lock_key)
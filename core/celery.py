@@ -1,5 +1,6 @@
 import os
 from celery import Celery
+from celery.schedules import crontab
 from django.conf import settings
 
 # Set the default Django settings module for the 'celery' program
@@ -16,14 +17,36 @@ app.autodiscover_tasks()
 
 # Define periodic tasks
 app.conf.beat_schedule = {
+    # Events are completed at their end time by complete_event; this sweep
+    # is a safety net and schedules completions within the horizon. The
+    # DatabaseScheduler matches entries by name and never deletes old ones,
+    # so the original key is kept to change its schedule in place
     'update-space-status-every-5-minutes': {
         'task': 'apps.bookings.tasks.update_space_status',
-        'schedule': 300.0,  # every 5 minutes
+        'schedule': 3600.0,  # every hour
+    },
+    # The hourly sweep only looks at events that ended since its previous
+    # run, so events confirmed after their end (or after that run) are only
+    # reached by a full sweep
+    'update-space-status-full-daily': {
+        'task': 'apps.bookings.tasks.update_space_status',
+        'schedule': crontab(hour=3, minute=30),  # every day at 03:30
+        'kwargs': {'full': True},
     },
     'check-pending-events-every-hour': {
         'task': 'apps.bookings.tasks.check_pending_events',
         'schedule': 3600.0,  # every hour
     },
+    # Safety net for outbox rows whose post-commit drain was never scheduled
+    'drain-email-outbox-every-minute': {
+        'task': 'apps.bookings.tasks.drain_email_outbox',
+        'schedule': 60.0,  # every minute
+    },
+    # Safety net for async booking tickets that never reached their partition
+    'requeue-booking-tickets-every-minute': {
+        'task': 'apps.bookings.tasks.requeue_booking_tickets',
+        'schedule': 60.0,  # every minute
+    },
 }
 
 app.conf.timezone = 'Africa/Nairobi'
@@ -0,0 +1,49 @@
+import codecs
+import csv
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser, JSONParser
+
+from .renderers import orjson
+
+
+class ORJSONParser(JSONParser):
+    """JSONParser that decodes with orjson, or the stdlib when it is missing"""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if orjson is None:
+            return super().parse(stream, media_type, parser_context)
+
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        try:
+            data = stream.read()
+            if encoding.lower().replace('-', '') != 'utf8':
+                data = data.decode(encoding)
+            return orjson.loads(data)
+        except (ValueError, orjson.JSONDecodeError) as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
+
+
+class CSVParser(BaseParser):
+    """
+    text/csv body with a header row, parsed into a list of dicts. Empty cells
+    are dropped so optional columns behave like missing JSON keys.
+    """
+    media_type = 'text/csv'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        # utf-8-sig swallows the BOM spreadsheet exports start with
+        if encoding.lower().replace('-', '') == 'utf8':
+            encoding = 'utf-8-sig'
+        try:
+            reader = csv.DictReader(codecs.getreader(encoding)(stream))
+            return [
+                {key.strip(): value for key, value in row.items() if key and value not in ('', None)}
+                for row in reader
+            ]
+        except (UnicodeDecodeError, csv.Error) as exc:
+            raise ParseError('CSV parse error - %s' % str(exc))
@@ -0,0 +1,146 @@
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.relations import PKOnlyObject
+from rest_framework.settings import api_settings
+
+
+def requested_fields(request, allowed=None):
+    """
+    The (fields, omit) name tuples asked for with ?fields=a,b and ?omit=c,
+    each None when the parameter is absent. With allowed, a collection of
+    field names, raises ValueError listing any other name requested.
+    """
+    # DRF requests have query_params, plain Django ones only GET
+    params = getattr(request, 'query_params', request.GET)
+
+    def names(param):
+        value = params.get(param)
+        if value is None:
+            return None
+        return tuple(sorted({name.strip() for name in value.split(',') if name.strip()}))
+    fields, omit = names('fields'), names('omit')
+
+    if allowed is not None:
+        unknown = sorted(set(fields or ()).union(omit or ()).difference(allowed))
+        if unknown:
+            raise ValueError(f'Unknown fields: {", ".join(unknown)}')
+    return fields, omit
+
+
+def fields_key(fields, omit):
+    """
+    Cache key fragment for a (fields, omit) selection: the names joined with
+    commas, and * for "every field" when ?fields= is absent.
+    """
+    return f'{"*" if fields is None else ",".join(fields)}:{",".join(omit or ())}'
+
+
+class SparseFieldsMixin:
+    """
+    Serializer mixin that keeps only the fields a client asked for, from
+    fields=/omit= keyword arguments or else from ?fields= and ?omit= on the
+    request in the context (read requests only, so writes keep every field).
+    Unknown names are ignored.
+    """
+
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        omit = kwargs.pop('omit', None)
+        super().__init__(*args, **kwargs)
+
+        request = self.context.get('request')
+        if fields is None and omit is None and request is not None and request.method in SAFE_METHODS:
+            fields, omit = requested_fields(request)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+        for name in omit or ():
+            self.fields.pop(name, None)
+
+
+class ValuesPlan:
+    """
+    Compiled read-only fast path for a ModelSerializer.
+
+    The serializer's readable fields are turned once into a list of
+    (key, lookup, converter) steps. Rows are then fetched with
+    queryset.values(*lookups) and mapped to dicts with the fields' own
+    to_representation(), so the output is identical to the serializer's
+    but no model instance or field tree is built per row. Only plain model
+    fields, dotted sources (space.name), primary key relations and file
+    fields are supported. Only the selected fields' columns are fetched,
+    so a SparseFieldsMixin selection prunes the query as well.
+    """
+
+    def __init__(self, serializer_class, context=None, **kwargs):
+        serializer = serializer_class(context=context or {}, **kwargs)
+        model = serializer.Meta.model
+        self.steps = []
+        for field in serializer._readable_fields:
+            if isinstance(field, (serializers.BaseSerializer, serializers.SerializerMethodField)) or field.source == '*':
+                raise ImproperlyConfigured(
+                    f'{serializer_class.__name__}.{field.field_name} cannot be read with a values() query'
+                )
+            lookup = '__'.join(field.source_attrs)
+            self.steps.append((field.field_name, lookup, self._converter(model, field)))
+        self.lookups = list(dict.fromkeys(lookup for _, lookup, _ in self.steps))
+
+    @staticmethod
+    def _converter(model, field):
+        """
+        The field's to_representation(), specialised where the plain value is
+        already known to be in shape. Each shortcut returns exactly what the
+        field would.
+        """
+        if isinstance(field, serializers.PrimaryKeyRelatedField):
+            return lambda value: field.to_representation(PKOnlyObject(pk=value))
+
+        if isinstance(field, serializers.FileField):
+            model_field = model._meta.get_field(field.source)
+            if not getattr(field, 'use_url', api_settings.UPLOADED_FILES_USE_URL):
+                return lambda value: value or None
+            storage = model_field.storage
+            request = field.context.get('request')
+
+            def file_url(name):
+                if not name:
+                    return None
+                url = storage.url(name)
+                return url if request is None else request.build_absolute_uri(url)
+            return file_url
+
+        if isinstance(field, serializers.DateTimeField):
+            output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+            # Resolved once per plan instead of per value
+            field_timezone = field.timezone if hasattr(field, 'timezone') else field.default_timezone()
+            if output_format is None or output_format.lower() != ISO_8601 or field_timezone is None:
+                return field.to_representation
+
+            def iso_datetime(value):
+                if timezone.is_naive(value):
+                    return field.to_representation(value)
+                value = value.astimezone(field_timezone).isoformat()
+                return value[:-6] + 'Z' if value.endswith('+00:00') else value
+            return iso_datetime
+
+        if type(field) is serializers.CharField:
+            return lambda value: value if type(value) is str else str(value)
+        if type(field) is serializers.IntegerField:
+            return lambda value: value if type(value) is int else int(value)
+        return field.to_representation
+
+    def values(self, queryset, *extra):
+        """values() query for the plan, plus any extra lookups the caller needs (e.g. to paginate)"""
+        return queryset.values(*dict.fromkeys([*self.lookups, *extra]))
+
+    def to_representation(self, row):
+        # None short-circuits exactly like Serializer.to_representation()
+        return {
+            key: None if row[lookup] is None else convert(row[lookup])
+            for key, lookup, convert in self.steps
+        }
+
+    def serialize(self, queryset):
+        return [self.to_representation(row) for row in self.values(queryset)]
@@ -161,6 +161,16 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.AllowAny',
     ),
+    # orjson-backed JSON, falling back to the stdlib when orjson is missing
+    'DEFAULT_RENDERER_CLASSES': (
+        'core.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'core.parsers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
     
 }
 
@@ -178,6 +188,11 @@ EMAIL_HOST_PASSWORD = env('EMAIL_HOST_PASSWORD')
 EMAIL_PORT = 587
 EMAIL_USE_TLS = True
 EMAIL_USE_SSL = False
+# Authenticated SMTP sessions kept open per worker process
+EMAIL_POOL_SIZE = env.int('EMAIL_POOL_SIZE', default=4)
+EMAIL_POOL_IDLE_TIMEOUT = 60  # seconds before an idle session is closed
+EMAIL_POOL_HEALTH_CHECK_INTERVAL = 10  # idle seconds before NOOP-probing a session
+EMAIL_POOL_ACQUIRE_TIMEOUT = 10  # seconds to wait for a free session
 
 # Add this line to your settings file if it's not already there
 AUTH_USER_MODEL = 'authentication.User'
@@ -191,6 +206,60 @@ CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
 CELERY_BEAT_SCHEDULER = 'django_celery_beat.schedulers:DatabaseScheduler'
 
+# complete_event is only scheduled this many seconds ahead of an event's end;
+# keep it above the update_space_status interval. The Redis visibility
+# timeout must outlast it or ETA tasks get redelivered.
+EVENT_COMPLETION_HORIZON = env.int('EVENT_COMPLETION_HORIZON', default=7200)
+CELERY_BROKER_TRANSPORT_OPTIONS = {'visibility_timeout': EVENT_COMPLETION_HORIZON + 3600}
+
+# Redis in production; a per-process local memory cache in development and tests
+if DEBUG:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': env('CACHE_URL', default='redis://localhost:6379/1'),
+        }
+    }
+
+# Seconds cached space responses are served fresh, then stale while one
+# request rebuilds them (see core.cache)
+SPACES_CACHE_TIMEOUT = env.int('SPACES_CACHE_TIMEOUT', default=60)
+SPACES_CACHE_STALE_TIMEOUT = env.int('SPACES_CACHE_STALE_TIMEOUT', default=300)
+CALENDAR_CACHE_TIMEOUT = env.int('CALENDAR_CACHE_TIMEOUT', default=3600)
+# Seconds a calendar subscription link stays valid before a new one is needed
+CALENDAR_TOKEN_MAX_AGE = env.int('CALENDAR_TOKEN_MAX_AGE', default=365 * 24 * 3600)
+
+# Largest batch accepted by /api/bookings/bulk/
+BULK_BOOKING_MAX_ROWS = env.int('BULK_BOOKING_MAX_ROWS', default=500)
+
+# How far ahead recurring bookings are expanded, and the most occurrences one may have
+RECURRENCE_HORIZON_DAYS = env.int('RECURRENCE_HORIZON_DAYS', default=365)
+RECURRENCE_MAX_OCCURRENCES = env.int('RECURRENCE_MAX_OCCURRENCES', default=200)
+
+# Default and longest slot holds, in minutes
+BOOKING_HOLD_MINUTES = env.int('BOOKING_HOLD_MINUTES', default=10)
+BOOKING_HOLD_MAX_MINUTES = env.int('BOOKING_HOLD_MAX_MINUTES', default=30)
+
+# Async bookings (?async=true) go to one of these Celery queues, picked by
+# consistent hashing of the space id. Run one single-process worker per
+# queue, e.g. `celery -A core worker -Q bookings.p0 --concurrency 1`
+BOOKING_QUEUE_PREFIX = env('BOOKING_QUEUE_PREFIX', default='bookings')
+BOOKING_QUEUE_PARTITIONS = env.int('BOOKING_QUEUE_PARTITIONS', default=4)
+
+# Async booking callbacks may only reach public addresses, except on these
+# hosts (e.g. an internal service the operator trusts)
+BOOKING_WEBHOOK_ALLOWED_HOSTS = env.list('BOOKING_WEBHOOK_ALLOWED_HOSTS', default=[])
+
+# Seconds an in-process space schedule is trusted before it is reloaded
+# from the database (see apps.bookings.availability)
+BOOKING_INDEX_TTL = env.int('BOOKING_INDEX_TTL', default=30)
+
 SWAGGER_SETTINGS = {
     'DOC_EXPANSION': 'none',
     'SWAGGER_UI_PARAMETERS': {
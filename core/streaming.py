@@ -0,0 +1,82 @@
+from django.core.exceptions import ImproperlyConfigured
+from django.http import StreamingHttpResponse
+
+from .renderers import json_dumps
+from .serializers import ValuesPlan
+
+# Rows fetched from the database per round trip while streaming
+STREAM_CHUNK_SIZE = 500
+# Bytes gathered before a piece of the response is handed to the server
+STREAM_BUFFER_SIZE = 64 * 1024
+
+STREAM_FORMATS = {
+    'json': 'application/json',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+def stream_format(request):
+    """
+    The streaming format asked for with ?stream=, or None for a normal
+    response: ?stream=1 (or json) gives a JSON array, ?stream=ndjson one
+    JSON document per line.
+    """
+    value = request.query_params.get('stream', '').lower()
+    if value in ('1', 'true', 'json'):
+        return 'json'
+    if value == 'ndjson':
+        return 'ndjson'
+    return None
+
+
+def _buffered(pieces):
+    buffer = []
+    size = 0
+    for piece in pieces:
+        buffer.append(piece)
+        size += len(piece)
+        if size >= STREAM_BUFFER_SIZE:
+            yield b''.join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield b''.join(buffer)
+
+
+def _json_array(rows):
+    yield b'['
+    separator = b''
+    for row in rows:
+        yield separator + json_dumps(row)
+        separator = b','
+    yield b']'
+
+
+def _ndjson(rows):
+    for row in rows:
+        yield json_dumps(row) + b'\n'
+
+
+def streaming_response(queryset, serializer_class, fmt='json', context=None, **serializer_kwargs):
+    """
+    Serialize a queryset row by row into a StreamingHttpResponse.
+
+    Rows are read with queryset.iterator() and rendered as they are sent, so
+    memory stays flat however many rows there are. Serializers a ValuesPlan
+    can compile are read through values() instead of model instances.
+    """
+    try:
+        plan = ValuesPlan(serializer_class, context=context, **serializer_kwargs)
+    except ImproperlyConfigured:
+        serializer = serializer_class(context=context or {}, **serializer_kwargs)
+        rows = (
+            serializer.to_representation(instance)
+            for instance in queryset.iterator(chunk_size=STREAM_CHUNK_SIZE)
+        )
+    else:
+        rows = (
+            plan.to_representation(row)
+            for row in plan.values(queryset).iterator(chunk_size=STREAM_CHUNK_SIZE)
+        )
+    pieces = _json_array(rows) if fmt == 'json' else _ndjson(rows)
+    return StreamingHttpResponse(_buffered(pieces), content_type=STREAM_FORMATS[fmt])